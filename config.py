@@ -16,10 +16,52 @@ AZURE_ACCOUNT_NAME = os.getenv("AZURE_ACCOUNT_NAME")
 AZURE_ACCOUNT_KEY = os.getenv("AZURE_ACCOUNT_KEY")
 AZURE_BLOB_SERVICE_URL = os.getenv("AZURE_BLOB_SERVICE_URL")
 AZURE_MOVIE_CONTAINER = os.getenv("AZURE_MOVIE_CONTAINER")
+# 接続文字列（指定時は優先。Azurite でのローカル確認は "UseDevelopmentStorage=true"）
+AZURE_STORAGE_CONNECTION_STRING = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+# 動画アップロードのブロックサイズ（MiB）と同時送信数（メモリ使用量の上限 = 両者の積）
+BLOB_UPLOAD_BLOCK_SIZE_MB = int(os.getenv("BLOB_UPLOAD_BLOCK_SIZE_MB", "8"))
+BLOB_UPLOAD_CONCURRENCY = int(os.getenv("BLOB_UPLOAD_CONCURRENCY", "4"))
+# クライアントが直接アップロードする際の SAS の有効期間（分）
+BLOB_UPLOAD_SAS_MINUTES = int(os.getenv("BLOB_UPLOAD_SAS_MINUTES", "15"))
+# 共有 BlobServiceClient が保持する HTTP コネクション数の上限
+BLOB_HTTP_POOL_SIZE = int(os.getenv("BLOB_HTTP_POOL_SIZE", "32"))
+# 動画削除キュー（blob_deletion_queue）の処理間隔・1回の件数・リトライ上限
+BLOB_DELETION_INTERVAL_SECONDS = int(os.getenv("BLOB_DELETION_INTERVAL_SECONDS", "30"))
+BLOB_DELETION_BATCH_SIZE = int(os.getenv("BLOB_DELETION_BATCH_SIZE", "100"))
+BLOB_DELETION_MAX_ATTEMPTS = int(os.getenv("BLOB_DELETION_MAX_ATTEMPTS", "10"))
+# コンテナと lecture_videos_table の突き合わせ間隔と、未登録 Blob を孤児とみなすまでの猶予
+# （直接アップロード中で finalize 前の Blob を消さないよう、SAS の有効期間より十分長くする）
+BLOB_RECONCILE_INTERVAL_SECONDS = int(os.getenv("BLOB_RECONCILE_INTERVAL_SECONDS", "86400"))
+BLOB_RECONCILE_GRACE_HOURS = int(os.getenv("BLOB_RECONCILE_GRACE_HOURS", "24"))
 
 AZURE_ENVIRONMENT = os.getenv("AZURE_ENVIRONMENT")
 NEXT_URL = os.getenv("NEXT_URL")
 
+# キャッシュ関連（秒）
+QUESTION_CACHE_TTL_SECONDS = int(os.getenv("QUESTION_CACHE_TTL_SECONDS", "600"))
+GRADE_SUMMARY_CACHE_TTL_SECONDS = int(os.getenv("GRADE_SUMMARY_CACHE_TTL_SECONDS", "300"))
+SURVEY_COUNTER_TTL_SECONDS = int(os.getenv("SURVEY_COUNTER_TTL_SECONDS", "300"))
+ROSTER_CACHE_TTL_SECONDS = int(os.getenv("ROSTER_CACHE_TTL_SECONDS", "300"))
+CONTENT_CACHE_TTL_SECONDS = int(os.getenv("CONTENT_CACHE_TTL_SECONDS", "3600"))
+# Firebase IDトークンの検証結果キャッシュ（Firebase のトークン有効期限は最大1時間）
+ID_TOKEN_CACHE_MAXSIZE = int(os.getenv("ID_TOKEN_CACHE_MAXSIZE", "10000"))
+ID_TOKEN_CACHE_MAX_TTL_SECONDS = int(os.getenv("ID_TOKEN_CACHE_MAX_TTL_SECONDS", "3600"))
+
+# Firebase 認証
+FIREBASE_PROJECT_ID = os.getenv("FIREBASE_PROJECT_ID")
+# 1 の場合、ローカル生成した鍵でIDトークンを検証する（テスト・ローカル開発用）
+FIREBASE_AUTH_OFFLINE = os.getenv("FIREBASE_AUTH_OFFLINE", "0") == "1"
+# 署名鍵の期限切れの何秒前に再取得するか
+FIREBASE_KEY_REFRESH_MARGIN_SECONDS = int(os.getenv("FIREBASE_KEY_REFRESH_MARGIN_SECONDS", "300"))
+# 1 の場合、IDトークン検証時に失効（revoke）も確認する（検証ごとに Firebase への問い合わせが発生）
+# 失効をすぐ反映するため、この場合は検証結果のキャッシュを使わない
+FIREBASE_CHECK_REVOKED = os.getenv("FIREBASE_CHECK_REVOKED", "0") == "1"
+
+# ログイン履歴の非同期書き込み
+LOGIN_HISTORY_QUEUE_SIZE = int(os.getenv("LOGIN_HISTORY_QUEUE_SIZE", "10000"))
+LOGIN_HISTORY_BATCH_SIZE = int(os.getenv("LOGIN_HISTORY_BATCH_SIZE", "200"))
+LOGIN_HISTORY_FLUSH_INTERVAL_SECONDS = float(os.getenv("LOGIN_HISTORY_FLUSH_INTERVAL_SECONDS", "1.0"))
+
 # CORS関連
 raw_origins = os.getenv("ALLOWED_ORIGINS")  # 例: "http://xxx.azurewebsites.net,http://localhost:3000"
 
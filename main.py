@@ -1,5 +1,7 @@
 import uvicorn
 import os
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from database import engine
@@ -11,6 +13,7 @@ from routers import (
     classes,
     grades,
     grade_summary,
+    grade_export,
     lessons,  # lessonsルーターをインポート
     lesson_themes, # lesson_themesルーターをインポート
     user_auth,
@@ -20,10 +23,41 @@ from routers import (
 # ★ 修正: sio_app と create_sio_app をインポート
 from socket_server import sio_app, create_sio_app
 from config import ALLOWED_ORIGINS
+from services.firebase_auth import init_firebase_auth, start_key_refresh, stop_key_refresh
+from services.login_history_writer import start_login_history_writer, stop_login_history_writer
+from services.azure_blob import init_blob_clients, close_blob_clients
+from services.blob_deletions import start_blob_deletion_worker, stop_blob_deletion_worker
 # import socketio
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    起動時: Firebase Admin の初期化と署名鍵の先読み、鍵の定期更新タスク・ログイン履歴ライターの開始、
+            共有 Blob クライアントの生成、動画 Blob 削除ワーカーの開始
+    終了時: 定期更新タスクの停止、未書き込みのログイン履歴の書き出し、
+            削除ワーカーの停止、Blob のコネクションのクローズ
+    """
+    key_refresh_task = None
+    try:
+        await asyncio.to_thread(init_firebase_auth)
+        # 鍵の先読みに成功した場合のみ定期更新する
+        key_refresh_task = start_key_refresh()
+    except Exception as e:
+        # 認証情報が無い環境でも他の API は動かせるようにする（初回ログイン時に再試行される）
+        print(f"[startup] Firebase initialization failed: {e}")
+    start_login_history_writer()
+    if await init_blob_clients():
+        start_blob_deletion_worker()
+    yield
+    await asyncio.to_thread(stop_blob_deletion_worker)
+    await close_blob_clients()
+    await stop_key_refresh(key_refresh_task)
+    await asyncio.to_thread(stop_login_history_writer)
+
+
 # FastAPIアプリケーション作成
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # CORS設定 (これは主にHTTP APIリクエストに適用されます)
 app.add_middleware(
@@ -34,7 +68,7 @@ app.add_middleware(
     allow_headers=["*"],
     allow_credentials=True,
     # allow_credentials=False, 
-    expose_headers=["Server-Timing", "X-Request-Id"],
+    expose_headers=["Server-Timing", "X-Request-Id", "ETag", "X-Next-Cursor"],
 )
 
 # --- Socket.IOの結合方法を修正 ---
@@ -60,6 +94,7 @@ app.include_router(realtime_answers_get.router)
 app.include_router(classes.router)
 app.include_router(grades.router)
 app.include_router(grade_summary.router)
+app.include_router(grade_export.router)
 app.include_router(lessons.router) # lessonsルーターを追加
 app.include_router(lesson_themes.router) # lesson_themesルーターを追加
 app.include_router(lesson_surveys.router) # lesson_surveysルーターを追加
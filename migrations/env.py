@@ -0,0 +1,43 @@
+####### migrations/env.py
+
+from logging.config import fileConfig
+
+from alembic import context
+
+from database import engine, DB_URI
+from models import Base
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """
+    DB に接続せず SQL を出力する（alembic upgrade head --sql）。
+    本番に流す前に DDL を確認したい場合に使う。
+    """
+    context.configure(
+        url=DB_URI,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    # SSL 設定などはアプリと同じ engine を使う
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,31 @@
+####### migrations/helpers.py
+"""
+マイグレーションで共有する補助関数。
+既存の環境でも流せるよう、テーブル・インデックスの有無を確認してから作成・削除するために使う。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+def has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def has_index(table: str, name: str) -> bool:
+    return any(index["name"] == name for index in sa.inspect(op.get_bind()).get_indexes(table))
+
+
+def keep_fk_index(table: str, name: str, column: str) -> None:
+    """
+    name を削除する前に呼ぶ。column が外部キーで、name 以外に column から始まるインデックスが無ければ、
+    外部キー用のインデックスを作り直す（外部キーが使うインデックスは単独では削除できない）。
+    """
+    inspector = sa.inspect(op.get_bind())
+    if not any(column in fk["constrained_columns"] for fk in inspector.get_foreign_keys(table)):
+        return
+    if any(
+        index["name"] != name and index["column_names"][:1] == [column]
+        for index in inspector.get_indexes(table)
+    ):
+        return
+    op.create_index(f"{name}_fk", table, [column])
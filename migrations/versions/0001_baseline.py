@@ -0,0 +1,22 @@
+"""baseline
+
+マイグレーション導入前から稼働している DB のスキーマ。
+既存の DB は `alembic stamp 0001` でこのリビジョンに合わせてから upgrade する。
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    pass
+
+
+def downgrade() -> None:
+    pass
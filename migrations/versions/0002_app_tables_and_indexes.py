@@ -0,0 +1,54 @@
+"""app tables and indexes
+
+これまでアプリ側で追加し、手作業で作成していたテーブル・インデックス。
+既に作成済みの環境でも流せるよう、存在しないものだけを作る。
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import has_index, has_table, keep_fk_index
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if not has_table("blob_deletion_queue"):
+        op.create_table(
+            "blob_deletion_queue",
+            sa.Column("blob_deletion_id", sa.BigInteger, primary_key=True, autoincrement=True),
+            sa.Column("blob_name", sa.String(255), nullable=False, unique=True),
+            sa.Column("attempts", sa.Integer, nullable=False, server_default="0"),
+            sa.Column("next_attempt_at", sa.DateTime, nullable=False, index=True),
+            sa.Column("last_error", sa.String(255)),
+            sa.Column("created_at", sa.DateTime, nullable=False),
+        )
+
+    if not has_index("timetable_table", "ix_timetable_date_period"):
+        op.create_index("ix_timetable_date_period", "timetable_table", ["date", "period"])
+    if not has_index("lesson_answer_data_table", "ix_answer_student_end"):
+        op.create_index("ix_answer_student_end", "lesson_answer_data_table", ["student_id", "answer_end_unix"])
+    if not has_index("lesson_survey_table", "ft_survey_student_comment"):
+        op.create_index(
+            "ft_survey_student_comment", "lesson_survey_table", ["student_comment"],
+            mysql_prefix="FULLTEXT", mysql_with_parser="ngram",
+        )
+
+
+def downgrade() -> None:
+    # upgrade と同じく、存在するものだけを削除する
+    if has_index("lesson_survey_table", "ft_survey_student_comment"):
+        op.drop_index("ft_survey_student_comment", table_name="lesson_survey_table")
+    if has_index("lesson_answer_data_table", "ix_answer_student_end"):
+        keep_fk_index("lesson_answer_data_table", "ix_answer_student_end", "student_id")
+        op.drop_index("ix_answer_student_end", table_name="lesson_answer_data_table")
+    if has_index("timetable_table", "ix_timetable_date_period"):
+        op.drop_index("ix_timetable_date_period", table_name="timetable_table")
+    if has_table("blob_deletion_queue"):
+        op.drop_table("blob_deletion_queue")
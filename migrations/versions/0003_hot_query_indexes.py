@@ -0,0 +1,51 @@
+"""hot query indexes
+
+授業・生徒単位で絞り込む主要なクエリ用の複合インデックス。
+InnoDB のセカンダリインデックスは主キーを含むため、(lesson_id, ...) の後ろに主キー順が続く。
+
+- lesson_answer_data_table (lesson_id, lesson_theme_id, student_id)
+    成績集計・エクスポート（lesson_id）、授業開始・一括作成（lesson_id, lesson_theme_id）、
+    回答一覧（lesson_id, student_id の前半一致）。lesson_id の外部キー用インデックスを兼ねる
+- lesson_survey_table (lesson_id, understanding_level, difficulty_point)
+    アンケート集計の GROUP BY をテーブルを読まずに行う（カバリングインデックス）
+- lesson_registrations_table (lesson_id, lesson_theme_id)
+- attendance_table (student_id, lesson_id)
+
+各インデックスの用途はクエリの形から想定したもので、MySQL の実行計画ではまだ確認していない。
+scripts/check_query_plans.py で確認するまでは、想定どおり使われるとは限らない。
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+from migrations.helpers import has_index, keep_fk_index
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+_INDEXES = [
+    ("ix_answer_lesson_theme_student", "lesson_answer_data_table", ["lesson_id", "lesson_theme_id", "student_id"]),
+    ("ix_survey_lesson_levels", "lesson_survey_table", ["lesson_id", "understanding_level", "difficulty_point"]),
+    ("ix_registration_lesson_theme", "lesson_registrations_table", ["lesson_id", "lesson_theme_id"]),
+    ("ix_attendance_student_lesson", "attendance_table", ["student_id", "lesson_id"]),
+]
+
+
+def upgrade() -> None:
+    # MySQL 8 のオンライン DDL（ALGORITHM=INPLACE, LOCK=NONE）で作成されるため、授業中でも書き込みは止まらない
+    for name, table, columns in _INDEXES:
+        if not has_index(table, name):
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    # 複合インデックス作成時に MySQL が外部キー用の暗黙のインデックスを削除している場合があるため、
+    # 先頭列を使えるインデックスが他に無い時だけ作り直してから削除する
+    for name, table, columns in reversed(_INDEXES):
+        if has_index(table, name):
+            keep_fk_index(table, name, columns[0])
+            op.drop_index(name, table_name=table)
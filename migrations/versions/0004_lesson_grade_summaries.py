@@ -0,0 +1,67 @@
+"""lesson grade summaries
+
+授業終了時に集計する成績サマリー（設問別・生徒別）と、集計済みの授業の記録。
+集計済みの記録は、回答0件でサマリー行が無い授業を成績画面を開くたびに集計し直さないために使う。
+既に作成済みの環境でも流せるよう、存在しないものだけを作る。
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import has_table
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if not has_table("lesson_question_summary_table"):
+        op.create_table(
+            "lesson_question_summary_table",
+            sa.Column("lesson_question_summary_id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("lesson_id", sa.Integer, sa.ForeignKey("lessons_table.lesson_id"), nullable=False, index=True),
+            sa.Column("lesson_theme_id", sa.Integer, sa.ForeignKey("lesson_themes_table.lesson_theme_id")),
+            sa.Column("lesson_question_id", sa.Integer, sa.ForeignKey("lesson_questions_table.lesson_question_id"), nullable=False),
+            sa.Column("total_students", sa.Integer, nullable=False, server_default="0"),
+            sa.Column("answer_count", sa.Integer, nullable=False, server_default="0"),
+            sa.Column("correct_count", sa.Integer, nullable=False, server_default="0"),
+            sa.Column("mean_response_sec", sa.Float),
+            sa.Column("median_response_sec", sa.Float),
+            sa.Column("choice1_count", sa.Integer, nullable=False, server_default="0"),
+            sa.Column("choice2_count", sa.Integer, nullable=False, server_default="0"),
+            sa.Column("choice3_count", sa.Integer, nullable=False, server_default="0"),
+            sa.Column("choice4_count", sa.Integer, nullable=False, server_default="0"),
+            sa.Column("computed_at", sa.DateTime, nullable=False),
+        )
+
+    if not has_table("lesson_student_summary_table"):
+        op.create_table(
+            "lesson_student_summary_table",
+            sa.Column("lesson_student_summary_id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("lesson_id", sa.Integer, sa.ForeignKey("lessons_table.lesson_id"), nullable=False, index=True),
+            sa.Column("student_id", sa.Integer, sa.ForeignKey("students_table.student_id"), nullable=False),
+            sa.Column("question_count", sa.Integer, nullable=False, server_default="0"),
+            sa.Column("answered_count", sa.Integer, nullable=False, server_default="0"),
+            sa.Column("correct_count", sa.Integer, nullable=False, server_default="0"),
+            sa.Column("score", sa.Float, nullable=False, server_default="0"),
+            sa.Column("completion_rate", sa.Float, nullable=False, server_default="0"),
+            sa.Column("computed_at", sa.DateTime, nullable=False),
+        )
+
+    if not has_table("lesson_summary_state_table"):
+        op.create_table(
+            "lesson_summary_state_table",
+            sa.Column("lesson_id", sa.Integer, sa.ForeignKey("lessons_table.lesson_id"), primary_key=True),
+            sa.Column("computed_at", sa.DateTime, nullable=False),
+        )
+
+
+def downgrade() -> None:
+    for table in ("lesson_summary_state_table", "lesson_student_summary_table", "lesson_question_summary_table"):
+        if has_table(table):
+            op.drop_table(table)
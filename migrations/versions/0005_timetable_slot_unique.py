@@ -0,0 +1,61 @@
+"""timetable slot unique
+
+時間割の枠 (date, period, day_of_week, time) を一意にする。
+一括登録（/lesson_registrations/calendar/bulk）を同時に実行しても同じ枠が重複して作られないよう、
+INSERT IGNORE で既存の枠を飛ばせるようにする。
+先頭が (date, period) のため、カレンダーの期間検索用の ix_timetable_date_period を置き換える。
+
+既に重複している枠は、最も小さい timetable_id に授業を付け替えてから削除する。
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+from migrations.helpers import has_index
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+_SLOT_COLUMNS = ["date", "period", "day_of_week", "time"]
+
+# 重複している枠ごとに残す timetable_id（NULL 同士も同じ枠とみなす）
+_DUPLICATES = """
+    (SELECT date, period, day_of_week, time, MIN(timetable_id) AS keep_id
+     FROM timetable_table
+     GROUP BY date, period, day_of_week, time
+     HAVING COUNT(*) > 1) AS d
+    ON t.date <=> d.date AND t.period <=> d.period
+    AND t.day_of_week <=> d.day_of_week AND t.time <=> d.time
+"""
+
+
+def upgrade() -> None:
+    if has_index("timetable_table", "ux_timetable_slot"):
+        return
+    op.execute(
+        "UPDATE lessons_table AS l "
+        "JOIN timetable_table AS t ON t.timetable_id = l.timetable_id "
+        f"JOIN {_DUPLICATES} "
+        "SET l.timetable_id = d.keep_id "
+        "WHERE l.timetable_id <> d.keep_id"
+    )
+    op.execute(
+        "DELETE t FROM timetable_table AS t "
+        f"JOIN {_DUPLICATES} "
+        "WHERE t.timetable_id <> d.keep_id"
+    )
+    op.create_index("ux_timetable_slot", "timetable_table", _SLOT_COLUMNS, unique=True)
+    if has_index("timetable_table", "ix_timetable_date_period"):
+        op.drop_index("ix_timetable_date_period", table_name="timetable_table")
+
+
+def downgrade() -> None:
+    # 付け替え・削除した重複枠は戻さない
+    if not has_index("timetable_table", "ix_timetable_date_period"):
+        op.create_index("ix_timetable_date_period", "timetable_table", ["date", "period"])
+    if has_index("timetable_table", "ux_timetable_slot"):
+        op.drop_index("ux_timetable_slot", table_name="timetable_table")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, DateTime, Text, Float, BigInteger,text
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, DateTime, Text, Float, BigInteger, Index, text
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -47,6 +47,11 @@ class TimetableTable(Base):
     
     lessons = relationship("LessonTable", back_populates="timetable")
 
+    __table_args__ = (
+        # 枠の一意制約（一括登録の INSERT IGNORE 用）。先頭の (date, period) は日付範囲・コマでの検索にも使う
+        Index("ux_timetable_slot", "date", "period", "day_of_week", "time", unique=True),
+    )
+
 class LessonTable(Base):
     __tablename__ = "lessons_table"
     
@@ -108,6 +113,7 @@ class LessonThemesTable(Base):
     registrations = relationship("LessonRegistrationTable", back_populates="lesson_theme")
     lesson_answer_data = relationship("LessonAnswerDataTable", back_populates="lesson_theme")
     lesson_surveys = relationship("LessonSurveyTable", back_populates="lesson_theme")
+    lecture_videos = relationship("LectureVideosTable", back_populates="lesson_theme")
 
 class LessonRegistrationTable(Base):
     __tablename__ = "lesson_registrations_table"
@@ -122,6 +128,11 @@ class LessonRegistrationTable(Base):
     lesson_theme = relationship("LessonThemesTable", back_populates="registrations")
     status = relationship("StatusTable")                                                                    # 20251126修正  
 
+    __table_args__ = (
+        # 授業ごとの登録テーマ（授業開始時のテーマ一覧・出題状態の確認）用
+        Index("ix_registration_lesson_theme", "lesson_id", "lesson_theme_id"),
+    )
+
 class LessonQuestionsTable(Base):
     __tablename__ = "lesson_questions_table"
     
@@ -159,6 +170,13 @@ class LessonAnswerDataTable(Base):
     lesson_question = relationship("LessonQuestionsTable", back_populates="lesson_answer_data")
     status = relationship("StatusTable")
 
+    __table_args__ = (
+        # 生徒ごとの学習履歴（回答終了時刻順のキーセットページング）用
+        Index("ix_answer_student_end", "student_id", "answer_end_unix"),
+        # 授業単位・授業テーマ単位の回答取得（成績集計・一括作成の件数確認・授業開始）用
+        Index("ix_answer_lesson_theme_student", "lesson_id", "lesson_theme_id", "student_id"),
+    )
+
 class LessonSurveyTable(Base):
     __tablename__ = "lesson_survey_table"
     
@@ -176,6 +194,16 @@ class LessonSurveyTable(Base):
     lesson_theme = relationship("LessonThemesTable", back_populates="lesson_surveys")
     status = relationship("StatusTable")
 
+    __table_args__ = (
+        # コメント検索用の全文インデックス（日本語は ngram パーサで分割）
+        Index(
+            "ft_survey_student_comment", "student_comment",
+            mysql_prefix="FULLTEXT", mysql_with_parser="ngram"
+        ),
+        # 授業ごとのアンケート集計（理解度・難易度の GROUP BY をインデックスだけで行う）用
+        Index("ix_survey_lesson_levels", "lesson_id", "understanding_level", "difficulty_point"),
+    )
+
 class LectureVideosTable(Base):
     __tablename__ = "lecture_videos_table"
     
@@ -184,7 +212,18 @@ class LectureVideosTable(Base):
     lecture_video_title = Column(String(255))
     video_url = Column(String(255))
     
-    lesson_theme = relationship("LessonThemesTable")
+    lesson_theme = relationship("LessonThemesTable", back_populates="lecture_videos")
+
+# 削除待ちの動画 Blob（DB 削除と同じトランザクションで積み、バックグラウンドで削除する）
+class BlobDeletionQueueTable(Base):
+    __tablename__ = "blob_deletion_queue"
+
+    blob_deletion_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    blob_name = Column(String(255), nullable=False, unique=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, index=True)
+    last_error = Column(String(255), nullable=True)
+    created_at = Column(DateTime, nullable=False)
 
 class AttendanceTable(Base):
     __tablename__ = "attendance_table"
@@ -197,6 +236,11 @@ class AttendanceTable(Base):
     student = relationship("StudentTable")
     lesson = relationship("LessonTable")
 
+    __table_args__ = (
+        # 生徒・授業を指定した出席更新用
+        Index("ix_attendance_student_lesson", "student_id", "lesson_id"),
+    )
+
 
 # ログイン履歴ログテーブル
 class LoginHistoryTable(Base):
@@ -219,6 +263,49 @@ class LoginHistoryTable(Base):
     http_status = Column(Integer, nullable=True)
 
 
+# 授業終了時に集計する成績サマリー（設問別）
+class LessonQuestionSummaryTable(Base):
+    __tablename__ = "lesson_question_summary_table"
+
+    lesson_question_summary_id = Column(Integer, primary_key=True, autoincrement=True)
+    lesson_id = Column(Integer, ForeignKey("lessons_table.lesson_id"), nullable=False, index=True)
+    lesson_theme_id = Column(Integer, ForeignKey("lesson_themes_table.lesson_theme_id"))
+    lesson_question_id = Column(Integer, ForeignKey("lesson_questions_table.lesson_question_id"), nullable=False)
+    total_students = Column(Integer, nullable=False, default=0)
+    answer_count = Column(Integer, nullable=False, default=0)
+    correct_count = Column(Integer, nullable=False, default=0)
+    mean_response_sec = Column(Float)
+    median_response_sec = Column(Float)
+    choice1_count = Column(Integer, nullable=False, default=0)
+    choice2_count = Column(Integer, nullable=False, default=0)
+    choice3_count = Column(Integer, nullable=False, default=0)
+    choice4_count = Column(Integer, nullable=False, default=0)
+    computed_at = Column(DateTime, nullable=False)
+
+
+# 成績サマリーを集計済みの授業（回答0件でサマリー行が無い授業を、毎回集計し直さないための目印）
+class LessonSummaryStateTable(Base):
+    __tablename__ = "lesson_summary_state_table"
+
+    lesson_id = Column(Integer, ForeignKey("lessons_table.lesson_id"), primary_key=True)
+    computed_at = Column(DateTime, nullable=False)
+
+
+# 授業終了時に集計する成績サマリー（生徒別）
+class LessonStudentSummaryTable(Base):
+    __tablename__ = "lesson_student_summary_table"
+
+    lesson_student_summary_id = Column(Integer, primary_key=True, autoincrement=True)
+    lesson_id = Column(Integer, ForeignKey("lessons_table.lesson_id"), nullable=False, index=True)
+    student_id = Column(Integer, ForeignKey("students_table.student_id"), nullable=False)
+    question_count = Column(Integer, nullable=False, default=0)
+    answered_count = Column(Integer, nullable=False, default=0)
+    correct_count = Column(Integer, nullable=False, default=0)
+    score = Column(Float, nullable=False, default=0)            # 正答率(%)
+    completion_rate = Column(Float, nullable=False, default=0)  # 回答率(%)
+    computed_at = Column(DateTime, nullable=False)
+
+
 
 # 以下、存在しないテーブルを一度コメントアウト 
 
@@ -4,13 +4,11 @@ from sqlalchemy import text
 from database import get_db
 from models import (
     LessonAnswerDataTable,
-    StudentTable,
     LessonTable,
     LessonRegistrationTable,
-    LessonQuestionsTable,
-    LessonThemesTable,
-    LessonThemeContentsTable
 )
+from services.question_cache import get_question_ids
+from services.roster_cache import get_class_students
 
 router = APIRouter(prefix="/api/answer-data-bulk", tags=["answer_data_bulk"])
 
@@ -41,28 +39,17 @@ async def generate_answer_data(
             detail=f"授業 {lesson_id} にテーマ {lesson_theme_id} は登録されていません",
         )
     
-    # 3. テーマに紐づく問題を取得
-    # lesson_theme_contents_tableを経由してlesson_questions_tableから取得
-    questions = (
-        db.query(LessonQuestionsTable)
-        .join(LessonThemeContentsTable)
-        .join(LessonThemesTable)
-        .filter(LessonThemesTable.lesson_theme_id == lesson_theme_id)
-        .all()
-    )
+    # 3. テーマに紐づく問題IDを取得（共有キャッシュ経由）
+    question_ids = get_question_ids(db, lesson_theme_id)
     
-    if not questions:
+    if not question_ids:
         raise HTTPException(
             status_code=404,
             detail=f"テーマ {lesson_theme_id} に紐づく問題が見つかりません",
         )
     
-    # 4. クラスの生徒を取得
-    students = (
-        db.query(StudentTable)
-        .filter_by(class_id=lesson.class_id)
-        .all()
-    )
+    # 4. クラスの生徒を取得（名簿キャッシュ経由）
+    students = get_class_students(db, lesson.class_id)
     if not students:
         raise HTTPException(
             status_code=404,
@@ -90,12 +77,12 @@ async def generate_answer_data(
     # 6. 生徒数 × 問題数 分のレコードを一括生成
     created_count = 0
     for student in students:
-        for question in questions:
+        for question_id in question_ids:
             new_data = LessonAnswerDataTable(
                 student_id=student.student_id,
                 lesson_id=lesson_id,
                 lesson_theme_id=lesson_theme_id,
-                lesson_question_id=question.lesson_question_id,
+                lesson_question_id=question_id,
                 choice_number=None,
                 answer_correctness=None,
                 answer_status=1,  # READY (初期状態)
@@ -113,7 +100,7 @@ async def generate_answer_data(
     # 8. レスポンス組み立て
     message = (
         f"授業を開始しました。"
-        f"{len(students)}名の生徒に {len(questions)}問題ずつ、合計{created_count}個の回答データを作成しました。"
+        f"{len(students)}名の生徒に {len(question_ids)}問題ずつ、合計{created_count}個の回答データを作成しました。"
     )
     
     return {
@@ -121,6 +108,6 @@ async def generate_answer_data(
         "lesson_id": lesson_id,
         "lesson_theme_id": lesson_theme_id,
         "total_students": len(students),
-        "total_questions": len(questions),
+        "total_questions": len(question_ids),
         "total_created": created_count
     }
\ No newline at end of file
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, or_
 from database import get_db
-from models import LessonAnswerDataTable, LessonQuestionsTable, StudentTable, LessonTable
-from schemas import LessonAnswerDataWithDetails, LessonQuestionResponse
-from typing import List, Optional
+from models import LessonAnswerDataTable, LessonQuestionsTable, StudentTable, LessonTable, LessonThemesTable
+from schemas import LessonAnswerDataWithDetails, LessonQuestionResponse, AnswerHistoryItem, AnswerHistoryResponse
+from services.grade_aggregates import is_answer_correct
+from typing import List, Optional, Tuple
 from datetime import datetime
 
 router = APIRouter(prefix="/api/answers", tags=["answer_data"])
@@ -70,4 +72,97 @@ def get_answer_data_with_details(
             question=question_detail
         ))
     
-    return result
\ No newline at end of file
+    return result
+
+def _parse_history_cursor(cursor: str) -> Tuple[int, int]:
+    try:
+        end_unix, answer_id = cursor.split("_", 1)
+        return int(end_unix), int(answer_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/history", response_model=AnswerHistoryResponse)
+def get_student_answer_history(
+    student_id: int = Query(..., description="生徒ID（必須）"),
+    units_id: Optional[int] = Query(None, description="単元ID（オプション）"),
+    lesson_theme_id: Optional[int] = Query(None, description="授業テーマID（オプション）"),
+    limit: int = Query(50, ge=1, le=500, description="1ページの件数"),
+    cursor: Optional[str] = Query(None, description="前ページの next_cursor"),
+    db: Session = Depends(get_db)
+):
+    """
+    生徒1人の学習履歴（回答済みのみ）を新しい順に返す。
+    (answer_end_unix, lesson_answer_data_id) のキーセットでページングし、
+    (student_id, answer_end_unix) の複合インデックスを使って必要な件数だけ読む。
+    """
+    query = (
+        db.query(
+            LessonAnswerDataTable.lesson_answer_data_id,
+            LessonAnswerDataTable.lesson_id,
+            LessonAnswerDataTable.lesson_theme_id,
+            LessonAnswerDataTable.lesson_question_id,
+            LessonAnswerDataTable.choice_number,
+            LessonAnswerDataTable.answer_correctness,
+            LessonAnswerDataTable.answer_start_unix,
+            LessonAnswerDataTable.answer_end_unix,
+            LessonQuestionsTable.correctness_number,
+        )
+        .join(LessonQuestionsTable, LessonAnswerDataTable.lesson_question_id == LessonQuestionsTable.lesson_question_id)
+        .filter(
+            LessonAnswerDataTable.student_id == student_id,
+            LessonAnswerDataTable.answer_end_unix.isnot(None)
+        )
+    )
+
+    if lesson_theme_id is not None:
+        query = query.filter(LessonAnswerDataTable.lesson_theme_id == lesson_theme_id)
+    if units_id is not None:
+        query = (
+            query.join(LessonThemesTable, LessonAnswerDataTable.lesson_theme_id == LessonThemesTable.lesson_theme_id)
+            .filter(LessonThemesTable.units_id == units_id)
+        )
+
+    if cursor:
+        last_end_unix, last_id = _parse_history_cursor(cursor)
+        query = query.filter(or_(
+            LessonAnswerDataTable.answer_end_unix < last_end_unix,
+            and_(
+                LessonAnswerDataTable.answer_end_unix == last_end_unix,
+                LessonAnswerDataTable.lesson_answer_data_id < last_id
+            )
+        ))
+
+    # 1件多く取得して次ページの有無を判定
+    rows = (
+        query.order_by(
+            LessonAnswerDataTable.answer_end_unix.desc(),
+            LessonAnswerDataTable.lesson_answer_data_id.desc()
+        )
+        .limit(limit + 1)
+        .all()
+    )
+
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+
+    items = [
+        AnswerHistoryItem(
+            lesson_answer_data_id=row.lesson_answer_data_id,
+            lesson_id=row.lesson_id,
+            lesson_theme_id=row.lesson_theme_id,
+            lesson_question_id=row.lesson_question_id,
+            choice_number=row.choice_number,
+            is_correct=is_answer_correct(row.answer_correctness, row.choice_number, row.correctness_number),
+            answer_start_unix=row.answer_start_unix,
+            answer_end_unix=row.answer_end_unix
+        )
+        for row in rows
+    ]
+
+    next_cursor = None
+    if has_next:
+        last = rows[-1]
+        next_cursor = f"{last.answer_end_unix}_{last.lesson_answer_data_id}"
+
+    return AnswerHistoryResponse(student_id=student_id, items=items, next_cursor=next_cursor)
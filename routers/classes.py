@@ -1,6 +1,6 @@
 # ファイルパス: schooldx-ver3-back\routers\classes.py
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from typing import List
 from database import get_db
@@ -8,22 +8,25 @@ from database import get_db
 from models import ClassTable, StudentTable
 from schemas import ClassResponse, StudentInfo
 # ▲▲▲ インポート追加 ▲▲▲
+from services.roster_cache import get_class_students, invalidate_roster
+from services.etag import json_etag_response
 
 router = APIRouter(prefix="/classes", tags=["classes"])
 
 @router.get("/", response_model=List[ClassResponse])
-def get_all_classes(db: Session = Depends(get_db)):
+def get_all_classes(request: Request, db: Session = Depends(get_db)):
   """
   登録されているクラスの一覧を取得する。
   授業設定画面のクラス選択ドロップダウン用。
   成績表示画面のクラス選択フィルター用。
+  ETag は本文のハッシュで、If-None-Match が一致する場合は 304 を返す。
   """
   classes = db.query(ClassTable).all()
  
   if not classes:
     raise HTTPException(status_code=404, detail="No classes found")
  
-  return classes
+  return json_etag_response(request, [ClassResponse.model_validate(c) for c in classes])
 
 # ▼▼▼▼▼ 【新規追加】 class_id で生徒一覧を取得するAPI ▼▼▼▼▼
 @router.get("/{class_id}/students", response_model=List[StudentInfo])
@@ -33,17 +36,22 @@ def get_students_by_class(class_id: int, db: Session = Depends(get_db)):
   リアルタイムダッシュボードの生徒一覧表示用。
   (schemas.StudentInfo は student_id, name, class_id を返します)
   """
-  students = (
-    db.query(StudentTable)
-    .filter(StudentTable.class_id == class_id)
-    .order_by(StudentTable.students_number) # 出席番号順でソート
-    .all()
-  )
+  # 名簿キャッシュから出席番号順で取得
+  students = get_class_students(db, class_id)
  
   if not students:
     # 404を返すとフロント側でエラー処理が必要になるため、
     # 空のリストを返す（生徒が0人のクラス）
     return []
  
-  return students
-# ▲▲▲▲▲ 【新規追加】 ここまで ▲▲▲▲▲
\ No newline at end of file
+  return [student._asdict() for student in students]
+# ▲▲▲▲▲ 【新規追加】 ここまで ▲▲▲▲▲
+
+@router.delete("/cache")
+def clear_roster_cache():
+  """
+  生徒・クラスの名簿キャッシュを破棄する。
+  名簿をDBで直接更新した後に呼び出す。
+  """
+  invalidate_roster()
+  return {"message": "Roster cache cleared"}
\ No newline at end of file
@@ -1,40 +1,52 @@
 # routers/content.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from database import get_db
-from models import MaterialTable
 from schemas import UnitWithThemes
+from services.content_cache import (
+    get_content_json_by_id,
+    get_content_json_by_name,
+    invalidate_content_cache,
+)
+from services.etag import etag_response
 
 router = APIRouter(prefix="/content", tags=["content"])
 
+@router.delete("/cache")
+def clear_content_cache():
+    """
+    教材ツリーのキャッシュを破棄する。
+    単元・授業テーマをDBで直接更新した後に呼び出す。
+    """
+    invalidate_content_cache()
+    return {"message": "Content cache cleared"}
+
 @router.get("/{material_name}", response_model=list[UnitWithThemes])
-def get_material_content(material_name: str, db: Session = Depends(get_db)):
+def get_material_content(material_name: str, request: Request, db: Session = Depends(get_db)):
     """
     例: GET /content/高校１年生_物理基礎
     紐づく units -> lesson_themes -> lecture_videos をネストして返す（教材名で検索）
+    ツリーは一括で読み込み、シリアライズ済みのJSONを教材ごとにキャッシュする。
+    ETag はキャッシュした本文のハッシュで、If-None-Match が一致する場合は 304 を返す。
     """
-    material = db.query(MaterialTable)\
-                .filter(MaterialTable.material_name == material_name)\
-                .first()
+    cached = get_content_json_by_name(db, material_name)
     
-    if not material:
+    if cached is None:
         raise HTTPException(status_code=404, detail="Material not found")
     
-    # material.units -> UnitWithThemes によってネストされた形で返せる
-    return material.units
+    return etag_response(request, cached.content, cached.etag)
 
 @router.get("/by_id/{material_id}", response_model=list[UnitWithThemes])
-def get_material_content_by_id(material_id: int, db: Session = Depends(get_db)):
+def get_material_content_by_id(material_id: int, request: Request, db: Session = Depends(get_db)):
     """
     例: GET /content/by_id/1
     紐づく units -> lesson_themes -> lecture_videos をネストして返す（教材IDで検索）
+    ツリーは一括で読み込み、シリアライズ済みのJSONを教材ごとにキャッシュする。
+    ETag はキャッシュした本文のハッシュで、If-None-Match が一致する場合は 304 を返す。
     """
-    material = db.query(MaterialTable)\
-                .filter(MaterialTable.material_id == material_id)\
-                .first()
+    cached = get_content_json_by_id(db, material_id)
     
-    if not material:
+    if cached is None:
         raise HTTPException(status_code=404, detail="Material not found")
     
-    # models.pyのrelationshipにより、material.unitsからさらにlesson_themes -> lecture_videosとたどれる
-    return material.units
\ No newline at end of file
+    return etag_response(request, cached.content, cached.etag)
@@ -0,0 +1,206 @@
+# routers/grade_export.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from typing import Iterator, Optional
+import csv
+import io
+from database import get_db
+from models import (
+    LessonAnswerDataTable, LessonQuestionsTable, StudentTable, LessonTable,
+    LessonThemesTable, UnitTable, ClassTable, TimetableTable
+)
+from services.grade_aggregates import is_answer_correct
+
+# Parquet 出力は pyarrow がある環境のみ対応
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+router = APIRouter(prefix="/grades", tags=["grades"])
+
+# サーバーサイドカーソルから1回に読む行数（= CSV/Parquet の1チャンク）
+EXPORT_BATCH_SIZE = 5000
+
+EXPORT_COLUMNS = [
+    "academic_year", "grade", "class_id", "class_name",
+    "lesson_id", "date", "period",
+    "student_id", "students_number", "student_name",
+    "part_name", "chapter_name", "unit_name", "lesson_theme_name",
+    "question_id", "question_label", "correctness_number",
+    "choice_number", "is_correct", "answer_start_unix", "answer_end_unix",
+]
+
+
+def _export_select(class_id: Optional[int], academic_year: Optional[int]):
+    """
+    エクスポートに必要な列だけを選択する Core SELECT を組み立てる。
+    """
+    stmt = (
+        select(
+            ClassTable.academic_year,
+            ClassTable.grade,
+            ClassTable.class_id,
+            ClassTable.class_name,
+            LessonTable.lesson_id,
+            TimetableTable.date,
+            TimetableTable.period,
+            StudentTable.student_id,
+            StudentTable.students_number,
+            StudentTable.name.label("student_name"),
+            UnitTable.part_name,
+            UnitTable.chapter_name,
+            UnitTable.unit_name,
+            LessonThemesTable.lesson_theme_name,
+            LessonQuestionsTable.lesson_question_id.label("question_id"),
+            LessonQuestionsTable.lesson_question_label.label("question_label"),
+            LessonQuestionsTable.correctness_number,
+            LessonAnswerDataTable.choice_number,
+            LessonAnswerDataTable.answer_correctness,
+            LessonAnswerDataTable.answer_start_unix,
+            LessonAnswerDataTable.answer_end_unix,
+        )
+        .select_from(LessonAnswerDataTable)
+        .join(LessonTable, LessonAnswerDataTable.lesson_id == LessonTable.lesson_id)
+        .join(ClassTable, LessonTable.class_id == ClassTable.class_id)
+        .join(TimetableTable, LessonTable.timetable_id == TimetableTable.timetable_id, isouter=True)
+        .join(StudentTable, LessonAnswerDataTable.student_id == StudentTable.student_id)
+        .join(LessonQuestionsTable, LessonAnswerDataTable.lesson_question_id == LessonQuestionsTable.lesson_question_id)
+        .join(LessonThemesTable, LessonAnswerDataTable.lesson_theme_id == LessonThemesTable.lesson_theme_id, isouter=True)
+        .join(UnitTable, LessonThemesTable.units_id == UnitTable.units_id, isouter=True)
+        .order_by(LessonAnswerDataTable.lesson_id, LessonAnswerDataTable.lesson_answer_data_id)
+    )
+    if class_id is not None:
+        stmt = stmt.where(LessonTable.class_id == class_id)
+    if academic_year is not None:
+        stmt = stmt.where(ClassTable.academic_year == academic_year)
+    return stmt
+
+
+def _export_record(row) -> dict:
+    record = {column: getattr(row, column, None) for column in EXPORT_COLUMNS}
+    record["is_correct"] = is_answer_correct(row.answer_correctness, row.choice_number, row.correctness_number)
+    return record
+
+
+def _iter_export_batches(bind: Engine, class_id: Optional[int], academic_year: Optional[int]) -> Iterator[list]:
+    """
+    専用コネクションのサーバーサイドカーソル（yield_per）で、行をバッチ単位に読み出す。
+    """
+    with bind.connect() as conn:
+        result = conn.execution_options(
+            stream_results=True, yield_per=EXPORT_BATCH_SIZE
+        ).execute(_export_select(class_id, academic_year))
+        for rows in result.partitions():
+            yield [_export_record(row) for row in rows]
+
+
+def _stream_csv(batches: Iterator[list]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    # Excel で文字化けしないよう BOM 付き UTF-8 で出力
+    buffer.write("\ufeff")
+    writer.writeheader()
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    ParquetWriter の書き込み先。書かれたバイト列を溜め、drain() で取り出す。
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_schema():
+    return pa.schema([
+        ("academic_year", pa.int32()), ("grade", pa.int32()),
+        ("class_id", pa.int32()), ("class_name", pa.string()),
+        ("lesson_id", pa.int32()), ("date", pa.date32()), ("period", pa.int32()),
+        ("student_id", pa.int32()), ("students_number", pa.int32()), ("student_name", pa.string()),
+        ("part_name", pa.string()), ("chapter_name", pa.string()),
+        ("unit_name", pa.string()), ("lesson_theme_name", pa.string()),
+        ("question_id", pa.int32()), ("question_label", pa.string()), ("correctness_number", pa.int32()),
+        ("choice_number", pa.int32()), ("is_correct", pa.bool_()),
+        ("answer_start_unix", pa.int64()), ("answer_end_unix", pa.int64()),
+    ])
+
+
+def _stream_parquet(batches: Iterator[list]) -> Iterator[bytes]:
+    """
+    バッチごとに1つの row group として書き出し、書けた分から順に返す。
+    """
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for batch in batches:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    data = sink.drain()
+    if data:
+        yield data
+
+
+@router.get("/export")
+def export_answer_data(
+    class_id: Optional[int] = Query(None, description="クラスID"),
+    academic_year: Optional[int] = Query(None, description="年度（例: 2025）"),
+    format: str = Query("csv", pattern="^(csv|parquet)$", description="出力形式（csv / parquet）"),
+    db: Session = Depends(get_db)
+):
+    """
+    クラス単位、または年度全体の回答データを、生徒・問題・単元と結合して書き出す。
+    サーバーサイドカーソルで少しずつ読み、CSV / Parquet のチャンクとして逐次返すため、
+    件数に関わらずメモリ使用量は一定に保たれる。
+    """
+    if class_id is None and academic_year is None:
+        raise HTTPException(status_code=400, detail="class_id or academic_year must be provided")
+    if format == "parquet" and pq is None:
+        raise HTTPException(status_code=501, detail="Parquet export is not available (pyarrow is not installed)")
+
+    scope = f"class{class_id}" if class_id is not None else f"year{academic_year}"
+    batches = _iter_export_batches(db.get_bind(), class_id, academic_year)
+
+    if format == "parquet":
+        return StreamingResponse(
+            _stream_parquet(batches),
+            media_type="application/vnd.apache.parquet",
+            headers={"Content-Disposition": f'attachment; filename="answers_{scope}.parquet"'}
+        )
+
+    return StreamingResponse(
+        _stream_csv(batches),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="answers_{scope}.csv"'}
+    )
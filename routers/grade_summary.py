@@ -2,7 +2,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, case
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List
 from database import get_db
 from models import (
@@ -11,6 +11,7 @@ from models import (
     StudentTable,
     ClassTable
 )
+from services.grade_aggregates import grade_summary_cache, grade_summary_generation, store_grade_summary
 
 router = APIRouter(prefix="/grades", tags=["grades"])
 
@@ -20,7 +21,8 @@ class GradeQuestionSummary(BaseModel):
     question_label: str
     total_answers: int
     correct_answers: int
-    correct_rate: float
+    # 正解数 / 回答数（未回答は除く。/grades/item_analysis と同じ定義）
+    correct_rate: float = Field(..., description="correct_answers / total_answers * 100（未回答は除く）")
 
 class GradeSummaryResponse(BaseModel):
     academic_year: int
@@ -35,26 +37,15 @@ def get_grade_summary(
 ):
     """
     指定された年度・学年全体の設問別正答率を集計して返す。
+    クラス→生徒→回答→問題を結合した1回の集計クエリで求め、
+    結果は (academic_year, grade) ごとにキャッシュする（その学年の回答更新・授業終了で破棄）。
+    集計中に破棄された場合は、古い結果をキャッシュしない。
     """
-    # `academic_year` と `grade` の両方でクラスを絞り込み
-    class_ids = db.query(ClassTable.class_id).filter(
-        ClassTable.academic_year == academic_year,
-        ClassTable.grade == grade
-    ).all()
-    
-    if not class_ids:
-        raise HTTPException(status_code=404, detail="指定された学年のクラスが見つかりません。")
-    
-    target_class_ids = [c_id for (c_id,) in class_ids]
-
-    student_ids = db.query(StudentTable.student_id).filter(
-        StudentTable.class_id.in_(target_class_ids)
-    ).all()
-
-    if not student_ids:
-        raise HTTPException(status_code=404, detail="指定された学年の生徒が見つかりません。")
-
-    target_student_ids = [s_id for (s_id,) in student_ids]
+    cache_key = (academic_year, grade)
+    cached = grade_summary_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    generation = grade_summary_generation(cache_key)
 
     query_result = (
         db.query(
@@ -68,9 +59,13 @@ def get_grade_summary(
                 )
             ).label("correct_answers")
         )
+        .select_from(ClassTable)
+        .join(StudentTable, StudentTable.class_id == ClassTable.class_id)
+        .join(LessonAnswerDataTable, LessonAnswerDataTable.student_id == StudentTable.student_id)
         .join(LessonQuestionsTable, LessonAnswerDataTable.lesson_question_id == LessonQuestionsTable.lesson_question_id)
         .filter(
-            LessonAnswerDataTable.student_id.in_(target_student_ids),
+            ClassTable.academic_year == academic_year,
+            ClassTable.grade == grade,
             LessonAnswerDataTable.choice_number.isnot(None) # 未回答のデータは集計から除外
         )
         .group_by(
@@ -80,6 +75,27 @@ def get_grade_summary(
         .all()
     )
 
+    if not query_result:
+        # 集計結果が空の場合のみ、従来どおり原因を切り分けて404を返す
+        class_exists = db.query(ClassTable.class_id).filter(
+            ClassTable.academic_year == academic_year,
+            ClassTable.grade == grade
+        ).first()
+        if not class_exists:
+            raise HTTPException(status_code=404, detail="指定された学年のクラスが見つかりません。")
+
+        student_exists = (
+            db.query(StudentTable.student_id)
+            .join(ClassTable, StudentTable.class_id == ClassTable.class_id)
+            .filter(
+                ClassTable.academic_year == academic_year,
+                ClassTable.grade == grade
+            )
+            .first()
+        )
+        if not student_exists:
+            raise HTTPException(status_code=404, detail="指定された学年の生徒が見つかりません。")
+
     summary_list = []
     for row in query_result:
         question_id = row.lesson_question_id
@@ -96,8 +112,11 @@ def get_grade_summary(
             correct_rate=round(correct_rate, 1)
         ))
             
-    return GradeSummaryResponse(
+    response = GradeSummaryResponse(
         academic_year=academic_year,
         grade=grade,
         summary=summary_list
-    )
\ No newline at end of file
+    )
+    store_grade_summary(cache_key, generation, response)
+    return response
+
@@ -1,102 +1,160 @@
 # routers/grades.py
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
-from typing import List
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.dialects.mysql import match
+from typing import Iterator, List, Optional
+import json
 import traceback # エラー詳細出力のためインポート
 from database import get_db
 from models import (
     LessonAnswerDataTable, LessonQuestionsTable, StudentTable, LessonTable,
     LessonThemesTable, LessonSurveyTable, LessonRegistrationTable,
-    LessonThemeContentsTable, UnitTable
+    LessonThemeContentsTable, UnitTable,
+    LessonQuestionSummaryTable, LessonStudentSummaryTable, LessonSummaryStateTable, ClassTable
 )
-from schemas import GradesRawDataItem, GradesCommentsResponse, StudentComment, StudentInfo, QuestionInfo, AnswerInfo
+from schemas import (
+    GradesRawDataItem, GradesCommentsResponse, StudentComment,
+    LessonGradeSummaryResponse, LessonQuestionSummary, LessonStudentSummary,
+    ItemAnalysisResponse, ResponseTimeAnalysisResponse,
+    SurveyCommentSearchResponse, SurveyCommentHit
+)
+from services.grade_aggregates import recompute_if_lesson_ended, LESSON_STATUS_ENDED
+from services.item_analysis import load_answer_matrix, analyze_items, analyze_response_times
 
 router = APIRouter(prefix="/grades", tags=["grades"])
 
+# 生データは件数が多いため、列だけを取得してサーバーサイドカーソルで流す
+RAW_DATA_STREAM_BATCH_SIZE = 1000
+CHOICE_LABELS = {1: "A", 2: "B", 3: "C", 4: "D"}
+
+
+def _raw_data_select(lesson_ids: List[int]):
+    """
+    /grades/raw_data に必要な列だけを選択する Core SELECT を組み立てる。
+    """
+    return (
+        select(
+            LessonAnswerDataTable.lesson_id,
+            StudentTable.student_id,
+            StudentTable.name,
+            StudentTable.class_id,
+            StudentTable.students_number,
+            LessonQuestionsTable.lesson_question_id,
+            LessonQuestionsTable.lesson_question_label,
+            LessonQuestionsTable.correctness_number,
+            LessonQuestionsTable.lesson_theme_contents_id,
+            UnitTable.part_name,
+            UnitTable.chapter_name,
+            UnitTable.unit_name,
+            LessonThemesTable.lesson_theme_name,
+            LessonAnswerDataTable.choice_number,
+            LessonAnswerDataTable.answer_correctness,
+            LessonAnswerDataTable.answer_start_unix,
+            LessonAnswerDataTable.answer_end_unix,
+        )
+        .select_from(LessonAnswerDataTable)
+        .join(StudentTable, LessonAnswerDataTable.student_id == StudentTable.student_id)
+        .join(LessonQuestionsTable, LessonAnswerDataTable.lesson_question_id == LessonQuestionsTable.lesson_question_id)
+        .join(LessonThemesTable, LessonAnswerDataTable.lesson_theme_id == LessonThemesTable.lesson_theme_id, isouter=True)
+        .join(UnitTable, LessonThemesTable.units_id == UnitTable.units_id, isouter=True)
+        .where(LessonAnswerDataTable.lesson_id.in_(lesson_ids))
+        .order_by(LessonAnswerDataTable.lesson_id, LessonAnswerDataTable.lesson_answer_data_id)
+    )
+
+
+def _raw_data_item(row) -> dict:
+    """
+    1行分を GradesRawDataItem と同じ形の dict に変換する。
+    """
+    selected_choice = CHOICE_LABELS.get(row.choice_number)
+    correct_choice = CHOICE_LABELS.get(row.correctness_number) if row.correctness_number is not None else None
+
+    is_correct_val = None
+    if row.answer_correctness is not None:
+        is_correct_val = bool(row.answer_correctness)
+    elif selected_choice is not None and correct_choice is not None:
+        is_correct_val = (selected_choice == correct_choice)
+
+    return {
+        "lesson_id": row.lesson_id,
+        "student": {
+            "student_id": row.student_id,
+            "name": row.name or "名前なし",
+            "class_id": row.class_id,
+            "students_number": row.students_number,
+        },
+        "question": {
+            "question_id": row.lesson_question_id,
+            "question_label": row.lesson_question_label or f"問{row.lesson_question_id}",
+            "correct_choice": correct_choice or "B",
+            "part_name": row.part_name,
+            "chapter_name": row.chapter_name,
+            "unit_name": row.unit_name,
+            "lesson_theme_name": row.lesson_theme_name,
+            "lesson_theme_contents_id": row.lesson_theme_contents_id,
+        },
+        "answer": {
+            "selected_choice": selected_choice,
+            "is_correct": is_correct_val,
+            "start_unix": row.answer_start_unix,
+            "end_unix": row.answer_end_unix,
+        },
+    }
+
+
+def _stream_raw_data(bind: Engine, lesson_ids: List[int]) -> Iterator[str]:
+    """
+    JSON配列をバッチ単位で書き出すジェネレータ。
+    リクエストのセッションとは別に専用コネクションを開き、
+    stream_results（サーバーサイドカーソル）で行を少しずつ読む。
+    """
+    with bind.connect() as conn:
+        result = conn.execution_options(
+            stream_results=True, yield_per=RAW_DATA_STREAM_BATCH_SIZE
+        ).execute(_raw_data_select(lesson_ids))
+
+        yield "["
+        first = True
+        for rows in result.partitions():
+            chunk = ",".join(json.dumps(_raw_data_item(row), ensure_ascii=False) for row in rows)
+            if not chunk:
+                continue
+            yield chunk if first else "," + chunk
+            first = False
+        yield "]"
+
+
+# StreamingResponse を返すため response_model による検証は行われない（OpenAPI のスキーマ記載用）
 @router.get("/raw_data", response_model=List[GradesRawDataItem])
 def get_grades_raw_data(
-    lesson_id: int = Query(..., description="授業ID（必須）"),
+    lesson_id: Optional[int] = Query(None, description="授業ID"),
+    lesson_ids: Optional[List[int]] = Query(None, description="授業IDの複数指定（lesson_id と併用可）"),
     db: Session = Depends(get_db)
 ):
-    
+    """
+    授業ごとの回答生データを返す。
+    必要な列だけを取得し、ORM・Pydantic を経由せず JSON をストリーミングで返す。
+    lesson_ids を複数指定すると、複数授業分をまとめて返す（各要素の lesson_id で授業を区別する）。
+    """
+    target_lesson_ids = list(dict.fromkeys(([lesson_id] if lesson_id is not None else []) + (lesson_ids or [])))
+    if not target_lesson_ids:
+        raise HTTPException(status_code=400, detail="lesson_id or lesson_ids must be provided")
+
     try:
-        lesson = db.query(LessonTable).filter(LessonTable.lesson_id == lesson_id).first()
-        if not lesson:
+        found = db.query(LessonTable.lesson_id).filter(LessonTable.lesson_id.in_(target_lesson_ids)).all()
+        if len(found) != len(target_lesson_ids):
             raise HTTPException(status_code=404, detail="Lesson not found")
 
-        answer_data_list = (
-            db.query(LessonAnswerDataTable)
-            .join(StudentTable, LessonAnswerDataTable.student_id == StudentTable.student_id)
-            .join(LessonQuestionsTable, LessonAnswerDataTable.lesson_question_id == LessonQuestionsTable.lesson_question_id)
-            .join(LessonThemesTable, LessonAnswerDataTable.lesson_theme_id == LessonThemesTable.lesson_theme_id, isouter=True)
-            .join(UnitTable, LessonThemesTable.units_id == UnitTable.units_id, isouter=True)
-            .filter(LessonAnswerDataTable.lesson_id == lesson_id)
-            .options(
-                joinedload(LessonAnswerDataTable.student),
-                joinedload(LessonAnswerDataTable.lesson_question),
-                joinedload(LessonAnswerDataTable.lesson_theme).joinedload(LessonThemesTable.unit)
-            )
-            .all()
+        return StreamingResponse(
+            _stream_raw_data(db.get_bind(), target_lesson_ids),
+            media_type="application/json"
         )
 
-        if not answer_data_list:
-            return []
-
-        result = []
-        
-        for i, ad in enumerate(answer_data_list):
-            
-            student = ad.student
-            question = ad.lesson_question
-            theme = ad.lesson_theme
-            unit = theme.unit if theme else None
-
-            if not student or not question:
-                continue
-            
-            choice_labels = {1: "A", 2: "B", 3: "C", 4: "D"}
-            selected_choice = choice_labels.get(ad.choice_number)
-            
-            correct_choice_num = question.correctness_number
-            correct_choice = choice_labels.get(correct_choice_num) if correct_choice_num is not None else None
-
-            is_correct_val = None
-            if ad.answer_correctness is not None:
-                is_correct_val = ad.answer_correctness
-            elif selected_choice is not None and correct_choice is not None:
-                is_correct_val = (selected_choice == correct_choice)
-            
-            student_name = student.name or "名前なし" 
-
-            result.append(GradesRawDataItem(
-                student=StudentInfo(
-                    student_id=student.student_id,
-                    name=student_name,
-                    class_id=student.class_id,
-                    # ▼▼▼▼▼ 【修正】エラーログに基づき、不足していた students_number を追加 ▼▼▼▼▼
-                    students_number=student.students_number
-                    # ▲▲▲▲▲ 【修正】 ▲▲▲▲▲
-                ),
-                question=QuestionInfo(
-                    question_id=question.lesson_question_id,
-                    question_label=question.lesson_question_label or f"問{question.lesson_question_id}",
-                    correct_choice=correct_choice or "B", 
-                    part_name=unit.part_name if unit else None,
-                    chapter_name=unit.chapter_name if unit else None,
-                    unit_name=unit.unit_name if unit else None,
-                    lesson_theme_name=theme.lesson_theme_name if theme else None,
-                    lesson_theme_contents_id=question.lesson_theme_contents_id
-                ),
-                answer=AnswerInfo(
-                    selected_choice=selected_choice,
-                    is_correct=is_correct_val,
-                    start_unix=ad.answer_start_unix,
-                    end_unix=ad.answer_end_unix
-                )
-            ))
-        
-        return result
-
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"!!! /grades/raw_data エラー発生 !!!: {e}")
         traceback.print_exc()
@@ -145,4 +203,230 @@ def get_grades_comments(
     except Exception as e:
         print(f"!!! /grades/comments エラー発生 !!!: {e}")
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
+
+@router.get("/comments/search", response_model=SurveyCommentSearchResponse)
+def search_grades_comments(
+    q: str = Query(..., min_length=2, max_length=100, description="検索語（2文字以上）"),
+    lesson_id: Optional[int] = Query(None, description="授業ID（オプション）"),
+    class_id: Optional[int] = Query(None, description="クラスID（オプション）"),
+    academic_year: Optional[int] = Query(None, description="年度（オプション）"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """
+    アンケートコメントを授業・クラス・年度をまたいで全文検索し、関連度順に返す。
+    lesson_survey_table.student_comment の FULLTEXT (ngram) インデックスを使う。
+    """
+    try:
+        relevance = match(LessonSurveyTable.student_comment, against=q).in_natural_language_mode()
+
+        query = (
+            db.query(
+                LessonSurveyTable.lesson_survey_id,
+                LessonSurveyTable.lesson_id,
+                LessonSurveyTable.student_id,
+                StudentTable.name,
+                StudentTable.class_id,
+                ClassTable.class_name,
+                LessonSurveyTable.student_comment,
+                relevance.label("score"),
+            )
+            .join(StudentTable, LessonSurveyTable.student_id == StudentTable.student_id)
+            .join(ClassTable, StudentTable.class_id == ClassTable.class_id)
+            .filter(relevance)
+        )
+        if lesson_id is not None:
+            query = query.filter(LessonSurveyTable.lesson_id == lesson_id)
+        if class_id is not None:
+            query = query.filter(StudentTable.class_id == class_id)
+        if academic_year is not None:
+            query = query.filter(ClassTable.academic_year == academic_year)
+
+        # 1件多く取得して次ページの有無を判定
+        rows = (
+            query.order_by(relevance.desc(), LessonSurveyTable.lesson_survey_id.desc())
+            .offset(offset)
+            .limit(limit + 1)
+            .all()
+        )
+
+        hits = [
+            SurveyCommentHit(
+                lesson_survey_id=row.lesson_survey_id,
+                lesson_id=row.lesson_id,
+                student_id=row.student_id,
+                student_name=row.name,
+                class_id=row.class_id,
+                class_name=row.class_name,
+                comment_text=row.student_comment,
+                score=float(row.score)
+            )
+            for row in rows[:limit]
+        ]
+
+        return SurveyCommentSearchResponse(query=q, hits=hits, has_next=len(rows) > limit)
+
+    except Exception as e:
+        print(f"!!! /grades/comments/search エラー発生 !!!: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
+
+
+@router.get("/lesson_summary", response_model=LessonGradeSummaryResponse)
+def get_lesson_grade_summary(
+    lesson_id: int = Query(..., description="授業ID（必須）"),
+    db: Session = Depends(get_db)
+):
+    """
+    授業終了時に集計済みの設問別・生徒別サマリーを返す。
+    回答データを再集計せず、サマリーテーブルだけを読む。
+    （サマリーが無い授業（導入前に終了した授業・終了時の集計に失敗した授業）は、
+    初回アクセス時に専用セッションで集計・保存してから読む。
+    回答0件の授業は集計済みの記録だけが残るため、2回目以降は集計し直さない）
+    """
+    try:
+        lesson = db.query(LessonTable.lesson_status).filter(LessonTable.lesson_id == lesson_id).first()
+        if not lesson:
+            raise HTTPException(status_code=404, detail="Lesson not found")
+        if lesson.lesson_status != LESSON_STATUS_ENDED:
+            raise HTTPException(status_code=409, detail="Lesson has not ended yet")
+
+        def load_question_rows():
+            return (
+                db.query(LessonQuestionSummaryTable, LessonQuestionsTable.lesson_question_label)
+                .join(LessonQuestionsTable, LessonQuestionSummaryTable.lesson_question_id == LessonQuestionsTable.lesson_question_id)
+                .filter(LessonQuestionSummaryTable.lesson_id == lesson_id)
+                .order_by(LessonQuestionSummaryTable.lesson_theme_id, LessonQuestionSummaryTable.lesson_question_id)
+                .all()
+            )
+
+        question_rows = load_question_rows()
+        computed = question_rows or (
+            db.query(LessonSummaryStateTable.lesson_id)
+            .filter(LessonSummaryStateTable.lesson_id == lesson_id)
+            .first()
+        )
+        if not computed:
+            recompute_if_lesson_ended(lesson_id)
+            # 読み取りのトランザクションを終えて、別セッションで保存した行が見えるようにする
+            db.rollback()
+            question_rows = load_question_rows()
+
+        student_rows = (
+            db.query(LessonStudentSummaryTable)
+            .filter(LessonStudentSummaryTable.lesson_id == lesson_id)
+            .order_by(LessonStudentSummaryTable.student_id)
+            .all()
+        )
+
+        questions = [
+            LessonQuestionSummary(
+                question_id=q.lesson_question_id,
+                question_label=label or f"問{q.lesson_question_id}",
+                lesson_theme_id=q.lesson_theme_id,
+                total_students=q.total_students,
+                answer_count=q.answer_count,
+                correct_count=q.correct_count,
+                correct_rate=round(q.correct_count / q.total_students * 100, 1) if q.total_students else 0,
+                mean_response_sec=q.mean_response_sec,
+                median_response_sec=q.median_response_sec,
+                choice_distribution={
+                    1: q.choice1_count, 2: q.choice2_count,
+                    3: q.choice3_count, 4: q.choice4_count,
+                },
+            )
+            for q, label in question_rows
+        ]
+        students = [
+            LessonStudentSummary(
+                student_id=s.student_id,
+                question_count=s.question_count,
+                answered_count=s.answered_count,
+                correct_count=s.correct_count,
+                score=s.score,
+                completion_rate=s.completion_rate,
+            )
+            for s in student_rows
+        ]
+
+        return LessonGradeSummaryResponse(
+            lesson_id=lesson_id,
+            computed_at=question_rows[0][0].computed_at if question_rows else None,
+            questions=questions,
+            students=students
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        print(f"!!! /grades/lesson_summary エラー発生 !!!: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
+
+
+@router.get("/item_analysis", response_model=ItemAnalysisResponse)
+def get_item_analysis(
+    lesson_id: Optional[int] = Query(None, description="授業ID"),
+    units_id: Optional[int] = Query(None, description="単元ID（単元全体の授業を対象にする）"),
+    db: Session = Depends(get_db)
+):
+    """
+    設問分析（正答率・識別力・選択肢分布・回答時間）と生徒別得点を返す。
+    回答を 生徒 × 問題 の行列に展開し、NumPy でまとめて計算する。
+    """
+    if lesson_id is None and units_id is None:
+        raise HTTPException(status_code=400, detail="lesson_id or units_id must be provided")
+
+    try:
+        matrix = load_answer_matrix(db, lesson_id=lesson_id, units_id=units_id)
+        analysis = analyze_items(matrix)
+
+        return ItemAnalysisResponse(
+            lesson_id=lesson_id,
+            units_id=units_id,
+            student_count=len(matrix.student_ids),
+            question_count=len(matrix.question_ids),
+            items=analysis["items"],
+            students=analysis["students"]
+        )
+
+    except Exception as e:
+        print(f"!!! /grades/item_analysis エラー発生 !!!: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
+
+
+
+@router.get("/response_times", response_model=ResponseTimeAnalysisResponse)
+def get_response_time_analysis(
+    lesson_id: Optional[int] = Query(None, description="授業ID"),
+    units_id: Optional[int] = Query(None, description="単元ID（単元全体の授業を対象にする）"),
+    fast_threshold_sec: float = Query(3.0, ge=0, description="これ未満の回答時間を「速すぎる回答」とする（秒）"),
+    db: Session = Depends(get_db)
+):
+    """
+    設問別・生徒別の回答時間（中央値・p90）と、速すぎる/遅すぎる回答を返す。
+    answer_start_unix / answer_end_unix から、回答行列を使ってサーバー側で計算する。
+    """
+    if lesson_id is None and units_id is None:
+        raise HTTPException(status_code=400, detail="lesson_id or units_id must be provided")
+
+    try:
+        matrix = load_answer_matrix(db, lesson_id=lesson_id, units_id=units_id)
+        analysis = analyze_response_times(matrix, fast_threshold_sec=fast_threshold_sec)
+
+        return ResponseTimeAnalysisResponse(
+            lesson_id=lesson_id,
+            units_id=units_id,
+            fast_threshold_sec=fast_threshold_sec,
+            questions=analysis["questions"],
+            students=analysis["students"]
+        )
+
+    except Exception as e:
+        print(f"!!! /grades/response_times エラー発生 !!!: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
@@ -1,27 +1,27 @@
 ####### lecture_videos.py
 
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from database import get_db
 from models import LectureVideosTable, LessonThemesTable
-from schemas import LectureVideo
-from services.azure_blob import upload_file_to_blob, delete_file_from_blob
+from schemas import LectureVideo, LectureVideoUploadSlotResponse, LectureVideoFinalize
+from services.azure_blob import (
+    upload_stream_to_blob_async,
+    create_upload_sas, sign_upload_slot, verify_upload_slot, blob_exists_async, is_valid_blob_name, get_blob_url,
+)
+from services.blob_deletions import enqueue_blob_deletion, reconcile_container, wake_blob_deletion_worker
+from services.content_cache import invalidate_content_cache
+from services.etag import json_etag_response
 
 router = APIRouter(prefix="/lecture_videos", tags=["lecture_videos"])
 
 
-@router.post("/", response_model=LectureVideo)
-def create_lecture_video(
-    lesson_theme_id: int,
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db)
-):
+def _get_theme_without_video(db: Session, lesson_theme_id: int) -> LessonThemesTable:
     """
-    1テーマ1動画の運用を想定。
-    - すでに同じ lesson_theme_id で動画があればエラー(400)
-    - 利用者は先に DELETE で既存動画を削除し、新規登録を行う流れ
+    動画を登録できるテーマか確認して返す（1テーマ1動画）。
     """
     # 既に登録済みかどうかを確認
     existing_video = db.query(LectureVideosTable).filter(
@@ -40,37 +40,118 @@ def create_lecture_video(
     ).first()
     if not lesson_theme:
         raise HTTPException(status_code=404, detail="Lesson theme not found")
+    return lesson_theme
 
-    # Blob へアップロード
-    file_data = file.file.read()
-    blob_url = upload_file_to_blob(file_data, file.filename)
 
-    # DB 登録
+def _get_theme_for_uploaded_blob(db: Session, lesson_theme_id: int, blob_name: str) -> LessonThemesTable:
+    """
+    finalize 用。テーマの確認に加え、同じ Blob が他の動画で登録済みでないか確認する。
+    """
+    lesson_theme = _get_theme_without_video(db, lesson_theme_id)
+    registered = db.query(LectureVideosTable.lecture_video_id).filter(
+        LectureVideosTable.video_url == get_blob_url(blob_name)
+    ).first()
+    if registered:
+        raise HTTPException(status_code=409, detail="Blob is already registered to another video")
+    return lesson_theme
+
+
+def _register_video(db: Session, lesson_theme: LessonThemesTable, blob_url: str) -> LectureVideosTable:
     new_video = LectureVideosTable(
-        lesson_theme_id=lesson_theme_id,
+        lesson_theme_id=lesson_theme.lesson_theme_id,
         lecture_video_title=lesson_theme.lesson_theme_name,  # タイトルはテーマ名を流用する例
         video_url=blob_url
     )
     db.add(new_video)
     db.commit()
     db.refresh(new_video)
-
+    invalidate_content_cache()
     return new_video
 
 
+@router.post("/", response_model=LectureVideo)
+async def create_lecture_video(
+    lesson_theme_id: int,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    """
+    1テーマ1動画の運用を想定。
+    - すでに同じ lesson_theme_id で動画があればエラー(400)
+    - 利用者は先に DELETE で既存動画を削除し、新規登録を行う流れ
+    - 大きな動画は upload_slot → 直接アップロード → finalize の流れを推奨
+    Blob への送信は非同期クライアントで行い、DB 処理だけをスレッドプールで実行する。
+    """
+    lesson_theme = await run_in_threadpool(_get_theme_without_video, db, lesson_theme_id)
+
+    # Blob へアップロード（一時ファイルからブロック単位で並列に送信し、全体をメモリに載せない）
+    blob_url = await upload_stream_to_blob_async(file.read, file.filename)
+
+    # DB 登録
+    return await run_in_threadpool(_register_video, db, lesson_theme, blob_url)
+
+
+@router.post("/upload_slot", response_model=LectureVideoUploadSlotResponse)
+def create_upload_slot(
+    lesson_theme_id: int,
+    filename: str,
+    db: Session = Depends(get_db)
+):
+    """
+    動画を Blob へ直接アップロードするための枠を払い出す（手順1）。
+    返された upload_url に、ヘッダー x-ms-blob-type: BlockBlob を付けて PUT する
+    （大きなファイルは Put Block / Put Block List で分割してもよい）。
+    アップロード後、blob_name と upload_token を指定して /lecture_videos/finalize を呼ぶ。
+    """
+    _get_theme_without_video(db, lesson_theme_id)
+    try:
+        blob_name, upload_url, expires_at = create_upload_sas(filename)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return LectureVideoUploadSlotResponse(
+        blob_name=blob_name,
+        upload_url=upload_url,
+        expires_at=expires_at,
+        upload_token=sign_upload_slot(lesson_theme_id, blob_name, expires_at),
+    )
+
+
+@router.post("/finalize", response_model=LectureVideo)
+async def finalize_lecture_video(
+    body: LectureVideoFinalize,
+    db: Session = Depends(get_db)
+):
+    """
+    直接アップロードした動画を登録する（手順2）。
+    同じテーマに対して払い出した枠（upload_token）か、Blob が他の動画で登録済みでないかを確認し、
+    Blob が存在することを確かめてから lecture_videos_table に登録する。
+    """
+    if not is_valid_blob_name(body.blob_name):
+        raise HTTPException(status_code=400, detail="Invalid blob_name")
+    if not verify_upload_slot(body.upload_token, body.lesson_theme_id, body.blob_name):
+        raise HTTPException(status_code=403, detail="Upload slot is invalid or expired")
+    lesson_theme = await run_in_threadpool(_get_theme_for_uploaded_blob, db, body.lesson_theme_id, body.blob_name)
+    if not await blob_exists_async(body.blob_name):
+        raise HTTPException(status_code=409, detail="Blob has not been uploaded yet")
+
+    return await run_in_threadpool(_register_video, db, lesson_theme, get_blob_url(body.blob_name))
+
+
 @router.get("/", response_model=List[LectureVideo])
 def list_lecture_videos(
+    request: Request,
     lesson_theme_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
     """
     指定された theme_id の動画をリストで返す。
     1テーマ1動画運用でも、リスト形式で返して問題ありません。
+    ETag は本文のハッシュで、If-None-Match が一致する場合は 304 を返す。
     """
     query = db.query(LectureVideosTable)
     if lesson_theme_id is not None:
         query = query.filter(LectureVideosTable.lesson_theme_id == lesson_theme_id)
-    return query.all()
+    return json_etag_response(request, [LectureVideo.model_validate(v) for v in query.all()])
 
 
 @router.delete("/{lecture_video_id}")
@@ -80,7 +161,7 @@ def delete_lecture_video(
 ):
     """
     - 指定した動画レコードを DB から削除
-    - Blob 上のファイルも削除
+    - Blob 上のファイルは削除キューに積み、バックグラウンドで削除する（失敗時はリトライ）
     """
     video = db.query(LectureVideosTable).filter(
         LectureVideosTable.lecture_video_id == lecture_video_id
@@ -88,12 +169,28 @@ def delete_lecture_video(
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
 
-    # DB 削除
+    # DB 削除と Blob の削除予約を同じトランザクションで行う
     db.delete(video)
+    enqueue_blob_deletion(db, video.video_url)
     db.commit()
-
-    # Blob 削除
-    if video.video_url:
-        delete_file_from_blob(video.video_url)
+    invalidate_content_cache()
+    wake_blob_deletion_worker()
 
     return {"message": f"Deleted lecture video id={lecture_video_id}"}
+
+
+@router.post("/reconcile")
+def reconcile_lecture_video_blobs():
+    """
+    コンテナと lecture_videos_table を突き合わせる（通常はバックグラウンドで定期実行）。
+    どの動画からも参照されない古い Blob を削除キューに積み、Blob が無い動画の ID を返す。
+    URL 形式を判別できない動画があれば突き合わせを中止し、409 で該当 ID を返す。
+    """
+    try:
+        result = reconcile_container()
+    except Exception as e:
+        print(f"[lecture_videos] reconcile failed: {e}")
+        raise HTTPException(status_code=502, detail="Failed to list blob container")
+    if result["aborted"]:
+        raise HTTPException(status_code=409, detail=result)
+    return result
@@ -1,5 +1,5 @@
 # routers/lesson_attendance.py
-from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, BackgroundTasks
 from sqlalchemy.orm import Session
 from database import get_db
 from models import (
@@ -8,8 +8,13 @@ from models import (
     ClassTable,LessonThemeContentsTable
 )
 from schemas import LessonCalendarResponse, LessonInformationResponse, AttendanceCreate, LessonThemeBlock
-from typing import List
+from typing import List, Optional
+from datetime import date
 from sqlalchemy import func
+from services.calendar_window import apply_calendar_window, format_calendar_cursor
+from services.roster_cache import get_student
+from services.grade_aggregates import mark_lesson_started
+from services.etag import json_etag_response
 
 router = APIRouter(
     prefix="/lesson_attendance",
@@ -17,11 +22,25 @@ router = APIRouter(
 )
 
 @router.get("/calendar", response_model=List[LessonCalendarResponse])
-def get_lesson_attendance_calendar(db: Session = Depends(get_db)):
+def get_lesson_attendance_calendar(
+    request: Request,
+    class_id: Optional[int] = Query(None, description="クラスID（オプション）"),
+    student_id: Optional[int] = Query(None, description="生徒ID（所属クラスの授業に絞り込む）"),
+    date_from: Optional[date] = Query(None, alias="from", description="開始日（この日を含む）"),
+    date_to: Optional[date] = Query(None, alias="to", description="終了日（この日を含む）"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="1ページの件数（指定時のみページング）"),
+    cursor: Optional[str] = Query(None, description="前ページの X-Next-Cursor"),
+    db: Session = Depends(get_db)
+):
     """
     生徒のスマホアプリ。講義からカレンダーに入る
+    from/to で表示する月などの期間に、class_id / student_id で自分のクラスの授業に絞り込める。
+    limit 指定時は次ページのカーソルを X-Next-Cursor ヘッダーで返す。
+    ETag は本文のハッシュで、If-None-Match が一致する場合は 304 を返す。
     """
-    results = (
+    headers = {}
+
+    query = (
         db.query(
             TimetableTable.timetable_id,
             TimetableTable.date,
@@ -36,13 +55,28 @@ def get_lesson_attendance_calendar(db: Session = Depends(get_db)):
         )
         .join(LessonTable, TimetableTable.timetable_id == LessonTable.timetable_id)
         .join(ClassTable, LessonTable.class_id == ClassTable.class_id) # ClassTableをJOIN
-        .all()
     )
     
+    if class_id is not None:
+        query = query.filter(LessonTable.class_id == class_id)
+    
+    # student_idが指定されていれば所属クラスでフィルタリング
+    if student_id is not None:
+        student = get_student(db, student_id)
+        if student is None:
+            raise HTTPException(status_code=404, detail="Student not found")
+        query = query.filter(LessonTable.class_id == student.class_id)
+    
+    results = apply_calendar_window(query, date_from, date_to, cursor, limit).all()
+    
+    if limit is not None and len(results) > limit:
+        results = results[:limit]
+        headers["X-Next-Cursor"] = format_calendar_cursor(results[-1])
+    
     # delivery_statusは別途取得する必要がある場合は追加
-    response = []
+    calendar = []
     for row in results:
-        response.append(LessonCalendarResponse(
+        calendar.append(LessonCalendarResponse(
             timetable_id=row.timetable_id,
             date=row.date,
             day_of_week=row.day_of_week,
@@ -56,7 +90,7 @@ def get_lesson_attendance_calendar(db: Session = Depends(get_db)):
             lesson_status=bool(row.lesson_status == 2 or row.lesson_status == 3) if row.lesson_status else False
         ))
     
-    return response
+    return json_etag_response(request, calendar, headers)
 
 @router.get("/lesson_information", response_model=LessonInformationResponse)
 def get_lesson_information(lesson_id: int = Query(...), db: Session = Depends(get_db)):
@@ -160,6 +194,7 @@ def update_lesson_status_and_get_info(
     # ステータス更新
     lesson.lesson_status = 2  # ACTIVE
     db.commit()
+    mark_lesson_started(lesson_id)
     db.refresh(lesson)
     
     background_tasks.add_task(broadcast_lesson_status_update, lesson_id)
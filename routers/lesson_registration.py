@@ -1,15 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import Engine
+from typing import Iterator, List, Optional
+from collections import Counter
+from datetime import date, timedelta
 from database import get_db
-from models import MaterialTable, UnitTable, LessonThemesTable, TimetableTable, LessonTable, LessonRegistrationTable, ClassTable, LessonQuestionsTable, LessonThemeContentsTable
+from models import MaterialTable, UnitTable, LessonThemesTable, TimetableTable, LessonTable, LessonRegistrationTable, ClassTable
 from schemas import (
     MaterialWithUnits, UnitWithThemes, LessonThemeBase, 
     TimetableCreate, TimetableResponse,
+    TimetableBulkCreate, TimetableBulkResponse,
     LessonRegistrationResponse, LessonRegistrationCreate,
     LessonRegistrationCalendarResponse
 )
+from services.question_cache import get_questions_by_theme
+from services.content_cache import catalog_selects, get_catalog_json
+from services.calendar_window import apply_calendar_window, format_calendar_cursor
+from services.roster_cache import get_student
+from services.etag import etag_response, json_etag_response
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+import json
 import logging
 
 # ログの設定
@@ -21,6 +34,12 @@ router = APIRouter(
     tags=["lesson_registration"]
 )
 
+# 一括登録で展開する期間の上限（1年度分 + 余裕）
+MAX_BULK_TIMETABLE_DAYS = 400
+
+# /all の絞り込み結果をサーバーサイドカーソルから1回に読む行数
+CATALOG_STREAM_BATCH_SIZE = 500
+
 @router.post("/calendar", response_model=TimetableResponse)
 def create_timetable_entry(
     timetable_data: TimetableCreate, db: Session = Depends(get_db)
@@ -36,13 +55,15 @@ def create_timetable_entry(
             raise HTTPException(status_code=500, detail="Database connection error")
         
         # 既存の時間割エントリをチェック
-        existing_entry = db.query(TimetableTable).filter(
-            TimetableTable.date == timetable_data.date,
-            TimetableTable.day_of_week == timetable_data.day_of_week,
-            TimetableTable.period == timetable_data.period,
-            TimetableTable.time == timetable_data.time
-        ).first()
-        
+        def find_existing():
+            return db.query(TimetableTable).filter(
+                TimetableTable.date == timetable_data.date,
+                TimetableTable.day_of_week == timetable_data.day_of_week,
+                TimetableTable.period == timetable_data.period,
+                TimetableTable.time == timetable_data.time
+            ).first()
+
+        existing_entry = find_existing()
         if existing_entry:
             logger.info(f"既存エントリが見つかりました: {existing_entry}")
             return jsonable_encoder(existing_entry)
@@ -50,7 +71,12 @@ def create_timetable_entry(
         # 新規作成
         new_entry = TimetableTable(**timetable_data.dict())
         db.add(new_entry)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            # 同じ枠が他のリクエストで先に作成された（枠の一意制約）
+            db.rollback()
+            return jsonable_encoder(find_existing())
         db.refresh(new_entry)
         
         logger.info(f"新規登録完了: {new_entry}")
@@ -59,39 +85,165 @@ def create_timetable_entry(
         logger.error(f"エラー発生: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+@router.post("/calendar/bulk", response_model=TimetableBulkResponse)
+def create_timetable_entries_bulk(
+    bulk_data: TimetableBulkCreate, db: Session = Depends(get_db)
+):
+    """
+    学期の期間と週ごとのコマ割りから時間割を一括登録する。
+    既に同じ (date, day_of_week, period, time) の枠があればそれを再利用し、
+    無い枠だけを複数行の INSERT IGNORE でまとめて作成する
+    （枠の一意制約により、同時に実行されても同じ枠は1件しか作られない）。
+    """
+    if bulk_data.end_date < bulk_data.start_date:
+        raise HTTPException(status_code=400, detail="end_date は start_date 以降を指定してください")
+    if (bulk_data.end_date - bulk_data.start_date).days > MAX_BULK_TIMETABLE_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"一度に登録できる期間は {MAX_BULK_TIMETABLE_DAYS} 日までです"
+        )
+
+    try:
+        # 期間内の全コマを展開
+        patterns_by_weekday = {}
+        for pattern in bulk_data.patterns:
+            patterns_by_weekday.setdefault(pattern.weekday, []).append(pattern)
+
+        excluded = set(bulk_data.exclude_dates)
+        slots = []
+        current = bulk_data.start_date
+        while current <= bulk_data.end_date:
+            if current not in excluded:
+                for pattern in patterns_by_weekday.get(current.weekday(), []):
+                    slots.append((current, pattern.day_of_week, pattern.period, pattern.time))
+            current += timedelta(days=1)
+
+        if not slots:
+            return TimetableBulkResponse(total=0, created=0, timetables=[])
+
+        def load_existing():
+            # (date, period) インデックスで期間内の枠だけを取得 (クエリ x 1)
+            rows = (
+                db.query(TimetableTable)
+                .filter(
+                    TimetableTable.date >= bulk_data.start_date,
+                    TimetableTable.date <= bulk_data.end_date,
+                )
+                .all()
+            )
+            existing = {}
+            for row in rows:
+                existing.setdefault((row.date, row.day_of_week, row.period, row.time), row)
+            return existing
+
+        existing = load_existing()
+        missing = list(dict.fromkeys(slot for slot in slots if slot not in existing))
+
+        # 無い枠だけを複数行INSERTで一括作成 (クエリ x 1)
+        # 読み込み後に他のリクエストが作成した枠は、一意制約により飛ばされる
+        created = 0
+        if missing:
+            # 作成件数（rowcount）を得るため、ORM の一括INSERTではなくコネクションで実行する
+            result = db.connection().execute(
+                insert(TimetableTable)
+                .prefix_with("IGNORE", dialect="mysql")
+                .prefix_with("OR IGNORE", dialect="sqlite"),
+                [
+                    {"date": d, "day_of_week": dow, "period": period, "time": time}
+                    for d, dow, period, time in missing
+                ]
+            )
+            created = result.rowcount
+            db.commit()
+            existing = load_existing()
+
+        timetables = [TimetableResponse.model_validate(existing[slot]) for slot in dict.fromkeys(slots)]
+        logger.info(f"時間割一括登録: 対象{len(timetables)}件 / 新規{created}件")
+
+        return TimetableBulkResponse(
+            total=len(timetables),
+            created=created,
+            timetables=timetables
+        )
+    except Exception as e:
+        db.rollback()
+        logger.error(f"エラー発生: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+def _stream_catalog(
+    bind: Engine,
+    material_id: Optional[int],
+    units_id: Optional[int],
+    after_lesson_theme_id: Optional[int],
+    limit: Optional[int],
+) -> Iterator[str]:
+    """
+    絞り込んだ教材・単元・授業テーマを JSON で逐次書き出すジェネレータ。
+    授業テーマは専用コネクションのサーバーサイドカーソルで少しずつ読む。
+    """
+    materials_stmt, units_stmt, themes_stmt = catalog_selects(material_id, units_id, after_lesson_theme_id, limit)
+    with bind.connect() as conn:
+        materials = [dict(row) for row in conn.execute(materials_stmt).mappings()]
+        yield '{"materials":' + json.dumps(materials, ensure_ascii=False)
+        units = [dict(row) for row in conn.execute(units_stmt).mappings()]
+        yield ',"units":' + json.dumps(units, ensure_ascii=False)
+
+        result = conn.execution_options(
+            stream_results=True, yield_per=CATALOG_STREAM_BATCH_SIZE
+        ).execute(themes_stmt)
+        yield ',"lesson_themes":['
+        count = 0
+        has_next = False
+        last_theme_id = None
+        for rows in result.mappings().partitions():
+            items = [dict(row) for row in rows]
+            if limit is not None and count + len(items) > limit:
+                # SELECT は limit + 1 件取るので、はみ出した分があれば次ページあり
+                items = items[:limit - count]
+                has_next = True
+            if items:
+                chunk = ",".join(json.dumps(item, ensure_ascii=False) for item in items)
+                yield chunk if count == 0 else "," + chunk
+                count += len(items)
+                last_theme_id = items[-1]["lesson_theme_id"]
+            if has_next:
+                break
+        next_cursor = last_theme_id if has_next else None
+        yield '],"next_cursor":' + json.dumps(next_cursor) + "}"
+
+
 @router.get("/all")
-def get_all_lesson_data(db: Session = Depends(get_db)):
+def get_all_lesson_data(
+    request: Request,
+    material_id: Optional[int] = Query(None, description="教材IDで絞り込み"),
+    units_id: Optional[int] = Query(None, description="単元IDで絞り込み"),
+    after_lesson_theme_id: Optional[int] = Query(None, description="前ページの next_cursor（授業テーマID）"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="授業テーマの1ページの件数"),
+    db: Session = Depends(get_db)
+):
     """
-    materials_table, units_table, lesson_themes_table の全データを取得
+    materials_table, units_table, lesson_themes_table のデータを取得
+    - 条件指定なし: 全件ダンプ（作成済みのJSONをキャッシュから返す）
+    - material_id / units_id / limit 指定: 必要な列だけを絞り込んでストリーミングで返す
+      （授業テーマは lesson_theme_id 順。続きは next_cursor を after_lesson_theme_id に指定）
+    全件ダンプは ETag（キャッシュした本文のハッシュ）を付け、If-None-Match が一致する場合は 304 を返す。
     """
     try:
-        logger.info("全ての教材データを取得開始")
-        
-        materials = db.query(MaterialTable).all()
-        units = db.query(UnitTable).all()
-        lesson_themes = db.query(LessonThemesTable).all()
-        
-        if not materials and not units and not lesson_themes:
-            logger.warning("取得できるデータがありません")
-            return {"message": "No data available"}
-        
-        # SQLAlchemy オブジェクトを辞書型に変換
-        materials_list = [m.__dict__ for m in materials]
-        units_list = [u.__dict__ for u in units]
-        lesson_themes_list = [lt.__dict__ for lt in lesson_themes]
-        
-        # _sa_instance_state を削除
-        for data in materials_list + units_list + lesson_themes_list:
-            data.pop("_sa_instance_state", None)
-        
-        response = {
-            "materials": materials_list,
-            "units": units_list,
-            "lesson_themes": lesson_themes_list
-        }
-        
-        logger.info(f"取得データ: {response}")
-        return jsonable_encoder(response)
+        if material_id is None and units_id is None and after_lesson_theme_id is None and limit is None:
+            cached = get_catalog_json(db)
+            if cached is None:
+                logger.warning("取得できるデータがありません")
+                return {"message": "No data available"}
+            return etag_response(request, cached.content, cached.etag)
+
+        logger.info(
+            f"教材データを取得: material_id={material_id} units_id={units_id} "
+            f"after_lesson_theme_id={after_lesson_theme_id} limit={limit}"
+        )
+        return StreamingResponse(
+            _stream_catalog(db.get_bind(), material_id, units_id, after_lesson_theme_id, limit),
+            media_type="application/json"
+        )
     except Exception as e:
         logger.error(f"エラー発生: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -117,28 +269,23 @@ def register_lesson(
             )
         
         # ★対策3: 問題IDの重複チェック（異なるテーマ間）
-        all_question_ids = []
-        for theme_id in theme_ids:
-            questions = (
-                db.query(LessonQuestionsTable.lesson_question_id)
-                .join(LessonThemeContentsTable)
-                .join(LessonThemesTable)
-                .filter(LessonThemesTable.lesson_theme_id == theme_id)
-                .all()
+        # 全テーマの問題を一括取得し、2テーマ以上に出現する問題IDを集計する
+        # （GROUP BY lesson_question_id HAVING COUNT(*) > 1 相当）
+        theme_questions = get_questions_by_theme(db, theme_ids)
+        question_counts = Counter(
+            q.lesson_question_id
+            for theme_id in theme_ids
+            for q in theme_questions[theme_id]
+        )
+        overlap = sorted(qid for qid, count in question_counts.items() if count > 1)
+        if overlap:
+            logger.warning(f"異なるテーマ間で同じ問題IDが共有されています: {overlap}")
+            raise HTTPException(
+                status_code=400,
+                detail=f"選択されたテーマ間で同じ問題(ID: {overlap})が共有されています。異なるテーマを選択してください。"
             )
-            question_ids = [q.lesson_question_id for q in questions]
-            
-            # 既に登録予定の問題IDと重複がないかチェック
-            overlap = set(all_question_ids) & set(question_ids)
-            if overlap:
-                logger.warning(f"異なるテーマ間で同じ問題IDが共有されています: {list(overlap)}")
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"選択されたテーマ間で同じ問題(ID: {list(overlap)})が共有されています。異なるテーマを選択してください。"
-                )
-            all_question_ids.extend(question_ids)
         
-        # lesson_table に新規授業を登録
+        # lesson_table に新規授業を登録（flush で lesson_id のみ採番し、コミットは最後に1回）
         new_lesson = LessonTable(
             class_id=lesson_data.class_id,
             timetable_id=lesson_data.timetable_id,
@@ -146,48 +293,69 @@ def register_lesson(
             lesson_status=1     # READY
         )
         db.add(new_lesson)
-        db.commit()
-        db.refresh(new_lesson)
+        db.flush()
+        lesson_id = new_lesson.lesson_id
         
-        # 各 lesson_theme_id に対して登録を作成
-        registrations = []
-        for theme_id in lesson_data.lesson_theme_ids:
-            registration = LessonRegistrationTable(
-                lesson_id=new_lesson.lesson_id,
-                lesson_theme_id=theme_id,
-                lesson_question_status=1  # NOT_STARTED
+        # 各 lesson_theme_id の登録を複数行INSERTで一括作成
+        if theme_ids:
+            db.execute(
+                insert(LessonRegistrationTable),
+                [
+                    {
+                        "lesson_id": lesson_id,
+                        "lesson_theme_id": theme_id,
+                        "lesson_question_status": 1,  # NOT_STARTED
+                    }
+                    for theme_id in theme_ids
+                ]
             )
-            db.add(registration)
-            registrations.append(registration)
         
-        db.commit()
+        # 新規登録IDの一覧を取得（クエリ x 1、テーマの指定順に並べ替え）
+        registration_ids = dict(
+            db.query(
+                LessonRegistrationTable.lesson_theme_id,
+                LessonRegistrationTable.lesson_registration_id
+            )
+            .filter(LessonRegistrationTable.lesson_id == lesson_id)
+            .all()
+        )
         
-        # 新規登録IDの一覧を取得
-        db.refresh(new_lesson)
-        for r in registrations:
-            db.refresh(r)
+        db.commit()
         
         response = {
-            "lesson_id": new_lesson.lesson_id,
-            "lesson_registration_ids": [r.lesson_registration_id for r in registrations]
+            "lesson_id": lesson_id,
+            "lesson_registration_ids": [registration_ids[theme_id] for theme_id in theme_ids]
         }
         
         return jsonable_encoder(response)
+    except HTTPException:
+        raise
     except Exception as e:
+        db.rollback()
         logger.error(f"エラー発生: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 @router.get("/calendar", response_model=List[LessonRegistrationCalendarResponse])
 def get_lesson_registration_calendar(
+    request: Request,
     class_id: Optional[int] = Query(None, description="クラスID（オプション）"),
     academic_year: Optional[int] = Query(None, description="年度（オプション）"),
+    student_id: Optional[int] = Query(None, description="生徒ID（所属クラスの授業に絞り込む）"),
+    date_from: Optional[date] = Query(None, alias="from", description="開始日（この日を含む）"),
+    date_to: Optional[date] = Query(None, alias="to", description="終了日（この日を含む）"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="1ページの件数（指定時のみページング）"),
+    cursor: Optional[str] = Query(None, description="前ページの X-Next-Cursor"),
     db: Session = Depends(get_db)
 ):
     """
-    授業カレンダーを取得。
-    class_idやacademic_yearが指定された場合は、その条件で授業を絞り込む。
+    授業カレンダーを日付・コマ順で取得。
+    class_idやacademic_year、student_id、from/to が指定された場合は、その条件で授業を絞り込む。
+    limit 指定時は次ページのカーソルを X-Next-Cursor ヘッダーで返す。
     成績表示画面で使用。
+    ETag は本文のハッシュで、If-None-Match が一致する場合は 304 を返す。
     """
+    headers = {}
+
     query = (
         db.query(
             TimetableTable.timetable_id,
@@ -214,12 +382,23 @@ def get_lesson_registration_calendar(
     if class_id is not None:
         query = query.filter(LessonTable.class_id == class_id)
     
-    results = query.all()
+    # student_idが指定されていれば所属クラスでフィルタリング
+    if student_id is not None:
+        student = get_student(db, student_id)
+        if student is None:
+            raise HTTPException(status_code=404, detail="Student not found")
+        query = query.filter(LessonTable.class_id == student.class_id)
+    
+    results = apply_calendar_window(query, date_from, date_to, cursor, limit).all()
+    
+    if limit is not None and len(results) > limit:
+        results = results[:limit]
+        headers["X-Next-Cursor"] = format_calendar_cursor(results[-1])
     
     # レスポンス形式に変換
-    response = []
+    calendar = []
     for row in results:
-        response.append(LessonRegistrationCalendarResponse(
+        calendar.append(LessonRegistrationCalendarResponse(
             timetable_id=row[0],
             date=row[1],
             day_of_week=row[2],
@@ -234,4 +413,4 @@ def get_lesson_registration_calendar(
             grade=row[10] or 0
         ))
     
-    return response
+    return json_etag_response(request, calendar, headers)
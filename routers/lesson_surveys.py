@@ -1,14 +1,15 @@
 # routers/lesson_surveys.py
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status, BackgroundTasks
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from database import get_db
 from models import LessonSurveyTable, StudentTable, LessonTable, LessonThemesTable
 from schemas import LessonSurveyCreate, LessonSurveyResponse
 from typing import List, Optional
-from sqlalchemy import func
 from pydantic import BaseModel
 from typing import Dict
+from services.survey_counters import SurveyLevels, get_survey_summary, record_survey_change
+from socket_server import emit_to_web
 
 router = APIRouter(
     prefix="/lesson_surveys",
@@ -19,6 +20,27 @@ class LessonSurveySummaryResponse(BaseModel):
     understanding_level_distribution: Dict[int, int]
     difficulty_point_distribution: Dict[int, int]
 
+
+def _publish_survey_summary(
+    db: Session,
+    background_tasks: BackgroundTasks,
+    lesson_id: Optional[int],
+    old: Optional[SurveyLevels],
+    new: SurveyLevels,
+) -> None:
+    """
+    コミット後に集計カウンタへ差分を反映し、最新の集計を Socket.IO で教員画面へ送る。
+    （カウンタが未作成の授業だけ、1回の GROUP BY で作る）
+    """
+    if lesson_id is None:
+        return
+    summary = record_survey_change(lesson_id, old, new)
+    if summary is None:
+        summary = get_survey_summary(db, lesson_id)
+    background_tasks.add_task(
+        emit_to_web, "survey_summary_updated", {"lesson_id": lesson_id, **summary}
+    )
+
 @router.get("/lesson/{lesson_id}/summary", response_model=LessonSurveySummaryResponse)
 def get_lesson_survey_summary(
     lesson_id: int,
@@ -26,39 +48,14 @@ def get_lesson_survey_summary(
 ):
     """
     特定の授業のアンケート結果の集計を取得するエンドポイント
+    （集計はメモリ上に保持し、アンケートの登録・更新時は差分だけを反映する）
 
     パスパラメータ:
     - lesson_id (int): 授業ID
     """
     try:
-        # understanding_levelの集計
-        understanding_level_dist = db.query(
-            LessonSurveyTable.understanding_level,
-            func.count(LessonSurveyTable.understanding_level)
-        ).filter(
-            LessonSurveyTable.lesson_id == lesson_id,
-            LessonSurveyTable.understanding_level.isnot(None)
-        ).group_by(
-            LessonSurveyTable.understanding_level
-        ).all()
-
-        # difficulty_pointの集計
-        difficulty_point_dist = db.query(
-            LessonSurveyTable.difficulty_point,
-            func.count(LessonSurveyTable.difficulty_point)
-        ).filter(
-            LessonSurveyTable.lesson_id == lesson_id,
-            LessonSurveyTable.difficulty_point.isnot(None)
-        ).group_by(
-            LessonSurveyTable.difficulty_point
-        ).all()
-
-        summary = {
-            "understanding_level_distribution": {level: count for level, count in understanding_level_dist},
-            "difficulty_point_distribution": {point: count for point, count in difficulty_point_dist}
-        }
-
-        return summary
+        # メモリ上のカウンタから返す（未作成なら1回の GROUP BY で作成）
+        return get_survey_summary(db, lesson_id)
 
     except Exception as e:
         raise HTTPException(
@@ -69,6 +66,7 @@ def get_lesson_survey_summary(
 @router.post("/", response_model=LessonSurveyResponse, status_code=status.HTTP_201_CREATED)
 def create_lesson_survey(
     survey:LessonSurveyCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
@@ -141,6 +139,10 @@ def create_lesson_survey(
         db.commit()
         db.refresh(new_survey)
 
+        _publish_survey_summary(
+            db, background_tasks, lesson_id, None, (new_survey.understanding_level, new_survey.difficulty_point)
+        )
+
         return LessonSurveyResponse.from_orm(new_survey)
 
     except HTTPException:
@@ -192,6 +194,7 @@ def get_lesson_surveys(
 @router.put("/{survey_id}", response_model=LessonSurveyResponse)
 def update_lesson_survey(
     survey_id: int,
+    background_tasks: BackgroundTasks,
     understanding_level: Optional[int] = Query(None),
     difficulty_point: Optional[int] = Query(None),
     student_comment: Optional[str] = Query(None),
@@ -219,6 +222,9 @@ def update_lesson_survey(
                 detail=f"アンケートID {survey_id} が見つかりません"
             )
 
+        old_understanding = survey.understanding_level
+        old_difficulty = survey.difficulty_point
+
         # フィールドを更新
         if understanding_level is not None:
             survey.understanding_level = understanding_level
@@ -232,6 +238,11 @@ def update_lesson_survey(
         db.commit()
         db.refresh(survey)
 
+        old_levels = (old_understanding, old_difficulty)
+        new_levels = (survey.understanding_level, survey.difficulty_point)
+        if new_levels != old_levels:
+            _publish_survey_summary(db, background_tasks, survey.lesson_id, old_levels, new_levels)
+
         return LessonSurveyResponse.from_orm(survey)
 
     except HTTPException:
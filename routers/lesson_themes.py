@@ -2,7 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from database import get_db
 from models import LessonTable, LessonThemesTable, LessonRegistrationTable
+from services.question_cache import get_question_ids, invalidate_theme_questions
 from pydantic import BaseModel
+from typing import Optional
 
 router = APIRouter(prefix="/api/lesson_themes", tags=["lesson_themes"])
 
@@ -86,22 +88,22 @@ async def get_question_count(
     """
     テーマに紐づく問題数を取得
     """
-    from models import LessonQuestionsTable, LessonThemeContentsTable
-    
-    # テーマに紐づく問題を取得
-    questions = (
-        db.query(LessonQuestionsTable)
-        .join(LessonThemeContentsTable)
-        .join(LessonThemesTable)
-        .filter(LessonThemesTable.lesson_theme_id == lesson_theme_id)
-        .order_by(LessonQuestionsTable.lesson_question_id)
-        .all()
-    )
-    
-    question_ids = [q.lesson_question_id for q in questions]
+    question_ids = get_question_ids(db, lesson_theme_id)
     
     return QuestionCountResponse(
         lesson_theme_id=lesson_theme_id,
-        question_count=len(questions),
+        question_count=len(question_ids),
         question_ids=question_ids
-    )
\ No newline at end of file
+    )
+
+
+@router.delete("/questions/cache", response_model=ExerciseStatusResponse)
+async def clear_question_cache(
+    lesson_theme_id: Optional[int] = None,
+):
+    """
+    テーマ→問題のキャッシュを破棄する。
+    問題バンクをDBで直接更新した後に呼び出す（lesson_theme_id 未指定で全件破棄）。
+    """
+    invalidate_theme_questions(None if lesson_theme_id is None else [lesson_theme_id])
+    return ExerciseStatusResponse(message="Question cache cleared")
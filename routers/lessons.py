@@ -2,6 +2,7 @@
 # 【最適化版】start_lesson 関数
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from database import get_db
@@ -9,10 +10,11 @@ from models import (
     LessonTable,
     LessonAnswerDataTable,
     LessonRegistrationTable,
-    StudentTable,
-    LessonQuestionsTable,
-    LessonThemesTable,
-    LessonThemeContentsTable
+)
+from services.question_cache import get_questions_by_theme
+from services.roster_cache import get_class_students
+from services.grade_aggregates import (
+    recompute_if_lesson_ended, invalidate_grade_summary, grade_key_for_class, mark_lesson_ended, mark_lesson_started,
 )
 from pydantic import BaseModel
 
@@ -46,6 +48,7 @@ async def start_lesson(
 
     # ステータスを進行中(2)に更新
     lesson.lesson_status = 2
+    mark_lesson_started(lesson_id)
 
     # ========================================
     # 2. この授業に紐づく全テーマIDを取得 (クエリ x 1)
@@ -84,13 +87,9 @@ async def start_lesson(
     existing_theme_ids = {theme_id for theme_id, count in existing_data_counts if count > 0}
 
     # ========================================
-    # 4. クラスの全生徒を取得 (クエリ x 1)
+    # 4. クラスの全生徒を取得 (名簿キャッシュ / ミス時のみクエリ)
     # ========================================
-    students = (
-        db.query(StudentTable)
-        .filter_by(class_id=lesson.class_id)
-        .all()
-    )
+    students = get_class_students(db, lesson.class_id)
     
     if not students:
         db.commit() # ステータス更新を反映
@@ -113,29 +112,15 @@ async def start_lesson(
         )
 
     # ========================================
-    # 6. 【最適化】全テーマの問題IDを一括取得 (クエリ x 1)
+    # 6. 【最適化】全テーマの問題IDを一括取得 (キャッシュ / ミス時のみクエリ x 1)
     # ========================================
-    # テーマIDごとに問題IDを取得し、辞書に格納
-    theme_questions_query = (
-        db.query(
-            LessonThemesTable.lesson_theme_id,
-            LessonQuestionsTable.lesson_question_id
-        )
-        .join(LessonThemeContentsTable, LessonThemesTable.lesson_theme_contents_id == LessonThemeContentsTable.lesson_theme_contents_id)
-        .join(LessonQuestionsTable, LessonThemeContentsTable.lesson_theme_contents_id == LessonQuestionsTable.lesson_theme_contents_id)
-        .filter(LessonThemesTable.lesson_theme_id.in_(themes_to_create_ids))
-        .order_by(LessonThemesTable.lesson_theme_id, LessonQuestionsTable.lesson_question_id.asc())
-        .all()
-    )
-
     # テーマIDをキーとした問題IDリストの辞書を作成
-    theme_to_questions = {}
-    for theme_id, question_id in theme_questions_query:
-        if theme_id not in theme_to_questions:
-            theme_to_questions[theme_id] = []
+    theme_questions = get_questions_by_theme(db, themes_to_create_ids)
+    theme_to_questions = {
         # 最大16問まで（動的問題数対応）
-        if len(theme_to_questions[theme_id]) < 16:
-            theme_to_questions[theme_id].append(question_id)
+        theme_id: [q.lesson_question_id for q in questions[:16]]
+        for theme_id, questions in theme_questions.items()
+    }
 
     # ========================================
     # 7. 【最適化】INSERT用データを一括作成
@@ -191,6 +176,8 @@ async def end_lesson(
     """
     ⑥ 授業終了処理
     - lesson_statusを3(終了)に更新
+    - 終了をコミットした後、設問別・生徒別の成績サマリーを集計して保存
+      （集計に失敗しても授業は終了済みのまま。サマリーは成績画面の初回表示時に集計し直される）
     """
     # 授業の存在確認
     lesson = db.query(LessonTable).filter_by(lesson_id=lesson_id).first()
@@ -200,4 +187,8 @@ async def end_lesson(
     # ステータスを終了(3)に更新
     lesson.lesson_status = 3
     db.commit()
+    mark_lesson_ended(lesson_id)
+    invalidate_grade_summary(grade_key_for_class(db, lesson.class_id))
+
+    await run_in_threadpool(recompute_if_lesson_ended, lesson_id)
     return LessonStatusResponse(message="Lesson ended successfully")
\ No newline at end of file
@@ -5,6 +5,7 @@ from models import LessonAnswerDataTable
 from schemas import LessonAnswerDataResponse,LessonAnswerUpdateRequest
 from datetime import datetime
 from socket_server import emit_to_web # ★ 2. emit_to_web ヘルパーをインポート
+from services.grade_aggregates import recompute_if_lesson_ended, lesson_has_ended, invalidate_grade_summary, grade_key_for_student
 
 
 from fastapi import Request, Response
@@ -76,6 +77,9 @@ async def update_answer_data_by_id(
         db.commit()
         mark("db_commit")
 
+        # 回答した生徒の学年のサマリーだけを破棄（名簿キャッシュ参照のみ）
+        invalidate_grade_summary(grade_key_for_student(db, record.student_id))
+
         # 4) refresh（SELECTが走ることがあります）
         db.refresh(record)
         mark("db_refresh")
@@ -84,6 +88,9 @@ async def update_answer_data_by_id(
         if record.lesson_id:
             emit_data = f"student_answered,{record.lesson_id},{record.student_id},{record.lesson_answer_data_id}"
             background_tasks.add_task(emit_to_web, 'from_flutter', emit_data)
+            # 終了済み授業への後からの修正なら成績サマリーを再集計（授業中の回答では積まない）
+            if lesson_has_ended(db, record.lesson_id):
+                background_tasks.add_task(recompute_if_lesson_ended, record.lesson_id)
         mark("bg_enqueue")
 
         # 6) レスポンス生成（Pydantic等）
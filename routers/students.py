@@ -7,6 +7,7 @@ from typing import List
 from database import get_db
 from models import StudentTable, ClassTable
 from pydantic import BaseModel
+from services.roster_cache import get_class, get_class_students
 
 router = APIRouter(prefix="/api/students", tags=["students"])
 
@@ -25,19 +26,15 @@ def get_students_by_class(class_id: int, db: Session = Depends(get_db)):
   指定されたクラスIDに所属する生徒の一覧を取得する。
   リアルタイムダッシュボードの初期表示用。
   """
-  class_exists = db.query(ClassTable).filter(ClassTable.class_id == class_id).first()
+  class_exists = get_class(db, class_id)
   if not class_exists:
     raise HTTPException(status_code=404, detail="指定されたクラスが見つかりません")
  
-  students = (
-    db.query(StudentTable)
-    .filter(StudentTable.class_id == class_id)
-    .order_by(StudentTable.students_number) # 出席番号順にソート
-    .all()
-  )
+  # 名簿キャッシュから出席番号順で取得
+  students = get_class_students(db, class_id)
  
   if not students:
     # クラスは存在するが、生徒がいない場合は空リストを返す
     return []
  
-  return students
\ No newline at end of file
+  return [student._asdict() for student in students]
\ No newline at end of file
@@ -1,6 +1,6 @@
 ####### schemas.py
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import date, datetime
 
 # -------------------------------
@@ -20,6 +20,17 @@ class LectureVideo(LectureVideoBase):
     class Config:
         from_attributes = True
 
+class LectureVideoUploadSlotResponse(BaseModel):
+    blob_name: str
+    upload_url: str       # 書き込み専用 SAS 付きの URL（PUT, x-ms-blob-type: BlockBlob）
+    expires_at: datetime
+    upload_token: str     # finalize に渡す枠の署名（テーマID・Blob 名・期限）
+
+class LectureVideoFinalize(BaseModel):
+    lesson_theme_id: int
+    blob_name: str
+    upload_token: str
+
 # -------------------------------
 # 授業テーマ（LessonTheme）と動画
 # -------------------------------
@@ -74,6 +85,23 @@ class TimetableResponse(TimetableBase):
     class Config:
         from_attributes = True
 
+class TimetablePeriodPattern(BaseModel):
+    weekday: int = Field(..., ge=0, le=6)            # 0=月曜 ... 6=日曜（date.weekday()と同じ）
+    day_of_week: str = Field(..., max_length=10)     # 保存する曜日表記
+    period: int
+    time: str = Field(..., max_length=11)
+
+class TimetableBulkCreate(BaseModel):
+    start_date: date
+    end_date: date
+    patterns: List[TimetablePeriodPattern]
+    exclude_dates: List[date] = []                   # 祝日・行事などで授業がない日
+
+class TimetableBulkResponse(BaseModel):
+    total: int
+    created: int
+    timetables: List[TimetableResponse] = []
+
 # -------------------------------
 # 教材（Material）と単元
 # -------------------------------
@@ -221,6 +249,7 @@ class AnswerInfo(BaseModel):
     end_unix: Optional[int] = None
 
 class GradesRawDataItem(BaseModel):
+    lesson_id: int
     student: StudentInfo
     question: QuestionInfo
     answer: AnswerInfo
@@ -234,6 +263,103 @@ class GradesCommentsResponse(BaseModel):
     lesson_id: int
     comments: List[StudentComment] = []
 
+class SurveyCommentHit(BaseModel):
+    lesson_survey_id: int
+    lesson_id: Optional[int] = None
+    student_id: int
+    student_name: Optional[str] = None
+    class_id: int
+    class_name: Optional[str] = None
+    comment_text: str
+    score: float
+
+class SurveyCommentSearchResponse(BaseModel):
+    query: str
+    hits: List[SurveyCommentHit] = []
+    has_next: bool = False
+
+# 授業終了時に集計済みのサマリー
+class LessonQuestionSummary(BaseModel):
+    question_id: int
+    question_label: str
+    lesson_theme_id: Optional[int] = None
+    total_students: int
+    answer_count: int
+    correct_count: int
+    # 正解数 / 出題された生徒数（未回答は不正解として数える。/grades/item_analysis とは分母が異なる）
+    correct_rate: float = Field(..., description="correct_count / total_students * 100（出題された生徒全員が分母。未回答も含む）")
+    mean_response_sec: Optional[float] = None
+    median_response_sec: Optional[float] = None
+    choice_distribution: Dict[int, int] = {}
+
+class LessonStudentSummary(BaseModel):
+    student_id: int
+    question_count: int
+    answered_count: int
+    correct_count: int
+    score: float
+    completion_rate: float
+
+class LessonGradeSummaryResponse(BaseModel):
+    lesson_id: int
+    computed_at: Optional[datetime] = None
+    questions: List[LessonQuestionSummary] = []
+    students: List[LessonStudentSummary] = []
+
+# 設問分析（項目分析）
+class ItemStatistics(BaseModel):
+    question_id: int
+    question_label: str
+    presented_count: int
+    answered_count: int
+    correct_count: int
+    # 正解数 / 回答数（未回答は除く。/grades/lesson_summary とは分母が異なる）
+    correct_rate: Optional[float] = Field(None, description="correct_count / answered_count * 100（未回答は除く。回答が無ければ null）")
+    discrimination: Optional[float] = None          # 点双列相関（当該設問を除く合計点との相関）
+    choice_distribution: Dict[int, int] = {}
+    response_time_percentiles: Dict[str, Optional[float]] = {}
+
+class ItemStudentScore(BaseModel):
+    student_id: int
+    presented_count: int
+    answered_count: int
+    correct_count: int
+    score: float
+
+class ItemAnalysisResponse(BaseModel):
+    lesson_id: Optional[int] = None
+    units_id: Optional[int] = None
+    student_count: int
+    question_count: int
+    items: List[ItemStatistics] = []
+    students: List[ItemStudentScore] = []
+
+# 回答時間の分析
+class QuestionResponseTime(BaseModel):
+    question_id: int
+    question_label: str
+    timed_count: int
+    median_sec: Optional[float] = None
+    p90_sec: Optional[float] = None
+    slow_limit_sec: Optional[float] = None          # これを超えると「遅すぎる回答」
+    fast_count: int
+    slow_count: int
+
+class StudentResponseTime(BaseModel):
+    student_id: int
+    timed_count: int
+    median_sec: Optional[float] = None
+    p90_sec: Optional[float] = None
+    fast_question_ids: List[int] = []
+    slow_question_ids: List[int] = []
+
+class ResponseTimeAnalysisResponse(BaseModel):
+    lesson_id: Optional[int] = None
+    units_id: Optional[int] = None
+    fast_threshold_sec: float
+    questions: List[QuestionResponseTime] = []
+    students: List[StudentResponseTime] = []
+
 # -------------------------------
 # lesson_answer_data用（DB構造に合わせて追加）
 # -------------------------------
@@ -276,6 +402,21 @@ class LessonAnswerDataWithDetails(BaseModel):
     answer_end_unix: Optional[int] = None
     question: LessonQuestionResponse
 
+class AnswerHistoryItem(BaseModel):
+    lesson_answer_data_id: int
+    lesson_id: Optional[int] = None
+    lesson_theme_id: Optional[int] = None
+    lesson_question_id: int
+    choice_number: Optional[int] = None
+    is_correct: Optional[bool] = None
+    answer_start_unix: Optional[int] = None
+    answer_end_unix: int
+
+class AnswerHistoryResponse(BaseModel):
+    student_id: int
+    items: List[AnswerHistoryItem] = []
+    next_cursor: Optional[str] = None   # 次ページ取得時に cursor へ渡す（最終ページは None）
+
 class LessonAnswerUpdateRequest(BaseModel):
     choice_number: Optional[int] = None
     answer_correctness: Optional[int] = None
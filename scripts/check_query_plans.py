@@ -0,0 +1,157 @@
+####### scripts/check_query_plans.py
+"""
+主要なルーターのクエリを EXPLAIN し、想定したインデックスが使われているか確認する。
+
+    python scripts/check_query_plans.py [--lesson-id 1] [--student-id 1]
+
+.env の接続先（MySQL）に対して実行する。マイグレーション（alembic upgrade head）適用後、
+本番に近い件数のデータが入った DB で実行すること（件数が少ないとオプティマイザが全件走査を選ぶことがある）。
+想定外のインデックス・全件走査があれば一覧を表示して終了コード 1 で終わる。
+※ まだ MySQL に対して実行したことはない（SQL の生成まで確認済み）。
+"""
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+from typing import List, NamedTuple, Optional, Set
+
+from sqlalchemy import func, select
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine  # noqa: E402
+from models import (  # noqa: E402
+    AttendanceTable,
+    LessonAnswerDataTable,
+    LessonRegistrationTable,
+    LessonSurveyTable,
+    TimetableTable,
+)
+
+
+class PlanCheck(NamedTuple):
+    name: str              # 対象のエンドポイント・処理
+    statement: object      # SQLAlchemy の SELECT
+    table: str             # インデックスを確認するテーブル
+    keys: Set[str]         # 使われてよいインデックス
+    covering: bool = False  # Extra に "Using index" を期待するか
+
+
+def _checks(lesson_id: int, student_id: int, lesson_theme_id: int) -> List[PlanCheck]:
+    answers = LessonAnswerDataTable
+    today = date.today()
+    return [
+        PlanCheck(
+            "PUT /api/lessons/{lesson_id}/start (既存回答の確認)",
+            select(answers.lesson_theme_id, func.count(answers.lesson_answer_data_id))
+            .where(answers.lesson_id == lesson_id, answers.lesson_theme_id.in_([lesson_theme_id, lesson_theme_id + 1]))
+            .group_by(answers.lesson_theme_id),
+            "lesson_answer_data_table", {"ix_answer_lesson_theme_student"},
+        ),
+        PlanCheck(
+            "POST /api/answer-data-bulk (件数確認)",
+            select(func.count()).select_from(answers)
+            .where(answers.lesson_id == lesson_id, answers.lesson_theme_id == lesson_theme_id),
+            "lesson_answer_data_table", {"ix_answer_lesson_theme_student"},
+        ),
+        PlanCheck(
+            "授業終了時の成績集計",
+            select(answers.student_id, answers.lesson_question_id, answers.choice_number)
+            .where(answers.lesson_id == lesson_id),
+            "lesson_answer_data_table", {"ix_answer_lesson_theme_student"},
+        ),
+        PlanCheck(
+            "GET /api/answers/ (授業・生徒で絞り込み)",
+            select(answers.lesson_answer_data_id)
+            .where(answers.lesson_id == lesson_id, answers.student_id == student_id),
+            "lesson_answer_data_table", {"ix_answer_lesson_theme_student", "ix_answer_student_end"},
+        ),
+        PlanCheck(
+            "GET /api/answers/history (学習履歴)",
+            select(answers.lesson_answer_data_id, answers.answer_end_unix)
+            .where(answers.student_id == student_id, answers.answer_end_unix.isnot(None))
+            .order_by(answers.answer_end_unix.desc(), answers.lesson_answer_data_id.desc())
+            .limit(51),
+            "lesson_answer_data_table", {"ix_answer_student_end"},
+        ),
+        PlanCheck(
+            "アンケート集計（理解度・難易度）",
+            select(
+                LessonSurveyTable.understanding_level,
+                LessonSurveyTable.difficulty_point,
+                func.count(LessonSurveyTable.lesson_survey_id),
+            )
+            .where(LessonSurveyTable.lesson_id == lesson_id)
+            .group_by(LessonSurveyTable.understanding_level, LessonSurveyTable.difficulty_point),
+            "lesson_survey_table", {"ix_survey_lesson_levels"}, covering=True,
+        ),
+        PlanCheck(
+            "授業の登録テーマ一覧",
+            select(LessonRegistrationTable.lesson_theme_id)
+            .where(LessonRegistrationTable.lesson_id == lesson_id),
+            "lesson_registrations_table", {"ix_registration_lesson_theme"}, covering=True,
+        ),
+        PlanCheck(
+            "PUT /lesson_attendance/lesson_information/attendance",
+            select(AttendanceTable.attendance_id)
+            .where(AttendanceTable.student_id == student_id, AttendanceTable.lesson_id == lesson_id),
+            "attendance_table", {"ix_attendance_student_lesson"},
+        ),
+        PlanCheck(
+            "GET /lesson_attendance/calendar (期間指定)",
+            select(TimetableTable.timetable_id, TimetableTable.date, TimetableTable.period)
+            .where(TimetableTable.date >= today, TimetableTable.date <= today + timedelta(days=31))
+            .order_by(TimetableTable.date, TimetableTable.period),
+            "timetable_table", {"ux_timetable_slot"},
+        ),
+    ]
+
+
+def _explain(conn, statement) -> List[dict]:
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.params
+    if compiled.positiontup is not None:
+        # PyMySQL は %s の位置パラメーター
+        params = tuple(params[key] for key in compiled.positiontup)
+    result = conn.exec_driver_sql(f"EXPLAIN {compiled}", params)
+    return [dict(row) for row in result.mappings()]
+
+
+def _problem(check: PlanCheck, plan: List[dict]) -> Optional[str]:
+    row = next((r for r in plan if r.get("table") == check.table), None)
+    if row is None:
+        return f"{check.table} が実行計画にありません"
+    if row.get("key") not in check.keys:
+        return f"key={row.get('key')} type={row.get('type')} rows={row.get('rows')}（想定: {', '.join(sorted(check.keys))}）"
+    if check.covering and "Using index" not in (row.get("Extra") or ""):
+        return f"カバリングインデックスになっていません（Extra: {row.get('Extra')}）"
+    return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lesson-id", type=int, default=1)
+    parser.add_argument("--student-id", type=int, default=1)
+    parser.add_argument("--lesson-theme-id", type=int, default=1)
+    args = parser.parse_args()
+
+    problems = 0
+    with engine.connect() as conn:
+        for check in _checks(args.lesson_id, args.student_id, args.lesson_theme_id):
+            plan = _explain(conn, check.statement)
+            problem = _problem(check, plan)
+            if problem:
+                problems += 1
+                print(f"NG  {check.name}: {problem}")
+            else:
+                row = next(r for r in plan if r.get("table") == check.table)
+                print(f"OK  {check.name}: key={row.get('key')} rows={row.get('rows')}")
+
+    if problems:
+        print(f"\n{problems} 件のクエリで想定したインデックスが使われていません")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
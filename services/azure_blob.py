@@ -1,63 +1,328 @@
 ######## azure_blob.py
+import asyncio
+import base64
+import hashlib
+import hmac
+import threading
+import time
 import uuid
 import re
-from azure.storage.blob import BlobServiceClient, ContentSettings
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from azure.core.exceptions import ResourceNotFoundError
+from azure.core.pipeline.transport import RequestsTransport
+from azure.storage.blob import (
+    BlobServiceClient, BlobBlock, BlobSasPermissions, ContentSettings, generate_blob_sas
+)
+from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
 from config import (
     AZURE_ACCOUNT_NAME,
     AZURE_ACCOUNT_KEY,
     AZURE_BLOB_SERVICE_URL,
-    AZURE_MOVIE_CONTAINER
+    AZURE_MOVIE_CONTAINER,
+    AZURE_STORAGE_CONNECTION_STRING,
+    BLOB_UPLOAD_BLOCK_SIZE_MB,
+    BLOB_UPLOAD_CONCURRENCY,
+    BLOB_UPLOAD_SAS_MINUTES,
+    BLOB_HTTP_POOL_SIZE,
 )
 
-def get_blob_service_client():
+# 非同期クライアントは aiohttp がある環境のみ。無ければ同期クライアントをスレッドで呼ぶ
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# _unique_blob_name が生成する名前（UUID + 拡張子）
+_BLOB_NAME_PATTERN = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}(\.[A-Za-z0-9]{1,10})?$")
+
+# 枠の払い出し後、finalize を受け付ける期限（SAS の期限切れ直前に完了したアップロードの登録を許す）
+_UPLOAD_SLOT_FINALIZE_GRACE = timedelta(minutes=10)
+
+# プロセス内で共有するクライアント（HTTP コネクションと TLS セッションを使い回す）
+_blob_service_client: Optional[BlobServiceClient] = None
+_async_blob_service_client: Optional[AsyncBlobServiceClient] = None
+_client_lock = threading.Lock()
+
+def _client_options() -> dict:
     """
-    アカウント名・キー・エンドポイントURLから BlobServiceClient を生成
+    アカウント名・キー・エンドポイントURL（または接続文字列）から、クライアント生成時の引数を作る
+    接続文字列が設定されていればそちらを使う（Azurite でのローカル確認用）
     """
-    blob_service_client = BlobServiceClient(
-        account_url=AZURE_BLOB_SERVICE_URL,
-        credential=AZURE_ACCOUNT_KEY
-    )
-    return blob_service_client
+    if AZURE_STORAGE_CONNECTION_STRING:
+        return {"conn_str": AZURE_STORAGE_CONNECTION_STRING}
+
+    credential = AZURE_ACCOUNT_KEY
+    if AZURE_ACCOUNT_NAME and AZURE_ACCOUNT_KEY:
+        # IPアドレス形式のURL（Azurite 等）でもアカウント名を取り違えないよう明示する
+        credential = {"account_name": AZURE_ACCOUNT_NAME, "account_key": AZURE_ACCOUNT_KEY}
+    return {"account_url": AZURE_BLOB_SERVICE_URL, "credential": credential}
+
+def _build_client(client_class, **kwargs):
+    options = _client_options()
+    if "conn_str" in options:
+        return client_class.from_connection_string(options["conn_str"], **kwargs)
+    return client_class(**options, **kwargs)
 
-def upload_file_to_blob(file_data: bytes, original_filename: str) -> str:
+def _pooled_transport() -> RequestsTransport:
+    # 並列アップロードのスレッド数より多めにコネクションを保持する
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=BLOB_HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return RequestsTransport(session=session, session_owner=True)
+
+def get_blob_service_client() -> BlobServiceClient:
     """
-    `movie-mvp` コンテナにファイルをアップロードし、Blob の公開 URL を返す。
-    Content-Type を "video/mp4" に固定するサンプル実装。
+    共有の BlobServiceClient を返す（初回呼び出し時に生成）。
+    クライアントはスレッドセーフなので、スレッドプールで動く同期エンドポイントからそのまま使える。
     """
-    blob_service_client = get_blob_service_client()
-    container_client = blob_service_client.get_container_client(AZURE_MOVIE_CONTAINER)
+    global _blob_service_client
+    if _blob_service_client is None:
+        with _client_lock:
+            if _blob_service_client is None:
+                _blob_service_client = _build_client(BlobServiceClient, transport=_pooled_transport())
+    return _blob_service_client
+
+def get_async_blob_service_client() -> Optional[AsyncBlobServiceClient]:
+    """
+    共有の非同期 BlobServiceClient を返す。aiohttp が無い環境では None。
+    aiohttp のセッションはイベントループに紐づくため、ループ上（lifespan かリクエスト処理中）で呼ぶ。
+    """
+    global _async_blob_service_client
+    if aiohttp is None:
+        return None
+    if _async_blob_service_client is None:
+        _async_blob_service_client = _build_client(AsyncBlobServiceClient)
+    return _async_blob_service_client
 
+async def init_blob_clients() -> bool:
+    """
+    起動時にクライアントを用意しておく。Blob 未設定の環境では何もせず False を返す。
+    """
+    if not (AZURE_STORAGE_CONNECTION_STRING or AZURE_BLOB_SERVICE_URL):
+        return False
+    get_blob_service_client()
+    get_async_blob_service_client()
+    return True
+
+async def close_blob_clients() -> None:
+    """
+    終了時に共有クライアントのコネクションを閉じる。
+    """
+    global _blob_service_client, _async_blob_service_client
+    if _async_blob_service_client is not None:
+        await _async_blob_service_client.close()
+        _async_blob_service_client = None
+    with _client_lock:
+        if _blob_service_client is not None:
+            _blob_service_client.close()
+            _blob_service_client = None
+
+def _unique_blob_name(original_filename: str) -> str:
     # 拡張子などを考慮したユニークファイル名
     ext = ""
     if "." in original_filename:
         ext = "." + original_filename.split(".")[-1]
-    unique_filename = f"{uuid.uuid4()}{ext}"
+    return f"{uuid.uuid4()}{ext}"
+
+def _blob_url(blob_name: str) -> str:
+    return f"{AZURE_BLOB_SERVICE_URL}/{AZURE_MOVIE_CONTAINER}/{blob_name}"
+
+def is_valid_blob_name(blob_name: str) -> bool:
+    """
+    アップロード枠で払い出した形式の Blob 名かどうか。
+    """
+    return bool(_BLOB_NAME_PATTERN.match(blob_name))
+
+def get_blob_url(blob_name: str) -> str:
+    return _blob_url(blob_name)
+
+def create_upload_sas(original_filename: str) -> Tuple[str, str, datetime]:
+    """
+    クライアントが Blob へ直接アップロードするための枠を払い出す。
+    新しい Blob 名と、その Blob だけに書き込める短時間の SAS 付き URL、有効期限を返す。
+    """
+    if not (AZURE_ACCOUNT_NAME and AZURE_ACCOUNT_KEY):
+        raise RuntimeError("AZURE_ACCOUNT_NAME and AZURE_ACCOUNT_KEY are required to issue upload SAS")
+
+    blob_name = _unique_blob_name(original_filename)
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(minutes=BLOB_UPLOAD_SAS_MINUTES)
+    sas = generate_blob_sas(
+        account_name=AZURE_ACCOUNT_NAME,
+        container_name=AZURE_MOVIE_CONTAINER,
+        blob_name=blob_name,
+        account_key=AZURE_ACCOUNT_KEY,
+        permission=BlobSasPermissions(create=True, write=True),
+        # 端末との時刻ずれを考慮して開始時刻を少し前にする
+        start=now - timedelta(minutes=5),
+        expiry=expires_at,
+    )
+    return blob_name, f"{_blob_url(blob_name)}?{sas}", expires_at
+
+def _upload_slot_signature(lesson_theme_id: int, blob_name: str, expires_unix: int) -> str:
+    key = hashlib.sha256(b"lecture-video-upload-slot:" + AZURE_ACCOUNT_KEY.encode()).digest()
+    message = f"{lesson_theme_id}:{blob_name}:{expires_unix}".encode()
+    return base64.urlsafe_b64encode(hmac.new(key, message, hashlib.sha256).digest()).rstrip(b"=").decode()
 
-    blob_client = container_client.get_blob_client(unique_filename)
+def sign_upload_slot(lesson_theme_id: int, blob_name: str, expires_at: datetime) -> str:
+    """
+    払い出した枠（テーマID・Blob 名・期限）に署名したトークンを返す。finalize で verify_upload_slot に渡す。
+    """
+    expires_unix = int((expires_at + _UPLOAD_SLOT_FINALIZE_GRACE).timestamp())
+    return f"{expires_unix}.{_upload_slot_signature(lesson_theme_id, blob_name, expires_unix)}"
+
+def verify_upload_slot(upload_token: str, lesson_theme_id: int, blob_name: str) -> bool:
+    """
+    upload_slot で同じテーマ・Blob 名に対して払い出したトークンで、期限内かどうか。
+    """
+    if not AZURE_ACCOUNT_KEY:
+        return False
+    expires, _, signature = upload_token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _upload_slot_signature(lesson_theme_id, blob_name, int(expires)))
+
+def blob_exists(blob_name: str) -> bool:
+    """
+    アップロード済み（コミット済み）の Blob があるか確認する。
+    """
+    blob_client = get_blob_service_client().get_blob_client(AZURE_MOVIE_CONTAINER, blob_name)
+    try:
+        blob_client.get_blob_properties()
+        return True
+    except ResourceNotFoundError:
+        return False
+
+async def blob_exists_async(blob_name: str) -> bool:
+    """
+    blob_exists の非同期版。
+    """
+    client = get_async_blob_service_client()
+    if client is None:
+        return await asyncio.to_thread(blob_exists, blob_name)
+    try:
+        await client.get_blob_client(AZURE_MOVIE_CONTAINER, blob_name).get_blob_properties()
+        return True
+    except ResourceNotFoundError:
+        return False
+
+async def upload_stream_to_blob_async(
+    read: Callable[[int], Awaitable[bytes]],
+    original_filename: str,
+    content_type: str = "video/mp4",
+    block_size: int = BLOB_UPLOAD_BLOCK_SIZE_MB * 1024 * 1024,
+    max_concurrency: int = BLOB_UPLOAD_CONCURRENCY,
+) -> str:
+    """
+    read（UploadFile.read のような非同期の読み出し関数）から block_size ずつ読み、ブロックとして並列に
+    stage_block し、最後に commit_block_list で1つの Blob にまとめる。Blob の公開 URL を返す。
+    送信中のブロックは最大 max_concurrency 個なので、メモリ使用量はファイルサイズに依存しない
+    （aiohttp のコネクションを共有する）。
+    """
+    client = get_async_blob_service_client()
+    blob_name = _unique_blob_name(original_filename)
+    if client is None:
+        # aiohttp が無い環境: 読み出しはループ上で行い、送信は同期クライアントで別スレッドから行う
+        blob_client = get_blob_service_client().get_blob_client(AZURE_MOVIE_CONTAINER, blob_name)
+        stage_block = partial(asyncio.to_thread, blob_client.stage_block)
+        commit_block_list = partial(asyncio.to_thread, blob_client.commit_block_list)
+    else:
+        blob_client = client.get_blob_client(AZURE_MOVIE_CONTAINER, blob_name)
+        stage_block = blob_client.stage_block
+        commit_block_list = blob_client.commit_block_list
+
+    block_ids = []
+    pending = set()
+    try:
+        while True:
+            chunk = await read(block_size)
+            if not chunk:
+                break
+            block_id = base64.b64encode(f"{len(block_ids):08d}".encode()).decode()
+            block_ids.append(block_id)
+
+            if len(pending) >= max_concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+            pending.add(asyncio.ensure_future(stage_block(block_id, chunk)))
 
-    # ContentSettings でContent-Typeを指定
-    blob_client.upload_blob(
-        file_data,
-        overwrite=True,
-        content_settings=ContentSettings(content_type="video/mp4"),
+        if pending:
+            done, pending = await asyncio.wait(pending)
+            for task in done:
+                task.result()
+    except BaseException:
+        for task in pending:
+            task.cancel()
+        # コミットされなかったブロックはストレージ側で自動的に破棄される
+        raise
+
+    await commit_block_list(
+        [BlobBlock(block_id=block_id) for block_id in block_ids],
+        content_settings=ContentSettings(content_type=content_type),
     )
 
-    # アップロードした Blob の URL を返す
-    return f"{AZURE_BLOB_SERVICE_URL}/{AZURE_MOVIE_CONTAINER}/{unique_filename}"
+    return _blob_url(blob_name)
+
+def blob_name_from_url(blob_url: str) -> Optional[str]:
+    """
+    このコンテナの Blob URL からファイル名を抜き出す。想定外の URL なら None。
+    """
+    pattern = rf"{AZURE_BLOB_SERVICE_URL}/{AZURE_MOVIE_CONTAINER}/(.+)"
+    match = re.match(pattern, blob_url)
+    return match.group(1) if match else None
 
 def delete_file_from_blob(blob_url: str):
     """
     Blob URL からファイル名を抜き出し、対応するファイルを削除する。
     例: https://xxx.blob.core.windows.net/movie-mvp/xxxx-uuid.mp4
     """
-    pattern = rf"{AZURE_BLOB_SERVICE_URL}/{AZURE_MOVIE_CONTAINER}/(.+)"
-    match = re.match(pattern, blob_url)
-    if not match:
+    filename = blob_name_from_url(blob_url)  # blob上のファイル名部分
+    if filename is None:
         # URL形式が想定外なら削除せず処理終了
         return
 
-    filename = match.group(1)  # blob上のファイル名部分
     blob_service_client = get_blob_service_client()
     container_client = blob_service_client.get_container_client(AZURE_MOVIE_CONTAINER)
 
-    container_client.delete_blob(filename)
\ No newline at end of file
+    container_client.delete_blob(filename)
+
+def delete_blobs(blob_names: List[str]) -> Dict[str, Optional[str]]:
+    """
+    複数の Blob を Blob Batch API でまとめて削除する（1回あたり最大256件）。
+    Blob 名ごとにエラー内容を返す（削除済み・存在しない場合は None）。
+    Batch API に対応していない環境（Azurite 等）では1件ずつ削除する。
+    """
+    container_client = get_blob_service_client().get_container_client(AZURE_MOVIE_CONTAINER)
+    try:
+        responses = list(container_client.delete_blobs(*blob_names, raise_on_any_failure=False))
+        return {
+            name: None if response.status_code in (202, 404) else f"HTTP {response.status_code}"
+            for name, response in zip(blob_names, responses)
+        }
+    except Exception as e:
+        print(f"[azure_blob] batch delete failed, deleting one by one: {e}")
+
+    results: Dict[str, Optional[str]] = {}
+    for name in blob_names:
+        try:
+            container_client.delete_blob(name)
+            results[name] = None
+        except ResourceNotFoundError:
+            results[name] = None
+        except Exception as e:
+            results[name] = str(e)[:255]
+    return results
+
+def list_container_blobs() -> Iterator[Tuple[str, datetime]]:
+    """
+    コンテナ内の Blob 名と最終更新日時（UTC）を列挙する。
+    """
+    container_client = get_blob_service_client().get_container_client(AZURE_MOVIE_CONTAINER)
+    for blob in container_client.list_blobs():
+        yield blob.name, blob.last_modified
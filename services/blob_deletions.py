@@ -0,0 +1,198 @@
+# services/blob_deletions.py
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from config import (
+    BLOB_DELETION_INTERVAL_SECONDS,
+    BLOB_DELETION_BATCH_SIZE,
+    BLOB_DELETION_MAX_ATTEMPTS,
+    BLOB_RECONCILE_INTERVAL_SECONDS,
+    BLOB_RECONCILE_GRACE_HOURS,
+)
+from database import SessionLocal
+from models import BlobDeletionQueueTable, LectureVideosTable
+from services.azure_blob import blob_name_from_url, delete_blobs, list_container_blobs
+
+# Blob Batch API の1リクエストあたりの上限
+_MAX_BATCH = 256
+# リトライ間隔の上限（秒）
+_MAX_BACKOFF_SECONDS = 6 * 60 * 60
+
+_stop = threading.Event()
+_wake = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def enqueue_blob_deletion(db: Session, blob_url: Optional[str]) -> None:
+    """
+    動画 Blob を削除キューに積む（commit は呼び出し側）。
+    DB の動画削除と同じトランザクションで積むことで、Blob だけが取り残されないようにする。
+    """
+    blob_name = blob_name_from_url(blob_url) if blob_url else None
+    if blob_name is not None:
+        _enqueue_blob_name(db, blob_name)
+
+
+def _enqueue_blob_name(db: Session, blob_name: str) -> None:
+    exists = (
+        db.query(BlobDeletionQueueTable.blob_deletion_id)
+        .filter(BlobDeletionQueueTable.blob_name == blob_name)
+        .first()
+    )
+    if exists is None:
+        now = datetime.utcnow()
+        db.add(BlobDeletionQueueTable(blob_name=blob_name, attempts=0, next_attempt_at=now, created_at=now))
+
+
+def process_pending_deletions(batch_size: int = BLOB_DELETION_BATCH_SIZE) -> int:
+    """
+    期限の来た削除待ちをまとめて削除し、成功したものをキューから外す。
+    失敗したものは試行回数を増やし、指数バックオフで次回の実行時刻をずらす。
+    処理した件数を返す。
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        # 複数ワーカーで同じ行を取り合わないよう、ロック中の行は飛ばす
+        rows = (
+            db.query(BlobDeletionQueueTable)
+            .filter(
+                BlobDeletionQueueTable.next_attempt_at <= now,
+                BlobDeletionQueueTable.attempts < BLOB_DELETION_MAX_ATTEMPTS,
+            )
+            .order_by(BlobDeletionQueueTable.next_attempt_at)
+            .limit(min(batch_size, _MAX_BATCH))
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if not rows:
+            db.commit()
+            return 0
+
+        errors = delete_blobs([row.blob_name for row in rows])
+        for row in rows:
+            error = errors.get(row.blob_name)
+            if error is None:
+                db.delete(row)
+                continue
+            row.attempts += 1
+            row.last_error = error[:255]
+            backoff = min(BLOB_DELETION_INTERVAL_SECONDS * 2 ** row.attempts, _MAX_BACKOFF_SECONDS)
+            row.next_attempt_at = now + timedelta(seconds=backoff)
+            if row.attempts >= BLOB_DELETION_MAX_ATTEMPTS:
+                print(f"[blob_deletions] giving up on {row.blob_name}: {error}")
+        db.commit()
+        return len(rows)
+    except Exception as e:
+        db.rollback()
+        print(f"[blob_deletions] failed to process queue: {e}")
+        return 0
+    finally:
+        db.close()
+
+
+def reconcile_container(grace_hours: int = BLOB_RECONCILE_GRACE_HOURS) -> dict:
+    """
+    コンテナ内の Blob と lecture_videos_table を突き合わせる。
+    - どの動画からも参照されず、猶予時間より古い Blob は削除キューに積む
+    - 動画レコードが参照しているのに存在しない Blob は件数と ID を報告する（レコードは消さない）
+    現在の設定の URL 形式で読めない video_url が1件でもあれば、参照中の Blob を孤児と誤認しないよう
+    何も積まずに中止し、該当する動画の ID を返す（カスタムドメイン・CDN への切り替え後など）。
+    """
+    db = SessionLocal()
+    try:
+        video_blobs = {}
+        unrecognized = []
+        for lecture_video_id, video_url in db.query(LectureVideosTable.lecture_video_id, LectureVideosTable.video_url):
+            if not video_url:
+                continue
+            blob_name = blob_name_from_url(video_url)
+            if blob_name is None:
+                unrecognized.append(lecture_video_id)
+            else:
+                video_blobs[blob_name] = lecture_video_id
+        if unrecognized:
+            print(f"[blob_deletions] reconcile aborted, unrecognized video_url in lecture videos: {unrecognized}")
+            return {
+                "aborted": True,
+                "unrecognized_video_url_lecture_video_ids": sorted(unrecognized),
+                "orphaned_enqueued": 0,
+            }
+        queued = {name for (name,) in db.query(BlobDeletionQueueTable.blob_name)}
+
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=grace_hours)
+        container_blobs = set()
+        orphaned = 0
+        for blob_name, last_modified in list_container_blobs():
+            container_blobs.add(blob_name)
+            if blob_name in video_blobs or blob_name in queued:
+                continue
+            if last_modified is not None and last_modified > cutoff:
+                continue
+            _enqueue_blob_name(db, blob_name)
+            orphaned += 1
+        db.commit()
+
+        missing = sorted(video_id for name, video_id in video_blobs.items() if name not in container_blobs)
+        if missing:
+            print(f"[blob_deletions] lecture videos without blob: {missing}")
+        if orphaned:
+            _wake.set()
+        return {
+            "aborted": False,
+            "container_blobs": len(container_blobs),
+            "orphaned_enqueued": orphaned,
+            "missing_blob_lecture_video_ids": missing,
+        }
+    finally:
+        db.close()
+
+
+def _run() -> None:
+    next_reconcile = datetime.utcnow() + timedelta(seconds=BLOB_RECONCILE_INTERVAL_SECONDS)
+    while not _stop.is_set():
+        _wake.wait(BLOB_DELETION_INTERVAL_SECONDS)
+        _wake.clear()
+        if _stop.is_set():
+            break
+        # 一度に積まれた分はバッチを繰り返して片付ける
+        while process_pending_deletions() >= BLOB_DELETION_BATCH_SIZE and not _stop.is_set():
+            pass
+        if datetime.utcnow() >= next_reconcile:
+            next_reconcile = datetime.utcnow() + timedelta(seconds=BLOB_RECONCILE_INTERVAL_SECONDS)
+            try:
+                reconcile_container()
+            except Exception as e:
+                print(f"[blob_deletions] reconcile failed: {e}")
+
+
+def wake_blob_deletion_worker() -> None:
+    """
+    削除キューに積んだ直後に、次の周期を待たずに処理させる。
+    """
+    _wake.set()
+
+
+def start_blob_deletion_worker() -> None:
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_run, name="blob-deletion-worker", daemon=True)
+    _thread.start()
+
+
+def stop_blob_deletion_worker(timeout: float = 10.0) -> None:
+    """
+    ワーカーを停止する。未処理の削除待ちはテーブルに残り、次回起動時に処理される。
+    """
+    global _thread
+    if _thread is None:
+        return
+    _stop.set()
+    _wake.set()
+    _thread.join(timeout)
+    _thread = None
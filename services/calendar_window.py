@@ -0,0 +1,72 @@
+# services/calendar_window.py
+from datetime import date
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Query
+
+from models import LessonTable, TimetableTable
+
+# カレンダーの並び順・キーセット（授業が無いコマは lesson_id=0 として扱う）
+_LESSON_KEY = func.coalesce(LessonTable.lesson_id, 0)
+
+
+class CalendarCursor(NamedTuple):
+    date: date
+    period: int
+    timetable_id: int
+    lesson_id: int
+
+
+def parse_calendar_cursor(cursor: str) -> CalendarCursor:
+    """
+    "YYYY-MM-DD_period_timetable_id_lesson_id" 形式のカーソルを読む。
+    """
+    try:
+        day, period, timetable_id, lesson_id = cursor.split("_")
+        return CalendarCursor(date.fromisoformat(day), int(period), int(timetable_id), int(lesson_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def format_calendar_cursor(row) -> str:
+    return f"{row.date.isoformat()}_{row.period}_{row.timetable_id}_{row.lesson_id or 0}"
+
+
+def apply_calendar_window(
+    query: Query,
+    date_from: Optional[date],
+    date_to: Optional[date],
+    cursor: Optional[str],
+    limit: Optional[int],
+) -> Query:
+    """
+    カレンダーのクエリに期間・キーセット条件と並び順を付ける。
+    (date, period) の複合インデックスで範囲を絞り、limit 指定時は1件多く取る。
+    日付・時限が未設定のコマは、期間・ページングの指定が無くても常に除く
+    （カレンダーのレスポンスでは date / period が必須で、カーソルも作れないため）。
+    """
+    query = query.filter(TimetableTable.date.isnot(None), TimetableTable.period.isnot(None))
+    if date_from is not None:
+        query = query.filter(TimetableTable.date >= date_from)
+    if date_to is not None:
+        query = query.filter(TimetableTable.date <= date_to)
+
+    if cursor:
+        last = parse_calendar_cursor(cursor)
+        query = query.filter(or_(
+            TimetableTable.date > last.date,
+            and_(TimetableTable.date == last.date, or_(
+                TimetableTable.period > last.period,
+                and_(TimetableTable.period == last.period, or_(
+                    TimetableTable.timetable_id > last.timetable_id,
+                    and_(TimetableTable.timetable_id == last.timetable_id, _LESSON_KEY > last.lesson_id),
+                )),
+            )),
+        ))
+
+    query = query.order_by(TimetableTable.date, TimetableTable.period, TimetableTable.timetable_id, _LESSON_KEY)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query
@@ -0,0 +1,169 @@
+# services/content_cache.py
+import json
+from typing import List, NamedTuple, Optional
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from config import CONTENT_CACHE_TTL_SECONDS
+from models import MaterialTable, UnitTable, LessonThemesTable
+from schemas import UnitWithThemes
+from services.etag import payload_etag
+from services.ttl_cache import TTLCache
+
+_units_adapter = TypeAdapter(List[UnitWithThemes])
+
+
+class CachedJSON(NamedTuple):
+    # シリアライズ済みのJSONと、その本文から作った ETag
+    content: bytes
+    etag: str
+
+
+# ("id", material_id) / ("name", material_name) / ("catalog",) -> CachedJSON
+_content_cache = TTLCache(CONTENT_CACHE_TTL_SECONDS, maxsize=256)
+
+
+def _cache_json(key, content: bytes) -> CachedJSON:
+    entry = CachedJSON(content, payload_etag(content))
+    _content_cache.set(key, entry)
+    return entry
+
+
+def _serialize_content_tree(db: Session, material_id: int) -> bytes:
+    """
+    units -> lesson_themes -> lecture_videos を selectinload で読み込み（クエリ x 3）、
+    UnitWithThemes のリストとしてJSONに変換する。
+    """
+    units = (
+        db.query(UnitTable)
+        .options(
+            selectinload(UnitTable.lesson_themes)
+            .selectinload(LessonThemesTable.lecture_videos)
+        )
+        .filter(UnitTable.material_id == material_id)
+        .order_by(UnitTable.units_id)
+        .all()
+    )
+    return _units_adapter.dump_json(_units_adapter.validate_python(units, from_attributes=True))
+
+
+def get_content_json_by_id(db: Session, material_id: int) -> Optional[CachedJSON]:
+    """
+    教材IDの教材ツリーをJSONと ETag で返す。教材が無ければ None。
+    """
+    key = ("id", material_id)
+    entry = _content_cache.get(key)
+    if entry is not None:
+        return entry
+
+    exists = (
+        db.query(MaterialTable.material_id)
+        .filter(MaterialTable.material_id == material_id)
+        .first()
+    )
+    if exists is None:
+        return None
+
+    return _cache_json(key, _serialize_content_tree(db, material_id))
+
+
+def get_content_json_by_name(db: Session, material_name: str) -> Optional[CachedJSON]:
+    """
+    教材名の教材ツリーをJSONと ETag で返す。教材が無ければ None。
+    教材名は一意ではないため、同名の教材がある場合は教材IDの最も小さいものを返す。
+    """
+    key = ("name", material_name)
+    entry = _content_cache.get(key)
+    if entry is not None:
+        return entry
+
+    material = (
+        db.query(MaterialTable.material_id)
+        .filter(MaterialTable.material_name == material_name)
+        .order_by(MaterialTable.material_id)
+        .first()
+    )
+    if material is None:
+        return None
+
+    entry = get_content_json_by_id(db, material.material_id)
+    _content_cache.set(key, entry)
+    return entry
+
+
+def catalog_selects(
+    material_id: Optional[int] = None,
+    units_id: Optional[int] = None,
+    after_lesson_theme_id: Optional[int] = None,
+    limit: Optional[int] = None,
+):
+    """
+    教材・単元・授業テーマの一覧を、必要な列だけ選択する Core SELECT を3つ返す。
+    授業テーマは lesson_theme_id 昇順のキーセットページング（limit 指定時は1件多く取る）。
+    """
+    materials = select(MaterialTable.material_id, MaterialTable.material_name).order_by(MaterialTable.material_id)
+    units = select(
+        UnitTable.units_id,
+        UnitTable.material_id,
+        UnitTable.part_name,
+        UnitTable.chapter_name,
+        UnitTable.unit_name,
+    ).order_by(UnitTable.units_id)
+    themes = select(
+        LessonThemesTable.lesson_theme_id,
+        LessonThemesTable.lesson_theme_contents_id,
+        LessonThemesTable.units_id,
+        LessonThemesTable.lesson_theme_name,
+    ).order_by(LessonThemesTable.lesson_theme_id)
+
+    if material_id is not None:
+        materials = materials.where(MaterialTable.material_id == material_id)
+        units = units.where(UnitTable.material_id == material_id)
+        themes = themes.join(UnitTable, LessonThemesTable.units_id == UnitTable.units_id).where(
+            UnitTable.material_id == material_id
+        )
+    if units_id is not None:
+        materials = materials.where(
+            MaterialTable.material_id.in_(select(UnitTable.material_id).where(UnitTable.units_id == units_id))
+        )
+        units = units.where(UnitTable.units_id == units_id)
+        themes = themes.where(LessonThemesTable.units_id == units_id)
+    if after_lesson_theme_id is not None:
+        themes = themes.where(LessonThemesTable.lesson_theme_id > after_lesson_theme_id)
+    if limit is not None:
+        themes = themes.limit(limit + 1)
+
+    return materials, units, themes
+
+
+def get_catalog_json(db: Session) -> Optional[CachedJSON]:
+    """
+    教材・単元・授業テーマの全件ダンプ（/lesson_registrations/all）をJSONと ETag で返す。
+    作成済みのものをキャッシュし、データが1件も無ければ None。
+    """
+    key = ("catalog",)
+    entry = _content_cache.get(key)
+    if entry is not None:
+        return entry
+
+    materials_stmt, units_stmt, themes_stmt = catalog_selects()
+    catalog = {
+        "materials": [dict(row) for row in db.execute(materials_stmt).mappings()],
+        "units": [dict(row) for row in db.execute(units_stmt).mappings()],
+        "lesson_themes": [dict(row) for row in db.execute(themes_stmt).mappings()],
+    }
+    if not any(catalog.values()):
+        return None
+
+    return _cache_json(key, json.dumps(catalog, ensure_ascii=False).encode("utf-8"))
+
+
+def invalidate_content_cache() -> None:
+    """
+    教材ツリー・全件ダンプのキャッシュを全件破棄する。
+    動画・授業テーマ・単元を更新した後に呼び出す（教材数は少ないため全件破棄で十分）。
+    ETag もキャッシュと一緒に作り直されるため、内容が変わっていれば次の応答で変わる。
+    """
+    _content_cache.clear()
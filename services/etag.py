@@ -0,0 +1,67 @@
+# services/etag.py
+import hashlib
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+def payload_etag(content: bytes) -> str:
+    """
+    レスポンス本文のハッシュから ETag を作る。
+    内容が同じならワーカーや再起動をまたいでも同じ ETag になり、内容が変われば必ず変わる。
+    """
+    return 'W/"' + hashlib.sha1(content).hexdigest()[:20] + '"'
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    """
+    If-None-Match がこの ETag と一致するか判定する。
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # 弱い比較（W/ の有無は無視する）
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    # ブラウザにも毎回 If-None-Match で再検証させる
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def not_modified_response(etag: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(status_code=304, headers={**(headers or {}), **etag_headers(etag)})
+
+
+def etag_response(
+    request: Request,
+    content: bytes,
+    etag: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    シリアライズ済みのJSONを ETag 付きで返す。If-None-Match が一致すれば本文なしの 304。
+    キャッシュ済みの本文は、キャッシュに入れたときに計算した etag を渡す。
+    """
+    etag = etag or payload_etag(content)
+    if not_modified(request, etag):
+        return not_modified_response(etag, headers)
+    return Response(
+        content=content,
+        media_type="application/json",
+        headers={**(headers or {}), **etag_headers(etag)},
+    )
+
+
+def json_etag_response(request: Request, payload: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    モデル・リストを JSON にして、本文のハッシュを ETag として返す。
+    DB は毎回読むが、一致すれば本文の転送を省ける。
+    """
+    content = JSONResponse(content=jsonable_encoder(payload)).body
+    return etag_response(request, content, headers=headers)
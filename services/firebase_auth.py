@@ -0,0 +1,271 @@
+# services/firebase_auth.py
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import firebase_admin
+from firebase_admin import auth, credentials
+from google.auth import crypt, jwt
+from google.auth.transport import requests as google_requests
+
+from config import (
+    FIREBASE_AUTH_OFFLINE,
+    FIREBASE_PROJECT_ID,
+    FIREBASE_KEY_REFRESH_MARGIN_SECONDS,
+    FIREBASE_CHECK_REVOKED,
+)
+
+# Firebase IDトークンの署名用公開証明書と発行者
+ID_TOKEN_CERT_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+ID_TOKEN_ISSUER_PREFIX = "https://securetoken.google.com/"
+
+OFFLINE_PROJECT_ID = "offline-project"
+OFFLINE_KEY_ID = "offline"
+
+# 取得に失敗した時の再試行間隔・Cache-Control が無い時の保持時間（秒）
+KEY_REFRESH_RETRY_SECONDS = 60
+DEFAULT_KEY_MAX_AGE_SECONDS = 3600
+
+# 証明書取得用リクエスト（内部属性 _token_verifier.request）の構成を確認済みの firebase_admin のメジャーバージョン
+_CERT_REQUEST_SDK_VERSIONS = ("6", "7")
+
+
+# ======================
+# Firebase Admin 初期化
+# ======================
+
+def init_firebase_admin() -> None:
+    """
+    Firebase Admin SDK を1回だけ初期化する。
+    優先順位：
+      1) 環境変数 FIREBASE_SERVICE_ACCOUNT_JSON（JSON本文）
+      2) 環境変数 GOOGLE_APPLICATION_CREDENTIALS or FIREBASE_SERVICE_ACCOUNT_PATH（ファイルパス）
+      3) カレントディレクトリの serviceAccountKey.json（ローカル開発用）
+    """
+    if firebase_admin._apps:
+        return
+
+    sa_json = os.getenv("FIREBASE_SERVICE_ACCOUNT_JSON")
+    if sa_json:
+        try:
+            sa_dict = json.loads(sa_json)
+        except json.JSONDecodeError as e:
+            raise RuntimeError(f"FIREBASE_SERVICE_ACCOUNT_JSON is not valid JSON: {e}")
+
+        cred = credentials.Certificate(sa_dict)
+        firebase_admin.initialize_app(cred)
+        return
+
+    sa_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS") or os.getenv("FIREBASE_SERVICE_ACCOUNT_PATH")
+    if sa_path and os.path.exists(sa_path):
+        firebase_admin.initialize_app(credentials.Certificate(sa_path))
+        return
+
+    # ローカル用フォールバック（必要ならパスは適宜変更）
+    local_path = os.path.join(os.getcwd(), "serviceAccountKey.json")
+    if os.path.exists(local_path):
+        firebase_admin.initialize_app(credentials.Certificate(local_path))
+        return
+
+    raise RuntimeError(
+        "Firebase Admin credential not found. "
+        "Set FIREBASE_SERVICE_ACCOUNT_JSON (recommended) or GOOGLE_APPLICATION_CREDENTIALS/FIREBASE_SERVICE_ACCOUNT_PATH, "
+        "or place serviceAccountKey.json for local dev."
+    )
+
+
+# ======================
+# 署名鍵の先読み
+# ======================
+
+def _certificate_request(client: Any):
+    """
+    firebase_admin が証明書の取得に使うリクエスト（CacheControl 付きセッション）を返す。
+    内部属性のため、確認済みのバージョン以外や属性が見つからない場合は
+    google.auth の通常のリクエストを返す（この場合 firebase_admin の証明書キャッシュは温まらず、
+    期限の把握と再取得のスケジュールだけを行う）。
+    """
+    request = getattr(getattr(client, "_token_verifier", None), "request", None)
+    if request is not None and firebase_admin.__version__.split(".")[0] in _CERT_REQUEST_SDK_VERSIONS:
+        return request
+    print(
+        f"[firebase_auth] certificate request of firebase_admin {firebase_admin.__version__} is not available; "
+        "signing keys will not be prefetched into its cache"
+    )
+    return google_requests.Request()
+
+
+class _SigningKeys:
+    """
+    本番: firebase_admin のトークン検証が使う証明書キャッシュ（Cache-Control に従う）に
+          公開鍵を読み込ませ、その期限を覚えておく。検証自体は firebase_admin が行う。
+    オフライン: ローカル生成した公開鍵（kid -> PEM）を保持する。
+    """
+
+    def __init__(self):
+        self._certs: Dict[str, str] = {}
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, certs: Dict[str, str], max_age: Optional[float]) -> None:
+        with self._lock:
+            self._certs = dict(certs)
+            # max_age=None はローカル鍵（期限なし）
+            self._expires_at = float("inf") if max_age is None else time.monotonic() + max_age
+
+    def refresh(self) -> None:
+        # firebase_admin の証明書取得用リクエスト（CacheControl 付きセッション）を通して取得する。
+        # no-cache を付けて再取得させ、期限前に新しいレスポンスでキャッシュを置き換える
+        request = _certificate_request(auth._get_client(firebase_admin.get_app()))
+        response = request(url=ID_TOKEN_CERT_URL, headers={"Cache-Control": "no-cache"})
+        if response.status != 200:
+            raise RuntimeError(f"Failed to fetch signing keys: HTTP {response.status}")
+        match = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+        max_age = int(match.group(1)) if match else DEFAULT_KEY_MAX_AGE_SECONDS
+        self.set(json.loads(response.data), max_age)
+        print(f"[firebase_auth] signing keys refreshed ({len(self._certs)} keys, max-age={max_age}s)")
+
+    def get(self) -> Dict[str, str]:
+        with self._lock:
+            return self._certs
+
+    def seconds_until_refresh(self) -> float:
+        with self._lock:
+            remaining = self._expires_at - time.monotonic() - FIREBASE_KEY_REFRESH_MARGIN_SECONDS
+        return max(remaining, KEY_REFRESH_RETRY_SECONDS)
+
+
+_signing_keys = _SigningKeys()
+_offline_signer: Optional[crypt.RSASigner] = None
+_project_id: Optional[str] = None
+_init_lock = threading.Lock()
+
+
+def _generate_offline_keys() -> None:
+    """
+    オフライン検証モード用の RSA 鍵ペアをプロセス内で生成する。
+    """
+    global _offline_signer
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    _offline_signer = crypt.RSASigner.from_string(private_pem, key_id=OFFLINE_KEY_ID)
+    _signing_keys.set({OFFLINE_KEY_ID: public_pem.decode("utf-8")}, None)
+
+
+def _uses_auth_emulator() -> bool:
+    return bool(os.getenv("FIREBASE_AUTH_EMULATOR_HOST"))
+
+
+def init_firebase_auth() -> None:
+    """
+    起動時に1回だけ呼ぶ。Firebase Admin の初期化と署名鍵の先読みを行う。
+    FIREBASE_AUTH_OFFLINE=1 の場合は、ローカル生成した鍵ペアで検証する（テスト・ローカル開発用）。
+    """
+    global _project_id
+    with _init_lock:
+        if _project_id is not None:
+            return
+
+        if FIREBASE_AUTH_OFFLINE:
+            print("[firebase_auth] OFFLINE verification mode (do not use in production)")
+            _generate_offline_keys()
+            _project_id = FIREBASE_PROJECT_ID or OFFLINE_PROJECT_ID
+            return
+
+        init_firebase_admin()
+        # エミュレーター利用時は署名なしトークンなので鍵の先読みは不要
+        if not _uses_auth_emulator():
+            _signing_keys.refresh()
+        _project_id = firebase_admin.get_app().project_id or FIREBASE_PROJECT_ID or ""
+
+
+def verify_id_token(id_token: str) -> Dict[str, Any]:
+    """
+    IDトークンを検証し、クレームを返す（uid を含む）。失敗したら例外を投げる。
+    本番は firebase_admin.auth.verify_id_token（先読み済みの証明書キャッシュを使う）。
+    FIREBASE_AUTH_OFFLINE=1 の場合のみ、ローカル生成した鍵で署名・aud・iss・exp・sub を検証する。
+    """
+    if _project_id is None:
+        init_firebase_auth()
+
+    if not FIREBASE_AUTH_OFFLINE:
+        return auth.verify_id_token(id_token, check_revoked=FIREBASE_CHECK_REVOKED)
+
+    claims = jwt.decode(id_token, certs=_signing_keys.get(), audience=_project_id)
+
+    if claims.get("iss") != ID_TOKEN_ISSUER_PREFIX + _project_id:
+        raise ValueError(f"Invalid issuer: {claims.get('iss')}")
+    subject = claims.get("sub")
+    if not isinstance(subject, str) or not subject or len(subject) > 128:
+        raise ValueError("Invalid subject (sub) claim")
+
+    claims["uid"] = subject
+    return claims
+
+
+def issue_offline_token(uid: str, email: Optional[str] = None, expires_in: int = 3600) -> str:
+    """
+    オフライン検証モードで有効な IDトークンを発行する（テスト・ローカル開発でログインを試す用）。
+    """
+    if not FIREBASE_AUTH_OFFLINE:
+        raise RuntimeError("issue_offline_token is only available when FIREBASE_AUTH_OFFLINE=1")
+    init_firebase_auth()
+
+    now = int(time.time())
+    payload = {
+        "iss": ID_TOKEN_ISSUER_PREFIX + _project_id,
+        "aud": _project_id,
+        "sub": uid,
+        "iat": now,
+        "exp": now + expires_in,
+    }
+    if email is not None:
+        payload["email"] = email
+    return jwt.encode(_offline_signer, payload).decode("utf-8")
+
+
+# ======================
+# バックグラウンド更新
+# ======================
+
+async def _refresh_keys_loop() -> None:
+    while True:
+        await asyncio.sleep(_signing_keys.seconds_until_refresh())
+        try:
+            await asyncio.to_thread(_signing_keys.refresh)
+        except Exception as e:
+            print(f"[firebase_auth] signing key refresh failed: {e}")
+
+
+def start_key_refresh() -> Optional[asyncio.Task]:
+    """
+    鍵の期限切れ前に再取得するタスクを開始する（オフラインモード・エミュレーターでは不要）。
+    """
+    if FIREBASE_AUTH_OFFLINE or _uses_auth_emulator():
+        return None
+    return asyncio.create_task(_refresh_keys_loop())
+
+
+async def stop_key_refresh(task: Optional[asyncio.Task]) -> None:
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
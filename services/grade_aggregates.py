@@ -0,0 +1,250 @@
+# services/grade_aggregates.py
+import threading
+from collections import defaultdict
+from datetime import datetime
+from statistics import mean, median
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from config import GRADE_SUMMARY_CACHE_TTL_SECONDS
+from database import SessionLocal
+from models import (
+    LessonTable,
+    LessonAnswerDataTable,
+    LessonQuestionsTable,
+    LessonQuestionSummaryTable,
+    LessonStudentSummaryTable,
+    LessonSummaryStateTable,
+)
+from services.roster_cache import get_class, get_student
+from services.ttl_cache import TTLCache
+
+LESSON_STATUS_ENDED = 3
+
+GradeKey = Tuple[int, int]
+
+# 学年別設問サマリー (academic_year, grade) -> GradeSummaryResponse
+grade_summary_cache = TTLCache(GRADE_SUMMARY_CACHE_TTL_SECONDS)
+# (academic_year, grade) -> 破棄の世代。集計中に破棄された古い結果を保存しないために使う
+_grade_generations: Dict[GradeKey, int] = {}
+_grade_lock = threading.Lock()
+# 終了済みの授業ID（回答の修正時に再集計が必要かの判定用。終了済みと分かったものだけを保持する）
+_ended_lessons = TTLCache(GRADE_SUMMARY_CACHE_TTL_SECONDS, maxsize=10000)
+
+
+def grade_summary_generation(key: GradeKey) -> int:
+    """
+    集計を始める前に取得し、store_grade_summary に渡す。
+    """
+    with _grade_lock:
+        return _grade_generations.get(key, 0)
+
+
+def store_grade_summary(key: GradeKey, generation: int, summary: Any) -> None:
+    """
+    集計開始後に破棄されていなければ（世代が同じなら）キャッシュに保存する。
+    """
+    with _grade_lock:
+        if _grade_generations.get(key, 0) == generation:
+            grade_summary_cache.set(key, summary)
+
+
+def invalidate_grade_summary(key: Optional[GradeKey]) -> None:
+    """
+    学年1つ分のサマリーを破棄し、世代を進める。
+    """
+    if key is None:
+        return
+    with _grade_lock:
+        _grade_generations[key] = _grade_generations.get(key, 0) + 1
+        grade_summary_cache.pop(key)
+
+
+def grade_key_for_class(db: Session, class_id: Optional[int]) -> Optional[GradeKey]:
+    """
+    クラスの (academic_year, grade) を名簿キャッシュから求める。
+    """
+    class_ = get_class(db, class_id) if class_id is not None else None
+    if class_ is None or class_.academic_year is None or class_.grade is None:
+        return None
+    return (class_.academic_year, class_.grade)
+
+
+def grade_key_for_student(db: Session, student_id: int) -> Optional[GradeKey]:
+    student = get_student(db, student_id)
+    return grade_key_for_class(db, student.class_id) if student is not None else None
+
+
+def lesson_has_ended(db: Session, lesson_id: int) -> bool:
+    """
+    授業が終了済みかを返す。終了済みの授業はキャッシュから判定し、DBを読まない。
+    """
+    if _ended_lessons.get(lesson_id):
+        return True
+    lesson_status = (
+        db.query(LessonTable.lesson_status)
+        .filter(LessonTable.lesson_id == lesson_id)
+        .scalar()
+    )
+    if lesson_status != LESSON_STATUS_ENDED:
+        return False
+    _ended_lessons.set(lesson_id, True)
+    return True
+
+
+def mark_lesson_ended(lesson_id: int) -> None:
+    _ended_lessons.set(lesson_id, True)
+
+
+def mark_lesson_started(lesson_id: int) -> None:
+    """
+    授業を（再）開始した時に呼ぶ。他ワーカーのキャッシュは TTL まで残るが、
+    recompute_if_lesson_ended がステータスを確認し直すため、余分な再集計は行われない。
+    """
+    _ended_lessons.pop(lesson_id)
+
+
+def is_answer_correct(
+    answer_correctness: Optional[bool],
+    choice_number: Optional[int],
+    correctness_number: Optional[int],
+) -> Optional[bool]:
+    """
+    回答の正誤を判定する。
+    answer_correctness が記録済みならそれを優先し、無ければ選択肢と正解番号を比較する。
+    """
+    if answer_correctness is not None:
+        return bool(answer_correctness)
+    if choice_number is not None and correctness_number is not None:
+        return choice_number == correctness_number
+    return None
+
+
+def recompute_lesson_aggregates(db: Session, lesson_id: int) -> None:
+    """
+    授業1件分の設問別・生徒別サマリーを作り直す（コミットは呼び出し側）。
+    回答データは必要な列だけを1回読み、Python側で1パスで集計する。
+    """
+    rows = (
+        db.query(
+            LessonAnswerDataTable.student_id,
+            LessonAnswerDataTable.lesson_theme_id,
+            LessonAnswerDataTable.lesson_question_id,
+            LessonAnswerDataTable.choice_number,
+            LessonAnswerDataTable.answer_correctness,
+            LessonAnswerDataTable.answer_start_unix,
+            LessonAnswerDataTable.answer_end_unix,
+            LessonQuestionsTable.correctness_number,
+        )
+        .join(LessonQuestionsTable, LessonAnswerDataTable.lesson_question_id == LessonQuestionsTable.lesson_question_id)
+        .filter(LessonAnswerDataTable.lesson_id == lesson_id)
+        .all()
+    )
+
+    questions = {}
+    students = defaultdict(lambda: {"question_count": 0, "answered_count": 0, "correct_count": 0})
+    for row in rows:
+        q = questions.get(row.lesson_question_id)
+        if q is None:
+            q = questions[row.lesson_question_id] = {
+                "lesson_theme_id": row.lesson_theme_id,
+                "total_students": 0,
+                "answer_count": 0,
+                "correct_count": 0,
+                "durations": [],
+                "choices": defaultdict(int),
+            }
+        s = students[row.student_id]
+
+        q["total_students"] += 1
+        s["question_count"] += 1
+
+        if row.choice_number is not None:
+            q["answer_count"] += 1
+            q["choices"][row.choice_number] += 1
+            s["answered_count"] += 1
+
+        if is_answer_correct(row.answer_correctness, row.choice_number, row.correctness_number):
+            q["correct_count"] += 1
+            s["correct_count"] += 1
+
+        if row.answer_start_unix is not None and row.answer_end_unix is not None:
+            q["durations"].append(row.answer_end_unix - row.answer_start_unix)
+
+    computed_at = datetime.utcnow()
+
+    db.execute(delete(LessonQuestionSummaryTable).where(LessonQuestionSummaryTable.lesson_id == lesson_id))
+    db.execute(delete(LessonStudentSummaryTable).where(LessonStudentSummaryTable.lesson_id == lesson_id))
+    db.execute(delete(LessonSummaryStateTable).where(LessonSummaryStateTable.lesson_id == lesson_id))
+    # 回答が0件の授業でも集計済みと分かるよう、サマリーの有無とは別に記録する
+    db.execute(insert(LessonSummaryStateTable), [{"lesson_id": lesson_id, "computed_at": computed_at}])
+
+    if questions:
+        db.execute(
+            insert(LessonQuestionSummaryTable),
+            [
+                {
+                    "lesson_id": lesson_id,
+                    "lesson_theme_id": q["lesson_theme_id"],
+                    "lesson_question_id": question_id,
+                    "total_students": q["total_students"],
+                    "answer_count": q["answer_count"],
+                    "correct_count": q["correct_count"],
+                    "mean_response_sec": mean(q["durations"]) if q["durations"] else None,
+                    "median_response_sec": median(q["durations"]) if q["durations"] else None,
+                    "choice1_count": q["choices"][1],
+                    "choice2_count": q["choices"][2],
+                    "choice3_count": q["choices"][3],
+                    "choice4_count": q["choices"][4],
+                    "computed_at": computed_at,
+                }
+                for question_id, q in questions.items()
+            ]
+        )
+
+    if students:
+        db.execute(
+            insert(LessonStudentSummaryTable),
+            [
+                {
+                    "lesson_id": lesson_id,
+                    "student_id": student_id,
+                    "question_count": s["question_count"],
+                    "answered_count": s["answered_count"],
+                    "correct_count": s["correct_count"],
+                    "score": round(s["correct_count"] / s["question_count"] * 100, 1),
+                    "completion_rate": round(s["answered_count"] / s["question_count"] * 100, 1),
+                    "computed_at": computed_at,
+                }
+                for student_id, s in students.items()
+            ]
+        )
+
+
+def recompute_if_lesson_ended(lesson_id: int) -> bool:
+    """
+    終了済み授業のサマリーを集計し直す（授業終了後・回答の後からの修正時・サマリーが無い授業の初回表示時）。
+    呼び出し元のトランザクションを巻き込まないよう専用セッションで集計・コミットし、
+    失敗してもログに残すだけにする。集計して保存できた場合に True を返す。
+    呼び出し側で lesson_has_ended を確認してから積むが、その後に授業が再開された場合に備えて確認し直す。
+    """
+    db = SessionLocal()
+    try:
+        lesson_status = (
+            db.query(LessonTable.lesson_status)
+            .filter(LessonTable.lesson_id == lesson_id)
+            .scalar()
+        )
+        if lesson_status != LESSON_STATUS_ENDED:
+            return False
+        recompute_lesson_aggregates(db, lesson_id)
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f"[grade_aggregates] recompute failed lesson_id={lesson_id}: {e}")
+        return False
+    finally:
+        db.close()
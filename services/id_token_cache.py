@@ -0,0 +1,60 @@
+# services/id_token_cache.py
+import hashlib
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from config import FIREBASE_CHECK_REVOKED, ID_TOKEN_CACHE_MAXSIZE, ID_TOKEN_CACHE_MAX_TTL_SECONDS
+from services.ttl_cache import TTLCache
+
+# sha256(IDトークン) -> 検証済みのデコード結果（トークンの exp まで保持）
+_verified_tokens = TTLCache(ID_TOKEN_CACHE_MAX_TTL_SECONDS, maxsize=ID_TOKEN_CACHE_MAXSIZE)
+_verifications = 0
+_verifications_lock = threading.Lock()
+
+
+def _token_key(id_token: str) -> str:
+    # トークン本体をメモリ上のキーとして持たないようハッシュ化する
+    return hashlib.sha256(id_token.encode("utf-8")).hexdigest()
+
+
+def verify_id_token_cached(
+    id_token: str,
+    verifier: Callable[[str], Dict[str, Any]],
+) -> Dict[str, Any]:
+    """
+    検証済みのトークンならキャッシュから返し、無ければ verifier で検証してキャッシュする。
+    検証に失敗した場合は verifier の例外をそのまま送出する（失敗結果はキャッシュしない）。
+    FIREBASE_CHECK_REVOKED=1 の場合は、失効をすぐ反映するためキャッシュを使わず毎回検証する。
+    """
+    global _verifications
+    if FIREBASE_CHECK_REVOKED:
+        claims = verifier(id_token)
+        with _verifications_lock:
+            _verifications += 1
+        return claims
+
+    key = _token_key(id_token)
+    claims = _verified_tokens.get(key)
+    if claims is not None:
+        return dict(claims)
+
+    claims = verifier(id_token)
+    with _verifications_lock:
+        _verifications += 1
+
+    # 期限切れのトークンを返さないよう、exp までの残り時間だけ保持する
+    remaining = float(claims.get("exp", 0)) - time.time()
+    if remaining > 0:
+        _verified_tokens.set(key, dict(claims), ttl_seconds=min(remaining, ID_TOKEN_CACHE_MAX_TTL_SECONDS))
+    return dict(claims)
+
+
+def token_cache_stats() -> Dict[str, int]:
+    """
+    キャッシュのメトリクス（件数・ヒット・ミス・追い出し・署名検証回数）を返す。
+    """
+    stats = _verified_tokens.stats()
+    with _verifications_lock:
+        stats["verifications"] = _verifications
+    return stats
@@ -0,0 +1,270 @@
+# services/item_analysis.py
+import warnings
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from models import LessonAnswerDataTable, LessonQuestionsTable, LessonThemesTable
+
+CHOICE_NUMBERS = (1, 2, 3, 4)
+RESPONSE_TIME_PERCENTILES = (25, 50, 75, 90)
+
+
+@dataclass
+class AnswerMatrix:
+    """
+    生徒 × 問題 の密行列。
+    presented: 出題されたか / answered: 回答済みか / correct: 正解か
+    choice: 選択肢番号（未回答は0）/ duration: 回答時間(秒, 不明はNaN)
+    """
+    student_ids: np.ndarray
+    question_ids: np.ndarray
+    question_labels: Dict[int, Optional[str]]
+    presented: np.ndarray
+    answered: np.ndarray
+    correct: np.ndarray
+    choice: np.ndarray
+    duration: np.ndarray
+
+
+def load_answer_matrix(
+    db: Session,
+    lesson_id: Optional[int] = None,
+    units_id: Optional[int] = None,
+) -> AnswerMatrix:
+    """
+    授業1件、または単元全体の回答を必要な列だけ取得し、密行列に展開する。
+    同じ生徒・問題の回答が複数授業にある場合は、後に作成されたものを採用する。
+    """
+    query = (
+        db.query(
+            LessonAnswerDataTable.student_id,
+            LessonAnswerDataTable.lesson_question_id,
+            LessonAnswerDataTable.choice_number,
+            LessonAnswerDataTable.answer_correctness,
+            LessonAnswerDataTable.answer_start_unix,
+            LessonAnswerDataTable.answer_end_unix,
+            LessonQuestionsTable.correctness_number,
+            LessonQuestionsTable.lesson_question_label,
+        )
+        .join(LessonQuestionsTable, LessonAnswerDataTable.lesson_question_id == LessonQuestionsTable.lesson_question_id)
+    )
+    if lesson_id is not None:
+        query = query.filter(LessonAnswerDataTable.lesson_id == lesson_id)
+    if units_id is not None:
+        query = (
+            query.join(LessonThemesTable, LessonAnswerDataTable.lesson_theme_id == LessonThemesTable.lesson_theme_id)
+            .filter(LessonThemesTable.units_id == units_id)
+        )
+    rows = query.order_by(LessonAnswerDataTable.lesson_answer_data_id).all()
+
+    if not rows:
+        empty = np.zeros((0, 0))
+        return AnswerMatrix(
+            student_ids=np.zeros(0, dtype=np.int64),
+            question_ids=np.zeros(0, dtype=np.int64),
+            question_labels={},
+            presented=empty.astype(bool),
+            answered=empty.astype(bool),
+            correct=empty.astype(bool),
+            choice=empty.astype(np.int64),
+            duration=empty,
+        )
+
+    # 列ごとの配列に変換（None は番兵値に置き換える）
+    student_col = np.fromiter((r.student_id for r in rows), dtype=np.int64, count=len(rows))
+    question_col = np.fromiter((r.lesson_question_id for r in rows), dtype=np.int64, count=len(rows))
+    choice_col = np.fromiter((r.choice_number or 0 for r in rows), dtype=np.int64, count=len(rows))
+    recorded_col = np.fromiter(
+        (-1 if r.answer_correctness is None else int(bool(r.answer_correctness)) for r in rows),
+        dtype=np.int8, count=len(rows),
+    )
+    key_col = np.fromiter((r.correctness_number or 0 for r in rows), dtype=np.int64, count=len(rows))
+    start_col = np.fromiter(
+        (np.nan if r.answer_start_unix is None else r.answer_start_unix for r in rows),
+        dtype=np.float64, count=len(rows),
+    )
+    end_col = np.fromiter(
+        (np.nan if r.answer_end_unix is None else r.answer_end_unix for r in rows),
+        dtype=np.float64, count=len(rows),
+    )
+
+    student_ids, s_idx = np.unique(student_col, return_inverse=True)
+    question_ids, q_idx = np.unique(question_col, return_inverse=True)
+    shape = (len(student_ids), len(question_ids))
+
+    # 正誤: 記録済みの answer_correctness を優先し、無ければ選択肢と正解番号を比較
+    correct_col = np.where(
+        recorded_col >= 0,
+        recorded_col == 1,
+        (choice_col > 0) & (key_col > 0) & (choice_col == key_col),
+    )
+
+    presented = np.zeros(shape, dtype=bool)
+    choice = np.zeros(shape, dtype=np.int64)
+    correct = np.zeros(shape, dtype=bool)
+    duration = np.full(shape, np.nan)
+
+    # 後の行で上書き（行は lesson_answer_data_id 順）
+    presented[s_idx, q_idx] = True
+    choice[s_idx, q_idx] = choice_col
+    correct[s_idx, q_idx] = correct_col
+    duration[s_idx, q_idx] = end_col - start_col
+
+    return AnswerMatrix(
+        student_ids=student_ids,
+        question_ids=question_ids,
+        question_labels={r.lesson_question_id: r.lesson_question_label for r in rows},
+        presented=presented,
+        answered=choice > 0,
+        correct=correct,
+        choice=choice,
+        duration=duration,
+    )
+
+
+def _nan_to_none(values: np.ndarray) -> List[Optional[float]]:
+    return [None if np.isnan(v) else round(float(v), 3) for v in values]
+
+
+def analyze_items(matrix: AnswerMatrix) -> dict:
+    """
+    行列から設問統計と生徒得点を一括で計算する。
+    - 正答率（回答者ベース）
+    - 生徒ごとの得点（出題数ベースの正答率）
+    - 点双列相関による識別力（当該設問を除いた合計点との相関）
+    - 選択肢ごとの選択数
+    - 回答時間のパーセンタイル
+    """
+    presented = matrix.presented
+    answered = matrix.answered
+    x = matrix.correct.astype(np.float64)
+
+    presented_count = presented.sum(axis=0)
+    answered_count = answered.sum(axis=0)
+    correct_count = matrix.correct.sum(axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        correct_rate = np.where(answered_count > 0, correct_count / answered_count * 100, np.nan)
+
+        # 生徒ごとの得点
+        student_presented = presented.sum(axis=1)
+        student_answered = answered.sum(axis=1)
+        student_correct = matrix.correct.sum(axis=1)
+        score = np.where(student_presented > 0, student_correct / student_presented * 100, 0.0)
+
+        # 点双列相関（出題されたセルだけで、設問ごとに 0/1 と残り得点のピアソン相関を取る）
+        p = presented.astype(np.float64)
+        rest = student_correct[:, None] - x
+        n = presented_count.astype(np.float64)
+        mean_x = (x * p).sum(axis=0) / n
+        mean_r = (rest * p).sum(axis=0) / n
+        dx = (x - mean_x) * p
+        dr = (rest - mean_r) * p
+        cov = (dx * dr).sum(axis=0)
+        var = np.sqrt((dx ** 2).sum(axis=0) * (dr ** 2).sum(axis=0))
+        discrimination = np.where(var > 0, cov / var, np.nan)
+
+    # 選択肢の分布 (問題数 × 選択肢数)
+    choice_counts = np.stack([(matrix.choice == c).sum(axis=0) for c in CHOICE_NUMBERS], axis=1)
+
+    # 回答時間のパーセンタイル (パーセンタイル数 × 問題数)
+    if matrix.duration.size:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            time_percentiles = np.nanpercentile(matrix.duration, RESPONSE_TIME_PERCENTILES, axis=0)
+    else:
+        time_percentiles = np.zeros((len(RESPONSE_TIME_PERCENTILES), 0))
+
+    rate_list = _nan_to_none(correct_rate)
+    disc_list = _nan_to_none(discrimination)
+    percentile_lists = [_nan_to_none(row) for row in time_percentiles]
+
+    items = []
+    for j, question_id in enumerate(matrix.question_ids.tolist()):
+        items.append({
+            "question_id": question_id,
+            "question_label": matrix.question_labels.get(question_id) or f"問{question_id}",
+            "presented_count": int(presented_count[j]),
+            "answered_count": int(answered_count[j]),
+            "correct_count": int(correct_count[j]),
+            "correct_rate": rate_list[j],
+            "discrimination": disc_list[j],
+            "choice_distribution": {c: int(choice_counts[j, k]) for k, c in enumerate(CHOICE_NUMBERS)},
+            "response_time_percentiles": {
+                f"p{pct}": percentile_lists[k][j] for k, pct in enumerate(RESPONSE_TIME_PERCENTILES)
+            },
+        })
+
+    students = [
+        {
+            "student_id": student_id,
+            "presented_count": int(student_presented[i]),
+            "answered_count": int(student_answered[i]),
+            "correct_count": int(student_correct[i]),
+            "score": round(float(score[i]), 1),
+        }
+        for i, student_id in enumerate(matrix.student_ids.tolist())
+    ]
+
+    return {"items": items, "students": students}
+
+
+def analyze_response_times(matrix: AnswerMatrix, fast_threshold_sec: float = 3.0) -> dict:
+    """
+    設問別・生徒別の回答時間統計（中央値・p90）と外れ値を求める。
+    - 速すぎる回答: fast_threshold_sec 未満（当て推量の疑い）
+    - 遅すぎる回答: 設問ごとの Q3 + 1.5 × IQR 超
+    回答時間が不明・負のセルは計算から除く。
+    """
+    duration = np.where(matrix.answered & (matrix.duration >= 0), matrix.duration, np.nan)
+    valid = ~np.isnan(duration)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        if duration.size:
+            q_p25, q_median, q_p75, q_p90 = np.nanpercentile(duration, (25, 50, 75, 90), axis=0)
+            s_median, s_p90 = np.nanpercentile(duration, (50, 90), axis=1)
+        else:
+            q_p25 = q_median = q_p75 = q_p90 = np.zeros(duration.shape[1])
+            s_median = s_p90 = np.zeros(duration.shape[0])
+
+    slow_limit = q_p75 + 1.5 * (q_p75 - q_p25)
+    with np.errstate(invalid="ignore"):
+        fast = valid & (duration < fast_threshold_sec)
+        slow = valid & (duration > slow_limit[None, :])
+
+    q_median_list, q_p90_list, slow_limit_list = _nan_to_none(q_median), _nan_to_none(q_p90), _nan_to_none(slow_limit)
+    s_median_list, s_p90_list = _nan_to_none(s_median), _nan_to_none(s_p90)
+    question_ids = matrix.question_ids.tolist()
+    student_ids = matrix.student_ids.tolist()
+
+    questions = [
+        {
+            "question_id": question_id,
+            "question_label": matrix.question_labels.get(question_id) or f"問{question_id}",
+            "timed_count": int(valid[:, j].sum()),
+            "median_sec": q_median_list[j],
+            "p90_sec": q_p90_list[j],
+            "slow_limit_sec": slow_limit_list[j],
+            "fast_count": int(fast[:, j].sum()),
+            "slow_count": int(slow[:, j].sum()),
+        }
+        for j, question_id in enumerate(question_ids)
+    ]
+
+    students = [
+        {
+            "student_id": student_id,
+            "timed_count": int(valid[i].sum()),
+            "median_sec": s_median_list[i],
+            "p90_sec": s_p90_list[i],
+            "fast_question_ids": [question_ids[j] for j in np.flatnonzero(fast[i])],
+            "slow_question_ids": [question_ids[j] for j in np.flatnonzero(slow[i])],
+        }
+        for i, student_id in enumerate(student_ids)
+    ]
+
+    return {"questions": questions, "students": students}
@@ -0,0 +1,186 @@
+# services/login_history_writer.py
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import insert
+
+from config import (
+    LOGIN_HISTORY_QUEUE_SIZE,
+    LOGIN_HISTORY_BATCH_SIZE,
+    LOGIN_HISTORY_FLUSH_INTERVAL_SECONDS,
+)
+from database import SessionLocal
+from models import LoginHistoryTable
+
+_queue: "queue.Queue[dict]" = queue.Queue(maxsize=LOGIN_HISTORY_QUEUE_SIZE)
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+# ライターの起動・停止とキューへの追加を直列化する（停止後に積まれた行が残らないようにする）
+_lock = threading.Lock()
+
+# 書き込み失敗時の再試行間隔の上限（秒）と、停止時の再試行回数
+_RETRY_MAX_SECONDS = 60
+_FINAL_FLUSH_ATTEMPTS = 3
+
+
+def _write_rows(rows: List[dict]) -> bool:
+    """
+    ログイン履歴をまとめて1回の INSERT で書き込む。成功したら True。
+    """
+    db = SessionLocal()
+    try:
+        db.execute(insert(LoginHistoryTable), rows)
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f"[login_history] failed to write {len(rows)} rows: {e}")
+        return False
+    finally:
+        db.close()
+
+
+def _log_unwritten(rows: List[dict]) -> None:
+    # 書けなかった行は、後から復旧できるようログに出す
+    for row in rows:
+        print(f"[login_history] unwritten row: {json.dumps(row, default=str)}")
+
+
+def _write_or_log(rows: List[dict]) -> None:
+    """
+    リクエストの処理中にその場で書き込む。待たずに1回だけ試し、失敗した行はログに出す。
+    """
+    if not _write_rows(rows):
+        _log_unwritten(rows)
+
+
+def _flush_remaining(rows: List[dict]) -> None:
+    """
+    停止時に残りを書き出す（ライタースレッドか停止処理からのみ呼ぶ）。
+    数回再試行しても書けなかった行はログに出す。
+    """
+    for start in range(0, len(rows), LOGIN_HISTORY_BATCH_SIZE):
+        batch = rows[start:start + LOGIN_HISTORY_BATCH_SIZE]
+        for attempt in range(_FINAL_FLUSH_ATTEMPTS):
+            if _write_rows(batch):
+                break
+            time.sleep(2 ** attempt)
+        else:
+            _log_unwritten(batch)
+
+
+def _drain(limit: int) -> List[dict]:
+    rows = []
+    while len(rows) < limit:
+        try:
+            rows.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return rows
+
+
+def _run() -> None:
+    # 書き込みに失敗したバッチ。書けるまで指数バックオフで再試行し、その間の新しい行はキューに溜める
+    pending: List[dict] = []
+    backoff = LOGIN_HISTORY_FLUSH_INTERVAL_SECONDS
+    while not _stop.is_set():
+        if pending:
+            if _write_rows(pending):
+                pending = []
+                backoff = LOGIN_HISTORY_FLUSH_INTERVAL_SECONDS
+            else:
+                _stop.wait(backoff)
+                backoff = min(backoff * 2, _RETRY_MAX_SECONDS)
+            continue
+
+        try:
+            first = _queue.get(timeout=LOGIN_HISTORY_FLUSH_INTERVAL_SECONDS)
+        except queue.Empty:
+            continue
+        # 最初の1件を受け取ったら、一定時間内に溜まった分をまとめて書く
+        if _queue.qsize() < LOGIN_HISTORY_BATCH_SIZE - 1:
+            _stop.wait(LOGIN_HISTORY_FLUSH_INTERVAL_SECONDS)
+        rows = [first] + _drain(LOGIN_HISTORY_BATCH_SIZE - 1)
+        if not _write_rows(rows):
+            pending = rows
+
+    # 停止時は再試行待ちの分と残りをすべて書き出す
+    _flush_remaining(pending + _drain(_queue.qsize() + LOGIN_HISTORY_BATCH_SIZE))
+
+
+def record_login(
+    *,
+    email: Optional[str],
+    firebase_uid: Optional[str],
+    student_id: Optional[int],
+    token_valid: bool,
+    is_whitelisted: bool,
+    result: str,
+    reason_code: Optional[str],
+    http_status: Optional[int],
+) -> None:
+    """
+    ログイン履歴1件をキューに積む（書き込みはバックグラウンドで行う）。
+    ライターが止まっていれば起動し直す。停止処理中、またはキューが満杯の場合は
+    その場で1回だけ書き込み、書けなければログに出す（リクエストを待たせない）。
+    """
+    row = {
+        # まとめて書くため、発生時刻はサーバー既定値ではなく積んだ時点で確定させる
+        "occurred_at": datetime.utcnow(),
+        "mail_address": email,
+        "firebase_uid": firebase_uid,
+        "student_id": student_id,
+        "token_valid": 1 if token_valid else 0,
+        "is_whitelisted": 1 if is_whitelisted else 0,
+        "result": result,
+        "reason_code": reason_code,
+        "http_status": http_status,
+    }
+    with _lock:
+        if not _stop.is_set():
+            _ensure_thread()
+            try:
+                _queue.put_nowait(row)
+                return
+            except queue.Full:
+                print("[login_history] queue is full, writing synchronously")
+    _write_or_log([row])
+
+
+def _ensure_thread() -> None:
+    # _lock を持った状態で呼ぶ
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        return
+    if _thread is not None:
+        print("[login_history] writer thread is not running, restarting")
+    _thread = threading.Thread(target=_run, name="login-history-writer", daemon=True)
+    _thread.start()
+
+
+def start_login_history_writer() -> None:
+    with _lock:
+        _stop.clear()
+        _ensure_thread()
+
+
+def stop_login_history_writer(timeout: float = 10.0) -> None:
+    """
+    ライターを停止し、キューに残っている履歴を書き出す。
+    """
+    global _thread
+    with _lock:
+        # 以降の record_login はその場で書き込む
+        _stop.set()
+        thread, _thread = _thread, None
+    if thread is not None:
+        thread.join(timeout)
+    # ライターの最後の書き出しの後に積まれた分も書き出す
+    rows = _drain(_queue.qsize() + LOGIN_HISTORY_BATCH_SIZE)
+    while rows:
+        _flush_remaining(rows)
+        rows = _drain(_queue.qsize() + LOGIN_HISTORY_BATCH_SIZE)
@@ -0,0 +1,80 @@
+# services/question_cache.py
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from config import QUESTION_CACHE_TTL_SECONDS
+from models import LessonQuestionsTable, LessonThemesTable, LessonThemeContentsTable
+from services.ttl_cache import TTLCache
+
+
+class CachedQuestion(NamedTuple):
+    lesson_question_id: int
+    correctness_number: Optional[int]
+
+
+# theme_id -> 問題ID昇順の問題タプル
+_theme_questions = TTLCache(QUESTION_CACHE_TTL_SECONDS)
+
+
+def get_questions_by_theme(db: Session, theme_ids: Iterable[int]) -> Dict[int, List[CachedQuestion]]:
+    """
+    テーマIDごとの問題リスト（問題ID昇順）を返す。
+    キャッシュに無い・期限切れのテーマだけをまとめて1クエリで取得する。
+    問題が0件のテーマも空リストとしてキャッシュする。
+    """
+    theme_ids = list(dict.fromkeys(theme_ids))
+
+    result: Dict[int, List[CachedQuestion]] = {}
+    missing: List[int] = []
+    for theme_id in theme_ids:
+        questions = _theme_questions.get(theme_id)
+        if questions is not None:
+            result[theme_id] = list(questions)
+        else:
+            missing.append(theme_id)
+
+    if not missing:
+        return result
+
+    rows = (
+        db.query(
+            LessonThemesTable.lesson_theme_id,
+            LessonQuestionsTable.lesson_question_id,
+            LessonQuestionsTable.correctness_number,
+        )
+        .join(LessonThemeContentsTable, LessonThemesTable.lesson_theme_contents_id == LessonThemeContentsTable.lesson_theme_contents_id)
+        .join(LessonQuestionsTable, LessonThemeContentsTable.lesson_theme_contents_id == LessonQuestionsTable.lesson_theme_contents_id)
+        .filter(LessonThemesTable.lesson_theme_id.in_(missing))
+        .order_by(LessonThemesTable.lesson_theme_id, LessonQuestionsTable.lesson_question_id.asc())
+        .all()
+    )
+
+    fetched: Dict[int, List[CachedQuestion]] = {theme_id: [] for theme_id in missing}
+    for theme_id, question_id, correctness_number in rows:
+        fetched[theme_id].append(CachedQuestion(question_id, correctness_number))
+
+    for theme_id, questions in fetched.items():
+        _theme_questions.set(theme_id, tuple(questions))
+
+    result.update(fetched)
+    return result
+
+
+def get_question_ids(db: Session, theme_id: int) -> List[int]:
+    """
+    1テーマ分の問題IDリスト（昇順）を返す。
+    """
+    questions = get_questions_by_theme(db, [theme_id])[theme_id]
+    return [q.lesson_question_id for q in questions]
+
+
+def invalidate_theme_questions(theme_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    キャッシュを破棄する。theme_ids 未指定なら全件破棄。
+    問題バンクを更新した後に呼び出す。
+    """
+    if theme_ids is None:
+        _theme_questions.clear()
+    else:
+        _theme_questions.pop_many(theme_ids)
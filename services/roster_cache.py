@@ -0,0 +1,208 @@
+# services/roster_cache.py
+import threading
+from collections import defaultdict
+from itertools import chain
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config import ROSTER_CACHE_TTL_SECONDS
+from models import ClassTable, StudentTable
+from services.ttl_cache import TTLCache
+
+
+class CachedStudent(NamedTuple):
+    student_id: int
+    class_id: int
+    students_number: int
+    name: Optional[str]
+    mail_address: Optional[str]
+
+
+class CachedClass(NamedTuple):
+    class_id: int
+    class_name: Optional[str]
+    grade: Optional[int]
+    teacher: Optional[str]
+    academic_year: Optional[int]
+
+
+class _Roster(NamedTuple):
+    by_id: Dict[int, CachedStudent]
+    by_email: Dict[str, CachedStudent]
+    by_class: Dict[int, Tuple[CachedStudent, ...]]
+    classes: Dict[int, CachedClass]
+
+
+_ROSTER_KEY = "roster"
+
+# 生徒・クラスの名簿全体を1エントリとして保持する（1校分なので数千件程度）
+_roster_cache = TTLCache(ROSTER_CACHE_TTL_SECONDS)
+_load_lock = threading.Lock()
+
+# 名簿に載るテーブルと、それらを書き換えたセッションに立てる印（Session.info のキー）
+_ROSTER_MODELS = (StudentTable, ClassTable)
+_ROSTER_WRITTEN = "roster_written"
+
+
+def _load_roster(db: Session) -> _Roster:
+    """
+    クラスと生徒を必要な列だけ2クエリで読み、検索用の辞書を作る。
+    """
+    classes = {
+        row.class_id: CachedClass(row.class_id, row.class_name, row.grade, row.teacher, row.academic_year)
+        for row in db.query(
+            ClassTable.class_id,
+            ClassTable.class_name,
+            ClassTable.grade,
+            ClassTable.teacher,
+            ClassTable.academic_year,
+        )
+    }
+
+    rows = (
+        db.query(
+            StudentTable.student_id,
+            StudentTable.class_id,
+            StudentTable.students_number,
+            StudentTable.name,
+            StudentTable.mail_address,
+        )
+        .order_by(StudentTable.class_id, StudentTable.students_number)
+        .all()
+    )
+
+    by_id: Dict[int, CachedStudent] = {}
+    by_email: Dict[str, CachedStudent] = {}
+    by_class: Dict[int, List[CachedStudent]] = defaultdict(list)
+    for row in rows:
+        student = CachedStudent(row.student_id, row.class_id, row.students_number, row.name, row.mail_address)
+        by_id[student.student_id] = student
+        if student.mail_address:
+            by_email[student.mail_address.lower()] = student
+        by_class[student.class_id].append(student)
+
+    return _Roster(
+        by_id=by_id,
+        by_email=by_email,
+        by_class={class_id: tuple(students) for class_id, students in by_class.items()},
+        classes=classes,
+    )
+
+
+def _get_roster(db: Session) -> _Roster:
+    roster = _roster_cache.get(_ROSTER_KEY)
+    if roster is not None:
+        return roster
+    # 期限切れ直後に同時アクセスが来ても、DBから読むのは1回だけにする
+    with _load_lock:
+        roster = _roster_cache.get(_ROSTER_KEY)
+        if roster is None:
+            roster = _load_roster(db)
+            _roster_cache.set(_ROSTER_KEY, roster)
+        return roster
+
+
+def get_student_by_email(db: Session, email: str) -> Optional[CachedStudent]:
+    """
+    メールアドレスから生徒を引く（ログイン時のホワイトリスト照合）。
+    大文字・小文字は区別しない（Firebase が返すメールアドレスと名簿の表記が異なることがあるため）。
+    名簿に無い場合は、追加直後の生徒を取りこぼさないようDBも確認する。
+    """
+    roster = _get_roster(db)
+    student = roster.by_email.get(email.lower())
+    if student is not None:
+        return student
+    return _get_student_from_db(db, roster, StudentTable.mail_address == email)
+
+
+def _get_student_from_db(db: Session, roster: _Roster, condition) -> Optional[CachedStudent]:
+    """
+    名簿に無い生徒をDBから引く。
+    """
+    row = (
+        db.query(
+            StudentTable.student_id,
+            StudentTable.class_id,
+            StudentTable.students_number,
+            StudentTable.name,
+            StudentTable.mail_address,
+        )
+        .filter(condition)
+        .first()
+    )
+    if row is None:
+        return None
+    student = CachedStudent(row.student_id, row.class_id, row.students_number, row.name, row.mail_address)
+    # 名簿に無い・内容が違う場合だけ、名簿が古いとみなして次回アクセス時に作り直す
+    # （照合順序の違いなどで毎回ここに来る生徒のたびに名簿全体を読み直さないようにする）
+    if roster.by_id.get(student.student_id) != student:
+        invalidate_roster()
+    return student
+
+
+def get_student(db: Session, student_id: int) -> Optional[CachedStudent]:
+    """
+    生徒IDから生徒を引く。名簿に無い場合は、追加直後の生徒を取りこぼさないようDBも確認する。
+    """
+    roster = _get_roster(db)
+    student = roster.by_id.get(student_id)
+    if student is not None:
+        return student
+    return _get_student_from_db(db, roster, StudentTable.student_id == student_id)
+
+
+def get_class_students(db: Session, class_id: int) -> List[CachedStudent]:
+    """
+    クラスの生徒一覧（出席番号順）を返す。
+    """
+    return list(_get_roster(db).by_class.get(class_id, ()))
+
+
+def get_class(db: Session, class_id: int) -> Optional[CachedClass]:
+    return _get_roster(db).classes.get(class_id)
+
+
+def invalidate_roster() -> None:
+    """
+    名簿キャッシュを破棄する。生徒・クラスの書き込みをコミットすると自動で呼ばれる。
+    DBを直接更新した場合は DELETE /classes/cache から呼び出す。
+    """
+    _roster_cache.clear()
+
+
+# ======================
+# 書き込み時の破棄
+# ======================
+# 生徒・クラスを書き換えたセッションがコミットしたら名簿を破棄する。
+# 書き込み用の API が無くても、同じプロセスで動くスクリプト・今後追加する API の更新を取りこぼさない。
+# 他のワーカーや DB を直接更新した分は、ROSTER_CACHE_TTL_SECONDS か DELETE /classes/cache で反映される。
+
+@event.listens_for(Session, "after_flush")
+def _track_roster_flush(session: Session, flush_context) -> None:
+    if any(isinstance(obj, _ROSTER_MODELS) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info[_ROSTER_WRITTEN] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_roster_statement(state) -> None:
+    # query().update() / delete() や insert(StudentTable) などの一括更新
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return
+    mapper = state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, _ROSTER_MODELS):
+        state.session.info[_ROSTER_WRITTEN] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_roster_after_commit(session: Session) -> None:
+    if session.info.pop(_ROSTER_WRITTEN, False):
+        invalidate_roster()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_roster_writes(session: Session, previous_transaction) -> None:
+    # セーブポイントのロールバックでは外側の書き込みが残るため、最も外側のときだけ忘れる
+    if previous_transaction.parent is None:
+        session.info.pop(_ROSTER_WRITTEN, None)
@@ -0,0 +1,120 @@
+# services/survey_counters.py
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from config import SURVEY_COUNTER_TTL_SECONDS
+from models import LessonSurveyTable
+from services.ttl_cache import TTLCache
+
+# lesson_id -> {"understanding": Counter, "difficulty": Counter}
+# 他ワーカーでの更新分を取り込むため、TTL経過後はDBから作り直す
+_counters = TTLCache(SURVEY_COUNTER_TTL_SECONDS, maxsize=1000)
+_lock = threading.Lock()
+# lesson_id -> [読み込み中の件数, 書き込みの世代]（読み込み開始後に書き込みがあったかの判定用）
+# 読み込み中の授業だけを保持し、最後の読み込みが終わったら消す
+_loads: Dict[int, List[int]] = {}
+
+SurveyLevels = Tuple[Optional[int], Optional[int]]  # (understanding_level, difficulty_point)
+
+
+def _load_counters(db: Session, lesson_id: int) -> dict:
+    """
+    授業1件分のヒストグラムを1回の GROUP BY で作る。
+    """
+    rows = (
+        db.query(
+            LessonSurveyTable.understanding_level,
+            LessonSurveyTable.difficulty_point,
+            func.count(LessonSurveyTable.lesson_survey_id)
+        )
+        .filter(LessonSurveyTable.lesson_id == lesson_id)
+        .group_by(LessonSurveyTable.understanding_level, LessonSurveyTable.difficulty_point)
+        .all()
+    )
+    understanding = Counter()
+    difficulty = Counter()
+    for level, point, count in rows:
+        if level is not None:
+            understanding[level] += count
+        if point is not None:
+            difficulty[point] += count
+    return {"understanding": understanding, "difficulty": difficulty}
+
+
+def _snapshot(counters: dict) -> Dict[str, Dict[int, int]]:
+    return {
+        "understanding_level_distribution": {k: v for k, v in sorted(counters["understanding"].items()) if v > 0},
+        "difficulty_point_distribution": {k: v for k, v in sorted(counters["difficulty"].items()) if v > 0},
+    }
+
+
+def get_survey_summary(db: Session, lesson_id: int) -> Dict[str, Dict[int, int]]:
+    """
+    授業のアンケート集計を返す。メモリ上のカウンタがあればDBを読まない。
+    読み込み中にアンケートが登録・更新された場合（世代が変わった場合）は、
+    古い集計をキャッシュしないよう結果を保存しない。
+    """
+    with _lock:
+        counters = _counters.get(lesson_id)
+        if counters is not None:
+            return _snapshot(counters)
+        load = _loads.setdefault(lesson_id, [0, 0])
+        load[0] += 1
+        generation = load[1]
+
+    try:
+        counters = _load_counters(db, lesson_id)
+    except Exception:
+        with _lock:
+            _finish_load(lesson_id, load)
+        raise
+    with _lock:
+        _finish_load(lesson_id, load)
+        if load[1] == generation:
+            _counters.set(lesson_id, counters)
+        return _snapshot(counters)
+
+
+def _finish_load(lesson_id: int, load: List[int]) -> None:
+    load[0] -= 1
+    if load[0] == 0:
+        del _loads[lesson_id]
+
+
+def record_survey_change(
+    lesson_id: Optional[int],
+    old: Optional[SurveyLevels],
+    new: Optional[SurveyLevels],
+) -> Optional[Dict[str, Dict[int, int]]]:
+    """
+    アンケートの登録（old=None）・更新のコミット後に呼ぶ。
+    メモリ上のカウンタがあれば、変わった区分だけを ±1 して最新の集計を返す（DBは読まない）。
+    カウンタが無ければ None を返し、次回の get_survey_summary で DB から作る。
+    読み込み中のカウンタは、この書き込みを含んでいない可能性があるため保存させない。
+    """
+    if lesson_id is None:
+        return None
+    with _lock:
+        load = _loads.get(lesson_id)
+        if load is not None:
+            load[1] += 1
+        counters = _counters.get(lesson_id)
+        if counters is None:
+            return None
+        if old is not None:
+            _apply(counters, old, -1)
+        if new is not None:
+            _apply(counters, new, 1)
+        return _snapshot(counters)
+
+
+def _apply(counters: dict, levels: SurveyLevels, delta: int) -> None:
+    understanding_level, difficulty_point = levels
+    if understanding_level is not None:
+        counters["understanding"][understanding_level] += delta
+    if difficulty_point is not None:
+        counters["difficulty"][difficulty_point] += delta
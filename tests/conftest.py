@@ -0,0 +1,165 @@
+# tests/conftest.py
+import os
+from datetime import date
+
+# IDトークンはローカル生成の鍵で検証する（config の読み込み前に設定する）
+os.environ.setdefault("FIREBASE_AUTH_OFFLINE", "1")
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models
+from models import (
+    ClassTable,
+    LessonQuestionsTable,
+    LessonThemeContentsTable,
+    LessonThemesTable,
+    MaterialTable,
+    StatusTable,
+    StudentTable,
+    TimetableTable,
+    UnitTable,
+)
+from services.ttl_cache import TTLCache
+
+# SQLite では BIGINT の主キーが自動採番されないため、DDL で作るテーブル
+_RAW_DDL = {
+    "login_history": (
+        "CREATE TABLE login_history (login_history_id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "occurred_at DATETIME DEFAULT CURRENT_TIMESTAMP, mail_address VARCHAR(255), firebase_uid VARCHAR(128), "
+        "student_id INTEGER, token_valid BOOLEAN NOT NULL, is_whitelisted BOOLEAN NOT NULL, "
+        "result VARCHAR(16) NOT NULL, reason_code VARCHAR(64), http_status INTEGER)"
+    ),
+    "blob_deletion_queue": (
+        "CREATE TABLE blob_deletion_queue (blob_deletion_id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "blob_name VARCHAR(255) NOT NULL UNIQUE, attempts INTEGER NOT NULL, next_attempt_at DATETIME NOT NULL, "
+        "last_error VARCHAR(255), created_at DATETIME NOT NULL)"
+    ),
+}
+
+# テストごとに空にするプロセス内キャッシュを持つモジュール
+_CACHE_MODULES = [
+    "services.question_cache",
+    "services.content_cache",
+    "services.grade_aggregates",
+    "services.roster_cache",
+    "services.survey_counters",
+    "services.id_token_cache",
+]
+
+
+@pytest.fixture(autouse=True)
+def _reset_caches():
+    import importlib
+
+    for name in _CACHE_MODULES:
+        module = importlib.import_module(name)
+        for value in list(vars(module).values()):
+            if isinstance(value, TTLCache):
+                value.clear()
+    importlib.import_module("services.grade_aggregates")._grade_generations.clear()
+    importlib.import_module("services.survey_counters")._loads.clear()
+    yield
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    tables = [t for t in models.Base.metadata.sorted_tables if t.name not in _RAW_DDL]
+    models.Base.metadata.create_all(engine, tables=tables)
+    with engine.begin() as conn:
+        for ddl in _RAW_DDL.values():
+            conn.execute(text(ddl))
+    return engine
+
+
+@pytest.fixture
+def session_factory(engine, monkeypatch):
+    import services.blob_deletions
+    import services.grade_aggregates
+    import services.login_history_writer
+
+    factory = sessionmaker(bind=engine, autoflush=False)
+    for module in (services.blob_deletions, services.grade_aggregates, services.login_history_writer):
+        monkeypatch.setattr(module, "SessionLocal", factory)
+    return factory
+
+
+@pytest.fixture
+def login_writer(session_factory, monkeypatch):
+    """
+    ログイン履歴ライター（record_login で起動する）を、テストの終わりに止めて初期状態に戻す。
+    """
+    import services.login_history_writer as writer
+
+    monkeypatch.setattr(writer, "LOGIN_HISTORY_FLUSH_INTERVAL_SECONDS", 0.01)
+    yield writer
+    writer.stop_login_history_writer(timeout=2)
+    writer._stop.clear()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def seeded(session_factory):
+    """
+    クラス2つ（1-A: 生徒1〜3, 1-B: 生徒4）、教材1・単元1・テーマ3件（各3問）、時間割1件。
+    """
+    db = session_factory()
+    for status_id in (1, 2, 3):
+        db.add(StatusTable(status_id=status_id, status_name=str(status_id)))
+    db.add(ClassTable(class_id=1, class_name="1-A", grade=1, academic_year=2025))
+    db.add(ClassTable(class_id=2, class_name="1-B", grade=1, academic_year=2025))
+    for student_id in range(1, 5):
+        db.add(StudentTable(
+            student_id=student_id, class_id=1 if student_id <= 3 else 2, students_number=student_id,
+            name=f"s{student_id}", mail_address=f"s{student_id}@example.com",
+        ))
+    db.add(MaterialTable(material_id=1, material_name="物理基礎"))
+    db.add(UnitTable(units_id=1, material_id=1, part_name="p", chapter_name="c", unit_name="u"))
+    question_id = 1
+    for contents_id in (1, 2, 3):
+        db.add(LessonThemeContentsTable(lesson_theme_contents_id=contents_id))
+        db.add(LessonThemesTable(
+            lesson_theme_id=contents_id, lesson_theme_contents_id=contents_id, units_id=1,
+            lesson_theme_name=f"t{contents_id}",
+        ))
+        for _ in range(3):
+            db.add(LessonQuestionsTable(
+                lesson_question_id=question_id, lesson_theme_contents_id=contents_id,
+                lesson_question_label=f"Q{question_id}", correctness_number=(question_id % 4) + 1,
+            ))
+            question_id += 1
+    db.add(TimetableTable(timetable_id=1, date=date(2025, 4, 7), day_of_week="月", period=1, time="09:00-09:50"))
+    db.commit()
+    db.close()
+    return session_factory
+
+
+@pytest.fixture
+def client(session_factory):
+    """
+    DB をテスト用に差し替えた TestClient（lifespan は動かさない）。
+    """
+    from fastapi.testclient import TestClient
+
+    import main
+    from database import get_db
+
+    def override():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    main.app.dependency_overrides[get_db] = override
+    yield TestClient(main.app)
+    main.app.dependency_overrides.pop(get_db, None)
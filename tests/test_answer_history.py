@@ -0,0 +1,54 @@
+# tests/test_answer_history.py
+from models import LessonAnswerDataTable, LessonTable
+
+
+def _add_history(db):
+    db.add(LessonTable(lesson_id=1, class_id=1, timetable_id=1, lesson_name="l", lesson_status=3))
+    # (answer_id, student_id, question_id, choice_number, answer_end_unix)
+    answers = [
+        (1, 1, 1, 2, 100),
+        (2, 1, 2, 1, 200),
+        (3, 1, 3, 4, 200),      # 回答時刻が同じ行は ID の降順
+        (4, 1, 4, None, None),  # 未回答は履歴に含めない
+        (5, 2, 1, 2, 300),      # 別の生徒
+        (6, 1, 5, 3, 150),
+    ]
+    for answer_id, student_id, question_id, choice, end_unix in answers:
+        db.add(LessonAnswerDataTable(
+            lesson_answer_data_id=answer_id, student_id=student_id, lesson_id=1,
+            lesson_theme_id=1 if question_id <= 3 else 2, lesson_question_id=question_id,
+            choice_number=choice, answer_status=1, answer_end_unix=end_unix,
+        ))
+    db.commit()
+
+
+def _pages(client, **params):
+    pages, cursor = [], None
+    while True:
+        body = client.get("/api/answers/history", params={**params, **({"cursor": cursor} if cursor else {})}).json()
+        pages.append([item["lesson_answer_data_id"] for item in body["items"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_history_pages_newest_first_without_gaps(seeded, client, db):
+    _add_history(db)
+
+    assert _pages(client, student_id=1, limit=2) == [[3, 2], [6, 1]]
+    assert _pages(client, student_id=1, limit=3) == [[3, 2, 6], [1]]
+
+
+def test_history_reports_correctness_and_filters_by_theme(seeded, client, db):
+    _add_history(db)
+
+    items = client.get("/api/answers/history", params={"student_id": 1, "lesson_theme_id": 1}).json()["items"]
+
+    # 正解番号（conftest）: 問題1→2 / 問題2→3 / 問題3→4
+    assert [(item["lesson_answer_data_id"], item["is_correct"]) for item in items] == [(3, True), (2, False), (1, True)]
+
+
+def test_invalid_history_cursor_is_rejected(seeded, client):
+    response = client.get("/api/answers/history", params={"student_id": 1, "cursor": "latest"})
+
+    assert response.status_code == 400
@@ -0,0 +1,49 @@
+# tests/test_blob_clients.py
+import asyncio
+
+import pytest
+
+from services import azure_blob
+
+# Azurite の既定アカウント（クライアントの生成だけでは通信しない）
+_AZURITE = (
+    "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;"
+    "AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw==;"
+    "BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;"
+)
+
+
+@pytest.fixture
+def azurite(monkeypatch):
+    monkeypatch.setattr(azure_blob, "AZURE_STORAGE_CONNECTION_STRING", _AZURITE)
+    monkeypatch.setattr(azure_blob, "BLOB_HTTP_POOL_SIZE", 7)
+    yield
+    asyncio.run(azure_blob.close_blob_clients())
+
+
+def test_sync_client_is_shared_and_uses_the_pooled_session(azurite):
+    client = azure_blob.get_blob_service_client()
+
+    assert azure_blob.get_blob_service_client() is client
+    assert client.account_name == "devstoreaccount1"
+    adapter = client._pipeline._transport.session.get_adapter("http://127.0.0.1:10000")
+    assert adapter._pool_maxsize == 7
+
+
+def test_close_drops_the_shared_clients(azurite):
+    assert asyncio.run(azure_blob.init_blob_clients()) is True
+    client = azure_blob.get_blob_service_client()
+
+    asyncio.run(azure_blob.close_blob_clients())
+
+    assert azure_blob._blob_service_client is None
+    assert azure_blob._async_blob_service_client is None
+    assert azure_blob.get_blob_service_client() is not client
+
+
+def test_init_is_skipped_when_blob_storage_is_not_configured(monkeypatch):
+    monkeypatch.setattr(azure_blob, "AZURE_STORAGE_CONNECTION_STRING", None)
+    monkeypatch.setattr(azure_blob, "AZURE_BLOB_SERVICE_URL", None)
+
+    assert asyncio.run(azure_blob.init_blob_clients()) is False
+    assert azure_blob._blob_service_client is None
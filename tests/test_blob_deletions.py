@@ -0,0 +1,78 @@
+# tests/test_blob_deletions.py
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import services.azure_blob as azure_blob
+import services.blob_deletions as blob_deletions
+from models import Base, BlobDeletionQueueTable, LectureVideosTable
+
+OLD = datetime.now(timezone.utc) - timedelta(days=3)
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[LectureVideosTable.__table__])
+    with engine.begin() as conn:
+        # SQLite では BIGINT の主キーが自動採番されないため DDL で作る
+        conn.execute(text(
+            "CREATE TABLE blob_deletion_queue (blob_deletion_id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "blob_name VARCHAR(255) NOT NULL UNIQUE, attempts INTEGER NOT NULL, next_attempt_at DATETIME NOT NULL, "
+            "last_error VARCHAR(255), created_at DATETIME NOT NULL)"
+        ))
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(blob_deletions, "SessionLocal", factory)
+    monkeypatch.setattr(azure_blob, "AZURE_BLOB_SERVICE_URL", "https://acct.blob.core.windows.net")
+    monkeypatch.setattr(azure_blob, "AZURE_MOVIE_CONTAINER", "movie")
+    return factory
+
+
+def _add_video(factory, lesson_theme_id, video_url):
+    db = factory()
+    db.add(LectureVideosTable(lesson_theme_id=lesson_theme_id, lecture_video_title="t", video_url=video_url))
+    db.commit()
+    db.close()
+
+
+def _queued(factory):
+    db = factory()
+    try:
+        return sorted(name for (name,) in db.query(BlobDeletionQueueTable.blob_name))
+    finally:
+        db.close()
+
+
+def test_reconcile_enqueues_unreferenced_old_blobs(session_factory, monkeypatch):
+    _add_video(session_factory, 1, "https://acct.blob.core.windows.net/movie/keep.mp4")
+    monkeypatch.setattr(blob_deletions, "list_container_blobs", lambda: iter([
+        ("keep.mp4", OLD),
+        ("orphan.mp4", OLD),
+        ("fresh.mp4", datetime.now(timezone.utc)),
+    ]))
+
+    result = blob_deletions.reconcile_container()
+
+    assert result["aborted"] is False
+    assert result["orphaned_enqueued"] == 1
+    assert _queued(session_factory) == ["orphan.mp4"]
+
+
+def test_reconcile_aborts_on_unrecognized_video_url(session_factory, monkeypatch):
+    # カスタムドメイン（CDN）に切り替えた後の URL など、現在の設定で Blob 名を読めない動画
+    _add_video(session_factory, 1, "https://acct.blob.core.windows.net/movie/keep.mp4")
+    _add_video(session_factory, 2, "https://cdn.example.com/movie/cdn.mp4")
+    monkeypatch.setattr(blob_deletions, "list_container_blobs", lambda: iter([
+        ("keep.mp4", OLD),
+        ("cdn.mp4", OLD),
+        ("orphan.mp4", OLD),
+    ]))
+
+    result = blob_deletions.reconcile_container()
+
+    assert result["aborted"] is True
+    assert result["unrecognized_video_url_lecture_video_ids"] == [2]
+    assert _queued(session_factory) == []
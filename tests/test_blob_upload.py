@@ -0,0 +1,48 @@
+# tests/test_blob_upload.py
+import asyncio
+import base64
+import io
+import threading
+
+from services import azure_blob
+
+
+class _FakeBlobClient:
+    def __init__(self):
+        self.staged = {}
+        self.committed = None
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def stage_block(self, block_id, chunk):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        threading.Event().wait(0.01)
+        with self._lock:
+            self.staged[block_id] = chunk
+            self.in_flight -= 1
+
+    def commit_block_list(self, blocks, content_settings=None):
+        self.committed = [block.id for block in blocks]
+
+
+def test_async_upload_stages_blocks_in_order_with_bounded_concurrency(monkeypatch):
+    blob = _FakeBlobClient()
+    service = type("Service", (), {"get_blob_client": lambda self, container, name: blob})()
+    monkeypatch.setattr(azure_blob, "get_async_blob_service_client", lambda: None)
+    monkeypatch.setattr(azure_blob, "get_blob_service_client", lambda: service)
+
+    data = bytes(range(256)) * 10
+    stream = io.BytesIO(data)
+
+    async def read(size):
+        return stream.read(size)
+
+    url = asyncio.run(azure_blob.upload_stream_to_blob_async(read, "lesson.mp4", block_size=300, max_concurrency=2))
+
+    assert url.endswith(".mp4")
+    assert blob.committed == [base64.b64encode(f"{n:08d}".encode()).decode() for n in range(9)]
+    assert b"".join(blob.staged[block_id] for block_id in blob.committed) == data
+    assert blob.max_in_flight <= 2
@@ -0,0 +1,73 @@
+# tests/test_calendar_window.py
+from datetime import date
+
+from models import LessonTable, StudentTable, TimetableTable
+
+
+def _add_slots(db):
+    db.add_all([
+        TimetableTable(timetable_id=2, date=date(2025, 4, 7), day_of_week="月", period=2, time="10:00-10:50"),
+        TimetableTable(timetable_id=3, date=date(2025, 4, 8), day_of_week="火", period=1, time="09:00-09:50"),
+        TimetableTable(timetable_id=4, date=date(2025, 4, 8), day_of_week="火", period=1, time="13:00-13:50"),
+        # 日付・時限が未設定のコマ
+        TimetableTable(timetable_id=5, date=None, day_of_week="水", period=None, time="09:00-09:50"),
+        LessonTable(lesson_id=1, class_id=1, timetable_id=1, lesson_name="1-A", lesson_status=1),
+        LessonTable(lesson_id=2, class_id=2, timetable_id=1, lesson_name="1-B", lesson_status=1),
+        LessonTable(lesson_id=3, class_id=1, timetable_id=5, lesson_name="undated", lesson_status=1),
+    ])
+    db.commit()
+
+
+def _keys(rows):
+    return [(row["timetable_id"], row["lesson_id"]) for row in rows]
+
+
+def test_keyset_pages_cover_every_slot_once_in_order(seeded, client, db):
+    _add_slots(db)
+    expected = [(1, 1), (1, 2), (2, None), (3, None), (4, None)]
+    assert _keys(client.get("/lesson_registrations/calendar").json()) == expected
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/lesson_registrations/calendar", params=params)
+        assert response.status_code == 200
+        pages.append(_keys(response.json()))
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+
+    assert pages == [[(1, 1), (1, 2)], [(2, None), (3, None)], [(4, None)]]
+
+
+def test_date_window_and_cursor_combine(seeded, client, db):
+    _add_slots(db)
+
+    first = client.get("/lesson_registrations/calendar", params={"from": "2025-04-08", "limit": 1})
+    second = client.get(
+        "/lesson_registrations/calendar",
+        params={"from": "2025-04-08", "limit": 1, "cursor": first.headers["x-next-cursor"]},
+    )
+
+    assert _keys(first.json()) == [(3, None)]
+    assert _keys(second.json()) == [(4, None)]
+    assert "x-next-cursor" not in second.headers
+
+
+def test_invalid_cursor_is_rejected(seeded, client):
+    response = client.get("/lesson_registrations/calendar", params={"limit": 1, "cursor": "yesterday"})
+
+    assert response.status_code == 400
+
+
+def test_attendance_calendar_finds_student_added_after_roster_was_loaded(seeded, client, db):
+    _add_slots(db)
+    # 名簿キャッシュを読み込ませてから生徒を追加する
+    assert client.get("/lesson_attendance/calendar", params={"student_id": 4}).status_code == 200
+    db.add(StudentTable(student_id=5, class_id=2, students_number=2, name="s5", mail_address="s5@example.com"))
+    db.commit()
+
+    response = client.get("/lesson_attendance/calendar", params={"student_id": 5})
+
+    assert response.status_code == 200
+    assert [row["lesson_id"] for row in response.json()] == [2]
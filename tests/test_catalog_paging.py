@@ -0,0 +1,60 @@
+# tests/test_catalog_paging.py
+import pytest
+
+import routers.lesson_registration as lesson_registration
+from models import LessonThemeContentsTable, LessonThemesTable, MaterialTable, UnitTable
+
+
+@pytest.fixture
+def catalog(seeded, db, monkeypatch):
+    # 授業テーマを1件ずつ読ませ、バッチの境界をまたぐ場合も確認する
+    monkeypatch.setattr(lesson_registration, "CATALOG_STREAM_BATCH_SIZE", 1)
+    db.add(MaterialTable(material_id=2, material_name="化学基礎"))
+    db.add(UnitTable(units_id=2, material_id=2, part_name="p", chapter_name="c", unit_name="u2"))
+    for theme_id in (4, 5):
+        db.add(LessonThemeContentsTable(lesson_theme_contents_id=theme_id))
+        db.add(LessonThemesTable(
+            lesson_theme_id=theme_id, lesson_theme_contents_id=theme_id, units_id=2, lesson_theme_name=f"t{theme_id}",
+        ))
+    db.commit()
+
+
+def _theme_ids(body):
+    return [theme["lesson_theme_id"] for theme in body["lesson_themes"]]
+
+
+def test_limit_pages_through_themes_by_cursor(catalog, client):
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"after_lesson_theme_id": cursor} if cursor else {})}
+        body = client.get("/lesson_registrations/all", params=params).json()
+        pages.append(_theme_ids(body))
+        assert [m["material_id"] for m in body["materials"]] == [1, 2]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == [[1, 2], [3, 4], [5]]
+
+
+def test_filters_narrow_every_section(catalog, client):
+    body = client.get("/lesson_registrations/all", params={"material_id": 2}).json()
+
+    assert [m["material_id"] for m in body["materials"]] == [2]
+    assert [u["units_id"] for u in body["units"]] == [2]
+    assert _theme_ids(body) == [4, 5]
+    assert body["next_cursor"] is None
+
+    body = client.get("/lesson_registrations/all", params={"units_id": 1}).json()
+    assert [m["material_id"] for m in body["materials"]] == [1]
+    assert _theme_ids(body) == [1, 2, 3]
+
+
+def test_unfiltered_dump_matches_the_paged_sections(catalog, client):
+    dump = client.get("/lesson_registrations/all").json()
+
+    assert _theme_ids(dump) == [1, 2, 3, 4, 5]
+    assert set(dump) == {"materials", "units", "lesson_themes"}
+    assert dump["lesson_themes"][0] == {
+        "lesson_theme_id": 1, "lesson_theme_contents_id": 1, "units_id": 1, "lesson_theme_name": "t1",
+    }
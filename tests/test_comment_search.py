@@ -0,0 +1,85 @@
+# tests/test_comment_search.py
+from sqlalchemy.dialects.mysql.expression import match
+from sqlalchemy.ext.compiler import compiles
+
+from models import ClassTable, LessonSurveyTable, LessonTable, StudentTable
+
+
+@compiles(match, "sqlite")
+def _sqlite_match(element, compiler, **kw):
+    # SQLite には FULLTEXT が無いため、検索語の出現回数を関連度の代わりにする
+    column = compiler.process(element.left, **kw)
+    against = compiler.process(element.right, **kw)
+    return f"((length({column}) - length(replace({column}, {against}, ''))) / length({against}))"
+
+
+# (lesson_survey_id, lesson_id, student_id, comment)
+_SURVEYS = [
+    (1, 1, 1, "力のつり合いが難しい"),
+    (2, 1, 2, "力の分解と力のつり合いがよく分かった"),
+    (3, 1, 3, "実験が楽しかった"),
+    (4, 2, 4, "つり合いの問題をもっと解きたい"),
+    (5, 3, 5, "つり合いは去年も習った"),
+]
+
+
+def _add_surveys(db):
+    # 生徒5は前年度のクラス
+    db.add(ClassTable(class_id=3, class_name="2-A", grade=2, academic_year=2024))
+    db.add(StudentTable(student_id=5, class_id=3, students_number=1, name="s5", mail_address="s5@example.com"))
+    for lesson_id, class_id in ((1, 1), (2, 2), (3, 3)):
+        db.add(LessonTable(lesson_id=lesson_id, class_id=class_id, timetable_id=1, lesson_name="l", lesson_status=3))
+    for survey_id, lesson_id, student_id, comment in _SURVEYS:
+        db.add(LessonSurveyTable(
+            lesson_survey_id=survey_id, lesson_id=lesson_id, student_id=student_id, survey_status=3,
+            student_comment=comment,
+        ))
+    db.commit()
+
+
+def _search(client, **params):
+    response = client.get("/grades/comments/search", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_hits_are_ranked_by_relevance_then_newest(seeded, client, db):
+    _add_surveys(db)
+
+    body = _search(client, q="つり合い")
+
+    assert body["query"] == "つり合い"
+    # 出現回数が同じなら新しいアンケートを先に返す
+    assert [hit["lesson_survey_id"] for hit in body["hits"]] == [5, 4, 2, 1]
+    assert body["has_next"] is False
+    hit = body["hits"][1]
+    assert (hit["student_name"], hit["class_id"], hit["class_name"]) == ("s4", 2, "1-B")
+
+    # 関連度の高いものが先頭に来る
+    assert [hit["lesson_survey_id"] for hit in _search(client, q="力の")["hits"]] == [2, 1]
+
+
+def test_search_filters_by_lesson_class_and_year(seeded, client, db):
+    _add_surveys(db)
+
+    def ids(**params):
+        return [hit["lesson_survey_id"] for hit in _search(client, q="つり合い", **params)["hits"]]
+
+    assert ids(lesson_id=1) == [2, 1]
+    assert ids(class_id=2) == [4]
+    assert ids(academic_year=2024) == [5]
+    assert ids(academic_year=2025, class_id=1) == [2, 1]
+
+
+def test_search_pages_with_has_next(seeded, client, db):
+    _add_surveys(db)
+
+    first = _search(client, q="つり合い", limit=3)
+    second = _search(client, q="つり合い", limit=3, offset=3)
+
+    assert ([h["lesson_survey_id"] for h in first["hits"]], first["has_next"]) == ([5, 4, 2], True)
+    assert ([h["lesson_survey_id"] for h in second["hits"]], second["has_next"]) == ([1], False)
+
+
+def test_search_rejects_one_character_queries(seeded, client):
+    assert client.get("/grades/comments/search", params={"q": "力"}).status_code == 422
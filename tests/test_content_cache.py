@@ -0,0 +1,37 @@
+# tests/test_content_cache.py
+from models import LessonThemesTable, MaterialTable, UnitTable
+
+
+def _add_material(db, material_id, name, unit_name):
+    db.add(MaterialTable(material_id=material_id, material_name=name))
+    db.add(UnitTable(units_id=material_id * 10, material_id=material_id, part_name="p", chapter_name="c", unit_name=unit_name))
+    db.commit()
+
+
+def test_content_by_name_with_duplicate_names_returns_lowest_id(seeded, client, db):
+    # 教材名は一意ではない（年度替わりで同じ名前の教材が登録されることがある）
+    _add_material(db, 3, "化学", "new")
+    _add_material(db, 2, "化学", "old")
+
+    response = client.get("/content/化学")
+
+    assert response.status_code == 200
+    assert [unit["unit_name"] for unit in response.json()] == ["old"]
+
+
+def test_content_by_name_is_served_from_cache_until_invalidated(seeded, client, db):
+    first = client.get("/content/物理基礎")
+    assert first.status_code == 200
+    assert [theme["lesson_theme_name"] for theme in first.json()[0]["lesson_themes"]] == ["t1", "t2", "t3"]
+
+    db.query(LessonThemesTable).filter(LessonThemesTable.lesson_theme_id == 3).update({"lesson_theme_name": "renamed"})
+    db.commit()
+    assert client.get("/content/物理基礎").json() == first.json()
+
+    assert client.delete("/content/cache").status_code == 200
+    themes = client.get("/content/物理基礎").json()[0]["lesson_themes"]
+    assert [theme["lesson_theme_name"] for theme in themes] == ["t1", "t2", "renamed"]
+
+
+def test_content_by_name_not_found(seeded, client):
+    assert client.get("/content/存在しない").status_code == 404
@@ -0,0 +1,58 @@
+# tests/test_etag.py
+from datetime import date
+
+from models import LessonTable, LessonThemesTable, TimetableTable
+from services.content_cache import invalidate_content_cache
+
+
+def test_content_etag_is_stable_across_cache_rebuilds(seeded, client):
+    first = client.get("/content/by_id/1")
+    etag = first.headers["etag"]
+
+    # 再起動・別ワーカーと同じく、キャッシュが空の状態から作り直しても同じ ETag になる
+    invalidate_content_cache()
+    response = client.get("/content/by_id/1", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_content_etag_changes_when_cache_is_invalidated_after_update(seeded, client, db):
+    etag = client.get("/content/by_id/1").headers["etag"]
+
+    db.query(LessonThemesTable).filter(LessonThemesTable.lesson_theme_id == 1).update({"lesson_theme_name": "renamed"})
+    db.commit()
+    invalidate_content_cache()
+    response = client.get("/content/by_id/1", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()[0]["lesson_themes"][0]["lesson_theme_name"] == "renamed"
+
+
+def test_calendar_etag_follows_the_body(seeded, client, db):
+    first = client.get("/lesson_registrations/calendar")
+    etag = first.headers["etag"]
+    assert client.get("/lesson_registrations/calendar", headers={"If-None-Match": etag}).status_code == 304
+
+    # 他ワーカーでの書き込みも、本文が変われば次の応答で ETag が変わる
+    db.add(LessonTable(lesson_id=1, class_id=1, timetable_id=1, lesson_name="物理", lesson_status=1))
+    db.commit()
+    response = client.get("/lesson_registrations/calendar", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()[0]["lesson_id"] == 1
+
+
+def test_paged_calendar_keeps_next_cursor_on_304(seeded, client, db):
+    db.add(TimetableTable(timetable_id=2, date=date(2025, 4, 7), day_of_week="月", period=2, time="10:00-10:50"))
+    db.commit()
+    first = client.get("/lesson_registrations/calendar?limit=1")
+    response = client.get(
+        "/lesson_registrations/calendar?limit=1", headers={"If-None-Match": first.headers["etag"]}
+    )
+
+    assert response.status_code == 304
+    assert response.headers["x-next-cursor"] == first.headers["x-next-cursor"]
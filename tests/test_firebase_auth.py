@@ -0,0 +1,76 @@
+# tests/test_firebase_auth.py
+from types import SimpleNamespace
+
+import pytest
+from google.auth.transport import requests as google_requests
+
+from services import firebase_auth
+from services.firebase_auth import issue_offline_token, verify_id_token
+
+
+def test_offline_token_is_verified_through_the_offline_path():
+    token = issue_offline_token("uid-1", email="s1@example.com")
+
+    claims = verify_id_token(token)
+
+    assert claims["uid"] == "uid-1"
+    assert claims["email"] == "s1@example.com"
+
+
+def test_expired_offline_token_is_rejected():
+    token = issue_offline_token("uid-1", expires_in=-600)
+
+    with pytest.raises(ValueError):
+        verify_id_token(token)
+
+
+def test_login_with_offline_token(seeded, client, login_writer):
+    token = issue_offline_token("uid-1", email="s1@example.com")
+
+    response = client.post("/auth/login", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert response.json()["user_id"] == 1
+
+
+def test_certificate_request_uses_the_sdk_session_on_known_versions(monkeypatch):
+    sdk_request = object()
+    client = SimpleNamespace(_token_verifier=SimpleNamespace(request=sdk_request))
+
+    monkeypatch.setattr(firebase_auth.firebase_admin, "__version__", "7.1.0")
+    assert firebase_auth._certificate_request(client) is sdk_request
+
+    # 未確認のバージョン・内部属性が無い場合は通常のリクエストで取得する
+    monkeypatch.setattr(firebase_auth.firebase_admin, "__version__", "8.0.0")
+    assert isinstance(firebase_auth._certificate_request(client), google_requests.Request)
+    monkeypatch.setattr(firebase_auth.firebase_admin, "__version__", "7.1.0")
+    assert isinstance(firebase_auth._certificate_request(SimpleNamespace()), google_requests.Request)
+
+
+def test_key_refresh_is_not_started_when_init_fails(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    def fail():
+        raise RuntimeError("no credentials")
+
+    async def no_blob_clients():
+        return False
+
+    async def noop_async():
+        return None
+
+    started = []
+    monkeypatch.setattr(main, "init_firebase_auth", fail)
+    monkeypatch.setattr(main, "start_key_refresh", lambda: started.append(True))
+    monkeypatch.setattr(main, "start_login_history_writer", lambda: None)
+    monkeypatch.setattr(main, "stop_login_history_writer", lambda: None)
+    monkeypatch.setattr(main, "init_blob_clients", no_blob_clients)
+    monkeypatch.setattr(main, "close_blob_clients", noop_async)
+    monkeypatch.setattr(main, "stop_blob_deletion_worker", lambda: None)
+
+    with TestClient(main.app):
+        pass
+
+    assert started == []
@@ -0,0 +1,91 @@
+# tests/test_grade_export.py
+import csv
+import io
+
+import pytest
+
+import routers.grade_export as grade_export
+from models import ClassTable, LessonAnswerDataTable, LessonTable, StudentTable
+
+# 問題の正解番号（conftest）: 問題1→2 / 問題2→3
+# (answer_id, lesson_id, student_id, question_id, choice_number, answer_correctness)
+_ANSWERS = [
+    (1, 1, 1, 1, 2, None),
+    (2, 1, 2, 1, 1, None),
+    (3, 1, 3, 2, None, None),   # 未回答
+    (4, 2, 4, 2, 3, None),
+    (5, 3, 5, 1, 2, False),     # 記録済みの正誤を選択肢より優先する
+]
+
+
+def _add_answers(db):
+    # 生徒5は前年度のクラス
+    db.add(ClassTable(class_id=3, class_name="2-A", grade=2, academic_year=2024))
+    db.add(StudentTable(student_id=5, class_id=3, students_number=1, name="s5", mail_address="s5@example.com"))
+    for lesson_id, class_id in ((1, 1), (2, 2), (3, 3)):
+        db.add(LessonTable(lesson_id=lesson_id, class_id=class_id, timetable_id=1, lesson_name="l", lesson_status=3))
+    for answer_id, lesson_id, student_id, question_id, choice, correctness in _ANSWERS:
+        db.add(LessonAnswerDataTable(
+            lesson_answer_data_id=answer_id, student_id=student_id, lesson_id=lesson_id, lesson_theme_id=1,
+            lesson_question_id=question_id, choice_number=choice, answer_correctness=correctness, answer_status=1,
+            answer_start_unix=100, answer_end_unix=110,
+        ))
+    db.commit()
+
+
+def _csv_rows(response):
+    text = response.content.decode("utf-8")
+    assert text.startswith("\ufeff")
+    return list(csv.DictReader(io.StringIO(text[1:])))
+
+
+def test_year_export_streams_every_row_as_csv(seeded, client, db, monkeypatch):
+    _add_answers(db)
+    monkeypatch.setattr(grade_export, "EXPORT_BATCH_SIZE", 1)
+
+    response = client.get("/grades/export", params={"academic_year": 2025})
+
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == 'attachment; filename="answers_year2025.csv"'
+    rows = _csv_rows(response)
+    # ヘッダーは1回だけ
+    assert [(r["lesson_id"], r["student_id"], r["is_correct"]) for r in rows] == [
+        ("1", "1", "True"), ("1", "2", "False"), ("1", "3", ""), ("2", "4", "True"),
+    ]
+    assert {k: rows[0][k] for k in ("class_name", "date", "period", "unit_name", "lesson_theme_name")} == {
+        "class_name": "1-A", "date": "2025-04-07", "period": "1", "unit_name": "u", "lesson_theme_name": "t1",
+    }
+
+
+def test_class_export_is_limited_to_the_class(seeded, client, db):
+    _add_answers(db)
+
+    rows = _csv_rows(client.get("/grades/export", params={"class_id": 3}))
+
+    assert [(r["student_id"], r["academic_year"], r["is_correct"]) for r in rows] == [("5", "2024", "False")]
+
+
+def test_export_requires_a_scope(seeded, client):
+    assert client.get("/grades/export").status_code == 400
+    assert client.get("/grades/export", params={"class_id": 1, "format": "xlsx"}).status_code == 422
+
+
+def test_parquet_export_writes_a_row_group_per_batch(seeded, client, db, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    _add_answers(db)
+    monkeypatch.setattr(grade_export, "EXPORT_BATCH_SIZE", 2)
+
+    response = client.get("/grades/export", params={"academic_year": 2025, "format": "parquet"})
+
+    assert response.status_code == 200
+    parquet = pq.ParquetFile(io.BytesIO(response.content))
+    assert parquet.metadata.num_row_groups == 2
+    table = parquet.read()
+    assert table.column("student_id").to_pylist() == [1, 2, 3, 4]
+    assert table.column("is_correct").to_pylist() == [True, False, None, True]
+
+
+def test_parquet_export_without_pyarrow_is_not_implemented(seeded, client, monkeypatch):
+    monkeypatch.setattr(grade_export, "pq", None)
+
+    assert client.get("/grades/export", params={"class_id": 1, "format": "parquet"}).status_code == 501
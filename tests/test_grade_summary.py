@@ -0,0 +1,52 @@
+# tests/test_grade_summary.py
+from sqlalchemy import event
+
+from models import ClassTable, LessonAnswerDataTable, LessonTable, StudentTable
+
+
+def _add_answers(db):
+    db.add(ClassTable(class_id=3, class_name="2-A", grade=2, academic_year=2025))
+    db.add(StudentTable(student_id=5, class_id=3, students_number=1, name="s5", mail_address="s5@example.com"))
+    db.add(LessonTable(lesson_id=1, class_id=1, timetable_id=1, lesson_name="l", lesson_status=2))
+    # 問題1の正解は 2。生徒1: 正解 / 生徒2: 不正解 / 生徒3: 未回答 / 生徒5（2年）: 正解
+    for answer_id, student_id, choice in ((1, 1, 2), (2, 2, 3), (3, 3, None), (4, 5, 2)):
+        db.add(LessonAnswerDataTable(
+            lesson_answer_data_id=answer_id, student_id=student_id, lesson_id=1, lesson_theme_id=1,
+            lesson_question_id=1, choice_number=choice, answer_status=1,
+        ))
+    db.commit()
+
+
+def _summary(client, grade):
+    response = client.get("/grades/grade_summary", params={"academic_year": 2025, "grade": grade})
+    assert response.status_code == 200
+    return [(q["question_id"], q["total_answers"], q["correct_answers"], q["correct_rate"]) for q in response.json()["summary"]]
+
+
+def test_correct_rate_excludes_unanswered(seeded, client, db):
+    _add_answers(db)
+
+    assert _summary(client, 1) == [(1, 2, 1, 50.0)]
+    assert _summary(client, 2) == [(1, 1, 1, 100.0)]
+
+
+def test_answer_update_invalidates_only_that_grade(seeded, client, db, engine):
+    _add_answers(db)
+    _summary(client, 1)
+    _summary(client, 2)
+
+    assert client.put("/api/answers/", params={"lesson_answer_data_id": 3}, json={"choice_number": 2}).status_code == 200
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert _summary(client, 1) == [(1, 3, 2, 66.7)]
+    assert any("GROUP BY" in statement for statement in statements)
+    statements.clear()
+    assert _summary(client, 2) == [(1, 1, 1, 100.0)]
+    assert statements == []
+
+
+def test_unknown_grade_is_404(seeded, client):
+    response = client.get("/grades/grade_summary", params={"academic_year": 2025, "grade": 3})
+
+    assert response.status_code == 404
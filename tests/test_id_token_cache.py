@@ -0,0 +1,58 @@
+# tests/test_id_token_cache.py
+import time
+
+from services import id_token_cache
+from services.firebase_auth import issue_offline_token
+from services.id_token_cache import verify_id_token_cached
+
+
+class _Verifier:
+    def __init__(self, exp_in=600):
+        self.calls = 0
+        self.exp_in = exp_in
+
+    def __call__(self, id_token):
+        self.calls += 1
+        return {"uid": id_token, "exp": time.time() + self.exp_in}
+
+
+def test_second_verification_is_served_from_cache():
+    verifier = _Verifier()
+
+    first = verify_id_token_cached("token-a", verifier)
+    second = verify_id_token_cached("token-a", verifier)
+
+    assert verifier.calls == 1
+    assert second == first
+    verify_id_token_cached("token-b", verifier)
+    assert verifier.calls == 2
+
+
+def test_expired_claims_are_not_cached():
+    verifier = _Verifier(exp_in=-1)
+
+    verify_id_token_cached("token-a", verifier)
+    verify_id_token_cached("token-a", verifier)
+
+    assert verifier.calls == 2
+
+
+def test_cache_is_bypassed_when_revocation_is_checked(monkeypatch):
+    monkeypatch.setattr(id_token_cache, "FIREBASE_CHECK_REVOKED", True)
+    verifier = _Verifier()
+
+    verify_id_token_cached("token-a", verifier)
+    verify_id_token_cached("token-a", verifier)
+
+    assert verifier.calls == 2
+    assert id_token_cache._verified_tokens.stats()["size"] == 0
+
+
+def test_stats_endpoint_requires_a_token(client):
+    assert client.get("/auth/token_cache/stats").status_code == 401
+
+    token = issue_offline_token("uid-1", email="s1@example.com")
+    response = client.get("/auth/token_cache/stats", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert response.json()["verifications"] >= 1
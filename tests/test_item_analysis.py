@@ -0,0 +1,87 @@
+# tests/test_item_analysis.py
+import pytest
+
+from models import LessonAnswerDataTable, LessonTable
+
+# 問題の正解番号（conftest）: 問題1→2 / 問題2→3 / 問題3→4
+# (answer_id, student_id, question_id, choice_number, answer_correctness, 回答時間(秒))
+_ANSWERS = [
+    (1, 1, 1, 2, None, 2),
+    (2, 1, 2, 3, None, 5),
+    (3, 1, 3, 1, None, 8),
+    (4, 2, 1, 2, None, 10),
+    (5, 2, 2, 1, None, 6),
+    (6, 2, 3, None, None, None),    # 未回答
+    (7, 3, 1, 1, None, 12),
+    (8, 3, 2, 3, None, 7),
+    (9, 3, 3, 4, False, 9),         # 記録済みの正誤（不正解）を選択肢より優先する
+    (10, 4, 2, 3, None, 100),
+]
+
+
+def _add_answers(db, answers, lesson_id=1):
+    db.add(LessonTable(lesson_id=lesson_id, class_id=1, timetable_id=1, lesson_name="l", lesson_status=3))
+    for answer_id, student_id, question_id, choice, correctness, seconds in answers:
+        db.add(LessonAnswerDataTable(
+            lesson_answer_data_id=answer_id, student_id=student_id, lesson_id=lesson_id, lesson_theme_id=1,
+            lesson_question_id=question_id, choice_number=choice, answer_correctness=correctness, answer_status=1,
+            answer_start_unix=None if seconds is None else 1_000,
+            answer_end_unix=None if seconds is None else 1_000 + seconds,
+        ))
+    db.commit()
+
+
+def test_item_statistics(seeded, client, db):
+    _add_answers(db, _ANSWERS)
+
+    body = client.get("/grades/item_analysis", params={"lesson_id": 1}).json()
+    items = {item["question_id"]: item for item in body["items"]}
+
+    assert (body["student_count"], body["question_count"]) == (4, 3)
+    assert [(items[q]["presented_count"], items[q]["answered_count"], items[q]["correct_count"]) for q in (1, 2, 3)] == [
+        (3, 3, 2), (4, 4, 3), (3, 2, 0),
+    ]
+    # 正答率は回答者ベース
+    assert [items[q]["correct_rate"] for q in (1, 2, 3)] == [66.667, 75.0, 0.0]
+    # 識別力: 当該設問を除いた合計点との点双列相関（全員不正解の設問は計算できない）
+    assert items[1]["discrimination"] == pytest.approx(-0.5)
+    assert items[2]["discrimination"] == pytest.approx(-0.577)
+    assert items[3]["discrimination"] is None
+    assert items[2]["choice_distribution"] == {"1": 1, "2": 0, "3": 3, "4": 0}
+    assert items[1]["response_time_percentiles"] == {"p25": 6.0, "p50": 10.0, "p75": 11.0, "p90": 11.6}
+    # 生徒の得点は出題数ベース
+    assert [(s["student_id"], s["score"]) for s in body["students"]] == [(1, 66.7), (2, 33.3), (3, 33.3), (4, 100.0)]
+
+
+def test_unit_analysis_uses_the_latest_answer(seeded, client, db):
+    _add_answers(db, _ANSWERS)
+    # 別の授業で生徒2が問題1に答え直した（不正解）
+    _add_answers(db, [(11, 2, 1, 1, None, 4)], lesson_id=2)
+
+    items = client.get("/grades/item_analysis", params={"units_id": 1}).json()["items"]
+
+    assert items[0]["question_id"] == 1
+    assert (items[0]["answered_count"], items[0]["correct_count"]) == (3, 1)
+
+
+def test_response_time_outliers(seeded, client, db):
+    _add_answers(db, _ANSWERS)
+
+    body = client.get("/grades/response_times", params={"lesson_id": 1, "fast_threshold_sec": 3}).json()
+    questions = {q["question_id"]: q for q in body["questions"]}
+    students = {s["student_id"]: s for s in body["students"]}
+
+    # 問題1: [2, 10, 12] / 問題2: [5, 6, 7, 100]（Q3 + 1.5 × IQR = 30.25 + 36.75 = 67）
+    assert (questions[1]["median_sec"], questions[1]["p90_sec"], questions[1]["slow_limit_sec"]) == (10.0, 11.6, 18.5)
+    assert (questions[1]["fast_count"], questions[1]["slow_count"]) == (1, 0)
+    assert (questions[2]["median_sec"], questions[2]["slow_limit_sec"], questions[2]["slow_count"]) == (6.5, 67.0, 1)
+    # 未回答のセルは回答時間に含めない
+    assert (questions[3]["timed_count"], questions[3]["median_sec"]) == (2, 8.5)
+    assert (students[1]["median_sec"], students[1]["fast_question_ids"]) == (5.0, [1])
+    assert students[4]["slow_question_ids"] == [2]
+    assert students[2]["timed_count"] == 2
+
+
+def test_analysis_requires_a_scope(client):
+    assert client.get("/grades/item_analysis").status_code == 400
+    assert client.get("/grades/response_times").status_code == 400
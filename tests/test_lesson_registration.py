@@ -0,0 +1,50 @@
+# tests/test_lesson_registration.py
+import routers.lesson_registration as lesson_registration
+from models import LessonRegistrationTable, LessonTable, LessonThemesTable
+
+
+def _register(client, theme_ids):
+    return client.post("/lesson_registrations/", json={"class_id": 1, "timetable_id": 1, "lesson_theme_ids": theme_ids})
+
+
+def test_registration_ids_follow_the_requested_theme_order(seeded, client, db):
+    response = _register(client, [3, 1])
+
+    assert response.status_code == 200
+    body = response.json()
+    rows = dict(
+        db.query(LessonRegistrationTable.lesson_registration_id, LessonRegistrationTable.lesson_theme_id)
+        .filter(LessonRegistrationTable.lesson_id == body["lesson_id"])
+        .all()
+    )
+    assert [rows[rid] for rid in body["lesson_registration_ids"]] == [3, 1]
+    assert {r.lesson_question_status for r in db.query(LessonRegistrationTable)} == {1}
+
+
+def test_themes_sharing_questions_are_rejected_without_creating_a_lesson(seeded, client, db):
+    # テーマ4はテーマ1と同じコンテンツ（問題1〜3）を使う
+    db.add(LessonThemesTable(lesson_theme_id=4, lesson_theme_contents_id=1, units_id=1, lesson_theme_name="t4"))
+    db.commit()
+
+    response = _register(client, [1, 2, 4])
+
+    assert response.status_code == 400
+    assert "[1, 2, 3]" in response.json()["detail"]
+    assert db.query(LessonTable).count() == 0
+
+
+def test_duplicate_theme_ids_are_rejected(seeded, client, db):
+    assert _register(client, [1, 1]).status_code == 400
+    assert db.query(LessonTable).count() == 0
+
+
+def test_failed_registration_insert_leaves_no_lesson(seeded, client, db, monkeypatch):
+    # 授業と登録は1トランザクションでコミットするため、途中で失敗すれば授業も残らない
+    def fail(table):
+        raise RuntimeError("insert failed")
+
+    monkeypatch.setattr(lesson_registration, "insert", fail)
+
+    assert _register(client, [1, 2]).status_code == 500
+    assert db.query(LessonTable).count() == 0
+    assert db.query(LessonRegistrationTable).count() == 0
@@ -0,0 +1,102 @@
+# tests/test_lesson_summary.py
+import pytest
+
+import routers.realtime_answers_put as realtime_answers_put
+import services.grade_aggregates as grade_aggregates
+from models import LessonAnswerDataTable, LessonSummaryStateTable, LessonTable
+
+
+@pytest.fixture
+def started_lesson(seeded, client):
+    # 1-A（生徒1〜3）にテーマ1・2を登録して開始（1人6問分の回答行ができる）
+    client.post("/lesson_registrations/", json={"class_id": 1, "timetable_id": 1, "lesson_theme_ids": [1, 2]})
+    assert client.put("/api/lessons/1/start").status_code == 200
+    return 1
+
+
+def _answer(client, answer_id, choice_number, seconds):
+    response = client.put(
+        "/api/answers/", params={"lesson_answer_data_id": answer_id},
+        json={"choice_number": choice_number, "answer_start_unix": 100, "answer_end_unix": 100 + seconds},
+    )
+    assert response.status_code == 200
+
+
+def _answer_id(db, student_id, question_id):
+    return (
+        db.query(LessonAnswerDataTable.lesson_answer_data_id)
+        .filter_by(student_id=student_id, lesson_question_id=question_id)
+        .scalar()
+    )
+
+
+def test_end_lesson_stores_summary(started_lesson, client, db):
+    _answer(client, _answer_id(db, 1, 1), 2, 10)  # 問1の正解は 2
+    _answer(client, _answer_id(db, 2, 1), 3, 30)
+
+    assert client.put("/api/lessons/1/end").status_code == 200
+    summary = client.get("/grades/lesson_summary", params={"lesson_id": 1}).json()
+
+    question = summary["questions"][0]
+    assert (question["question_id"], question["total_students"], question["answer_count"]) == (1, 3, 2)
+    assert question["correct_count"] == 1
+    assert question["median_response_sec"] == 20.0
+    assert question["choice_distribution"] == {"1": 0, "2": 1, "3": 1, "4": 0}
+    student = summary["students"][0]
+    assert (student["student_id"], student["answered_count"], student["correct_count"]) == (1, 1, 1)
+
+
+def test_end_lesson_succeeds_when_aggregation_fails(started_lesson, client, db, monkeypatch):
+    def fail(session, lesson_id):
+        raise RuntimeError("aggregation failed")
+
+    recompute = grade_aggregates.recompute_lesson_aggregates
+    monkeypatch.setattr(grade_aggregates, "recompute_lesson_aggregates", fail)
+    assert client.put("/api/lessons/1/end").status_code == 200
+    assert db.query(LessonTable.lesson_status).filter_by(lesson_id=1).scalar() == 3
+    monkeypatch.setattr(grade_aggregates, "recompute_lesson_aggregates", recompute)
+
+    # サマリーが無い授業は、初回表示時に集計される
+    summary = client.get("/grades/lesson_summary", params={"lesson_id": 1}).json()
+    assert len(summary["questions"]) == 6
+
+
+def test_empty_lesson_is_aggregated_once(seeded, client, db, monkeypatch):
+    db.add(LessonTable(lesson_id=1, class_id=1, timetable_id=1, lesson_name="l", lesson_status=3))
+    db.commit()
+    calls = []
+    recompute = grade_aggregates.recompute_lesson_aggregates
+    monkeypatch.setattr(
+        grade_aggregates, "recompute_lesson_aggregates",
+        lambda session, lesson_id: (calls.append(lesson_id), recompute(session, lesson_id)),
+    )
+
+    for _ in range(3):
+        response = client.get("/grades/lesson_summary", params={"lesson_id": 1})
+        assert response.status_code == 200
+        assert response.json()["questions"] == []
+
+    assert calls == [1]
+    assert db.query(LessonSummaryStateTable).filter_by(lesson_id=1).count() == 1
+
+
+def test_lesson_summary_rejects_running_lesson(started_lesson, client):
+    assert client.get("/grades/lesson_summary", params={"lesson_id": 1}).status_code == 409
+
+
+def test_late_edits_recompute_only_after_lesson_end(started_lesson, client, db, monkeypatch):
+    queued = []
+    monkeypatch.setattr(realtime_answers_put, "recompute_if_lesson_ended", queued.append)
+    answer_id = _answer_id(db, 1, 4)
+
+    _answer(client, answer_id, 2, 5)
+    assert queued == []
+
+    client.put("/api/lessons/1/end")
+    _answer(client, answer_id, 1, 5)
+    assert queued == [1]
+
+    # 再開した授業では積まない
+    client.put("/api/lessons/1/start")
+    _answer(client, answer_id, 3, 5)
+    assert queued == [1]
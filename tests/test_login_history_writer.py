@@ -0,0 +1,70 @@
+# tests/test_login_history_writer.py
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+
+import services.login_history_writer as writer
+
+
+def _record(email):
+    writer.record_login(
+        email=email, firebase_uid=None, student_id=None, token_valid=True, is_whitelisted=True,
+        result="success", reason_code=None, http_status=200,
+    )
+
+
+def _logged(db):
+    return [row[0] for row in db.execute(text("SELECT mail_address FROM login_history ORDER BY login_history_id"))]
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_queued_rows_are_flushed_in_the_background(login_writer, db):
+    login_writer.start_login_history_writer()
+    for n in range(3):
+        _record(f"s{n}@example.com")
+
+    assert _wait_for(lambda: len(_logged(db)) == 3)
+    assert _logged(db) == ["s0@example.com", "s1@example.com", "s2@example.com"]
+
+
+def test_stop_drains_rows_left_in_the_queue(login_writer, db):
+    # ライターが書き出す前に停止しても、キューに残った行は書き出される
+    for n in range(3):
+        login_writer._queue.put_nowait({"mail_address": f"s{n}@example.com", "token_valid": 1, "is_whitelisted": 1, "result": "success"})
+
+    login_writer.stop_login_history_writer(timeout=2)
+
+    assert len(_logged(db)) == 3
+    assert login_writer._queue.empty()
+
+
+def test_dead_writer_is_restarted_instead_of_writing_inline(login_writer, db):
+    dead = threading.Thread(target=lambda: None)
+    dead.start()
+    dead.join()
+    login_writer._thread = dead
+
+    _record("s1@example.com")
+
+    assert login_writer._thread is not dead and login_writer._thread.is_alive()
+    assert _wait_for(lambda: _logged(db) == ["s1@example.com"])
+
+
+def test_failed_write_after_stop_does_not_sleep(login_writer, monkeypatch, capsys):
+    login_writer.stop_login_history_writer(timeout=2)
+    monkeypatch.setattr(writer, "_write_rows", lambda rows: False)
+    monkeypatch.setattr(writer.time, "sleep", lambda seconds: pytest.fail("record_login must not sleep"))
+
+    _record("s1@example.com")
+
+    assert "unwritten row" in capsys.readouterr().out
@@ -0,0 +1,51 @@
+# tests/test_question_cache.py
+from sqlalchemy import event
+
+from models import LessonQuestionsTable, LessonThemeContentsTable, LessonThemesTable
+from services.question_cache import get_question_ids, get_questions_by_theme, invalidate_theme_questions
+
+
+def _select_count(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return lambda: sum(statement.lstrip().upper().startswith("SELECT") for statement in statements)
+
+
+def test_only_missing_themes_are_fetched_in_one_query(seeded, db, engine):
+    select_count = _select_count(engine)
+
+    first = get_questions_by_theme(db, [1, 2])
+    assert select_count() == 1
+    assert [q.lesson_question_id for q in first[1]] == [1, 2, 3]
+    assert [q.correctness_number for q in first[2]] == [1, 2, 3]
+
+    result = get_questions_by_theme(db, [2, 3, 2])
+    assert select_count() == 2
+    assert list(result) == [2, 3]
+    assert get_question_ids(db, 3) == [7, 8, 9]
+    assert select_count() == 2
+
+
+def test_theme_without_questions_is_cached_as_empty(seeded, db, engine):
+    db.add(LessonThemeContentsTable(lesson_theme_contents_id=4))
+    db.add(LessonThemesTable(lesson_theme_id=4, lesson_theme_contents_id=4, units_id=1, lesson_theme_name="t4"))
+    db.commit()
+    select_count = _select_count(engine)
+
+    assert get_question_ids(db, 4) == []
+    assert get_question_ids(db, 4) == []
+    assert select_count() == 1
+
+
+def test_invalidation_reloads_only_the_given_themes(seeded, db):
+    get_questions_by_theme(db, [1, 2])
+    db.add(LessonQuestionsTable(lesson_question_id=10, lesson_theme_contents_id=1, lesson_question_label="Q10", correctness_number=1))
+    db.add(LessonQuestionsTable(lesson_question_id=11, lesson_theme_contents_id=2, lesson_question_label="Q11", correctness_number=1))
+    db.commit()
+
+    invalidate_theme_questions([1])
+
+    assert get_question_ids(db, 1) == [1, 2, 3, 10]
+    assert get_question_ids(db, 2) == [4, 5, 6]
+    invalidate_theme_questions()
+    assert get_question_ids(db, 2) == [4, 5, 6, 11]
@@ -0,0 +1,61 @@
+# tests/test_raw_data.py
+import routers.grades as grades
+from models import LessonAnswerDataTable, LessonTable
+
+# 問題の正解番号（conftest）: 問題1→2 / 問題2→3 / 問題4→1
+# (answer_id, lesson_id, student_id, question_id, theme_id, choice_number, answer_correctness)
+_ANSWERS = [
+    (1, 1, 1, 1, 1, 2, None),
+    (2, 1, 2, 1, 1, 1, None),
+    (3, 1, 3, 2, 1, None, None),    # 未回答
+    (4, 2, 4, 4, 2, 1, False),      # 記録済みの正誤を選択肢より優先する
+]
+
+
+def _add_answers(db):
+    for lesson_id in (1, 2, 3):
+        db.add(LessonTable(lesson_id=lesson_id, class_id=1, timetable_id=1, lesson_name="l", lesson_status=3))
+    for answer_id, lesson_id, student_id, question_id, theme_id, choice, correctness in _ANSWERS:
+        db.add(LessonAnswerDataTable(
+            lesson_answer_data_id=answer_id, student_id=student_id, lesson_id=lesson_id, lesson_theme_id=theme_id,
+            lesson_question_id=question_id, choice_number=choice, answer_correctness=correctness, answer_status=1,
+            answer_start_unix=100, answer_end_unix=110,
+        ))
+    db.commit()
+
+
+def test_raw_data_streams_every_row_across_batches(seeded, client, db, monkeypatch):
+    _add_answers(db)
+    monkeypatch.setattr(grades, "RAW_DATA_STREAM_BATCH_SIZE", 1)
+
+    response = client.get("/grades/raw_data", params={"lesson_ids": [2, 1]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [(item["lesson_id"], item["student"]["student_id"]) for item in body] == [(1, 1), (1, 2), (1, 3), (2, 4)]
+    assert [(item["answer"]["selected_choice"], item["answer"]["is_correct"]) for item in body] == [
+        ("B", True), ("A", False), (None, None), ("A", False),
+    ]
+    first = body[0]
+    assert first["student"] == {"student_id": 1, "name": "s1", "class_id": 1, "students_number": 1}
+    assert first["question"] == {
+        "question_id": 1, "question_label": "Q1", "correct_choice": "B", "part_name": "p", "chapter_name": "c",
+        "unit_name": "u", "lesson_theme_name": "t1", "lesson_theme_contents_id": 1,
+    }
+    assert (first["answer"]["start_unix"], first["answer"]["end_unix"]) == (100, 110)
+
+
+def test_raw_data_of_a_lesson_without_answers_is_an_empty_array(seeded, client, db):
+    _add_answers(db)
+
+    response = client.get("/grades/raw_data", params={"lesson_id": 3})
+
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_raw_data_requires_existing_lessons(seeded, client, db):
+    _add_answers(db)
+
+    assert client.get("/grades/raw_data").status_code == 400
+    assert client.get("/grades/raw_data", params={"lesson_id": 1, "lesson_ids": [99]}).status_code == 404
@@ -0,0 +1,55 @@
+# tests/test_roster_cache.py
+from models import ClassTable, StudentTable
+from services import roster_cache
+from services.roster_cache import get_class_students, get_student
+
+
+def _roster_cached():
+    return roster_cache._roster_cache.get(roster_cache._ROSTER_KEY) is not None
+
+
+def test_student_insert_invalidates_roster_on_commit(seeded, client, db):
+    assert [s["student_id"] for s in client.get("/classes/2/students").json()] == [4]
+    assert _roster_cached()
+
+    db.add(StudentTable(student_id=5, class_id=2, students_number=5, name="s5", mail_address="s5@example.com"))
+    db.flush()
+    # コミットまでは名簿を残す
+    assert _roster_cached()
+    db.commit()
+
+    assert not _roster_cached()
+    assert [s["student_id"] for s in client.get("/classes/2/students").json()] == [4, 5]
+
+
+def test_student_update_and_delete_invalidate_roster(seeded, db):
+    assert get_student(db, 1).name == "s1"
+
+    db.get(StudentTable, 1).name = "renamed"
+    db.commit()
+    assert get_student(db, 1).name == "renamed"
+
+    db.query(StudentTable).filter(StudentTable.student_id == 3).delete()
+    db.commit()
+    assert [s.student_id for s in get_class_students(db, 1)] == [1, 2]
+
+
+def test_class_update_invalidates_roster(seeded, db):
+    roster_cache.get_class(db, 1)
+
+    db.query(ClassTable).filter(ClassTable.class_id == 1).update({"class_name": "1-C"})
+    db.commit()
+
+    assert not _roster_cached()
+    assert roster_cache.get_class(db, 1).class_name == "1-C"
+
+
+def test_rolled_back_write_keeps_roster(seeded, db):
+    get_student(db, 1)
+
+    db.add(StudentTable(student_id=5, class_id=2, students_number=2, name="s5", mail_address="s5@example.com"))
+    db.flush()
+    db.rollback()
+    db.commit()
+
+    assert _roster_cached()
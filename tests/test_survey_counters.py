@@ -0,0 +1,74 @@
+# tests/test_survey_counters.py
+from sqlalchemy import event
+
+import services.survey_counters as survey_counters
+from models import LessonTable
+
+
+def _add_lesson(db, lesson_id=1):
+    db.add(LessonTable(lesson_id=lesson_id, class_id=1, timetable_id=1, lesson_name="l", lesson_status=2))
+    db.commit()
+
+
+def _post_survey(client, student_id, understanding_level, difficulty_point):
+    response = client.post("/lesson_surveys/", json={
+        "student_id": student_id, "lesson_id": 1,
+        "understanding_level": understanding_level, "difficulty_point": difficulty_point,
+    })
+    assert response.status_code == 201
+    return response.json()["lesson_survey_id"]
+
+
+def _group_by_count(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return lambda: sum("GROUP BY" in statement for statement in statements)
+
+
+def test_writes_adjust_cached_counters_without_regrouping(seeded, client, db, engine):
+    _add_lesson(db)
+    _post_survey(client, 1, 3, 2)
+    summary_url = "/lesson_surveys/lesson/1/summary"
+    assert client.get(summary_url).json() == {
+        "understanding_level_distribution": {"3": 1},
+        "difficulty_point_distribution": {"2": 1},
+    }
+
+    group_by_count = _group_by_count(engine)
+    survey_id = _post_survey(client, 2, 3, 4)
+    assert client.put(f"/lesson_surveys/{survey_id}", params={"understanding_level": 5}).status_code == 200
+    summary = client.get(summary_url).json()
+
+    assert group_by_count() == 0
+    assert summary == {
+        "understanding_level_distribution": {"3": 1, "5": 1},
+        "difficulty_point_distribution": {"2": 1, "4": 1},
+    }
+
+
+def test_change_during_cold_load_is_not_cached(seeded, db, monkeypatch):
+    _add_lesson(db)
+    load_counters = survey_counters._load_counters
+
+    def load_with_concurrent_write(session, lesson_id):
+        # 読み込み中に別リクエストの書き込みがコミットされた
+        counters = load_counters(session, lesson_id)
+        assert survey_counters.record_survey_change(lesson_id, None, (4, 1)) is None
+        return counters
+
+    monkeypatch.setattr(survey_counters, "_load_counters", load_with_concurrent_write)
+    survey_counters.get_survey_summary(db, 1)
+
+    assert survey_counters._counters.get(1) is None
+    assert survey_counters._loads == {}
+
+
+def test_cold_load_is_cached_when_nothing_changed(seeded, db):
+    _add_lesson(db)
+    survey_counters.get_survey_summary(db, 1)
+
+    assert survey_counters.record_survey_change(1, None, (2, 3)) == {
+        "understanding_level_distribution": {2: 1},
+        "difficulty_point_distribution": {3: 1},
+    }
+    assert survey_counters._loads == {}
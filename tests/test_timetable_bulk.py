@@ -0,0 +1,62 @@
+# tests/test_timetable_bulk.py
+from datetime import date
+
+from sqlalchemy.orm import Query
+
+from models import TimetableTable
+
+# 2025-04-07 は月曜日
+BULK = {
+    "start_date": "2025-04-07",
+    "end_date": "2025-04-16",
+    "patterns": [
+        {"weekday": 0, "day_of_week": "月", "period": 1, "time": "09:00-09:50"},
+        {"weekday": 2, "day_of_week": "水", "period": 2, "time": "10:00-10:50"},
+    ],
+    "exclude_dates": ["2025-04-09"],
+}
+
+
+def test_bulk_creates_only_missing_slots(seeded, client, db):
+    # 4/7 1限は seeded で作成済み。4/9 は除外日
+    response = client.post("/lesson_registrations/calendar/bulk", json=BULK)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["total"], body["created"]) == (3, 2)
+    assert [(t["date"], t["period"]) for t in body["timetables"]] == [
+        ("2025-04-07", 1), ("2025-04-14", 1), ("2025-04-16", 2),
+    ]
+    assert body["timetables"][0]["timetable_id"] == 1
+
+    rerun = client.post("/lesson_registrations/calendar/bulk", json=BULK).json()
+    assert (rerun["total"], rerun["created"]) == (3, 0)
+    assert db.query(TimetableTable).count() == 3
+
+
+def test_bulk_skips_slots_created_concurrently(seeded, client, db, monkeypatch):
+    # 既存の枠を読んだ後、INSERT までの間に他のリクエストが同じ枠を作成した
+    all_rows = Query.all
+    state = {"first": True}
+
+    def all_then_race(query):
+        rows = all_rows(query)
+        if state["first"] and query.column_descriptions[0]["entity"] is TimetableTable:
+            state["first"] = False
+            other = query.session.get_bind()
+            with other.begin() as conn:
+                conn.execute(TimetableTable.__table__.insert().values(
+                    date=date(2025, 4, 14), day_of_week="月", period=1, time="09:00-09:50",
+                ))
+        return rows
+
+    monkeypatch.setattr(Query, "all", all_then_race)
+    body = client.post("/lesson_registrations/calendar/bulk", json=BULK).json()
+
+    assert (body["total"], body["created"]) == (3, 1)
+    assert db.query(TimetableTable).count() == 3
+
+
+def test_single_create_reuses_existing_slot(seeded, client):
+    slot = {"date": "2025-04-07", "day_of_week": "月", "period": 1, "time": "09:00-09:50"}
+    assert client.post("/lesson_registrations/calendar", json=slot).json()["timetable_id"] == 1
@@ -0,0 +1,102 @@
+# tests/test_upload_slot.py
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import routers.lecture_videos as lecture_videos
+from models import LectureVideosTable
+from services import azure_blob
+from services.azure_blob import get_blob_url, sign_upload_slot, verify_upload_slot
+
+_BLOB = "0f8fad5b-d9cb-469f-a165-70867728950e.mp4"
+_OTHER_BLOB = "7c9e6679-7425-40de-944b-e07fc1f90ae7.mp4"
+
+
+@pytest.fixture
+def account_key(monkeypatch):
+    monkeypatch.setattr(azure_blob, "AZURE_ACCOUNT_KEY", "test-account-key")
+
+
+@pytest.fixture
+def uploaded(monkeypatch):
+    # Blob はアップロード済みとして扱う
+    uploaded = {_BLOB, _OTHER_BLOB}
+
+    async def blob_exists_async(blob_name):
+        return blob_name in uploaded
+
+    monkeypatch.setattr(lecture_videos, "blob_exists_async", blob_exists_async)
+    return uploaded
+
+
+def _expires(minutes=15):
+    return datetime.now(timezone.utc) + timedelta(minutes=minutes)
+
+
+def test_token_is_bound_to_the_theme_and_blob(account_key):
+    token = sign_upload_slot(1, _BLOB, _expires())
+
+    assert verify_upload_slot(token, 1, _BLOB)
+    assert not verify_upload_slot(token, 2, _BLOB)
+    assert not verify_upload_slot(token, 1, _OTHER_BLOB)
+
+
+def test_tampered_or_malformed_token_is_rejected(account_key):
+    expires, _, signature = sign_upload_slot(1, _BLOB, _expires()).partition(".")
+
+    # 期限だけ延ばしても署名が合わない
+    assert not verify_upload_slot(f"{int(expires) + 3600}.{signature}", 1, _BLOB)
+    assert not verify_upload_slot(f"{expires}.{signature[:-1]}A", 1, _BLOB)
+    assert not verify_upload_slot("garbage", 1, _BLOB)
+    assert not verify_upload_slot("", 1, _BLOB)
+
+
+def test_token_expires_after_the_finalize_grace(account_key):
+    # SAS の期限が切れても猶予期間内なら finalize できる
+    assert verify_upload_slot(sign_upload_slot(1, _BLOB, _expires(-5)), 1, _BLOB)
+    assert not verify_upload_slot(sign_upload_slot(1, _BLOB, _expires(-11)), 1, _BLOB)
+
+
+def test_token_is_never_valid_without_account_key(account_key, monkeypatch):
+    token = sign_upload_slot(1, _BLOB, _expires())
+    monkeypatch.setattr(azure_blob, "AZURE_ACCOUNT_KEY", None)
+
+    assert not verify_upload_slot(token, 1, _BLOB)
+
+
+def test_finalize_registers_the_uploaded_blob(seeded, client, db, account_key, uploaded):
+    body = {"lesson_theme_id": 1, "blob_name": _BLOB, "upload_token": sign_upload_slot(1, _BLOB, _expires())}
+
+    response = client.post("/lecture_videos/finalize", json=body)
+
+    assert response.status_code == 200
+    assert response.json()["video_url"] == get_blob_url(_BLOB)
+    assert db.query(LectureVideosTable).filter(LectureVideosTable.lesson_theme_id == 1).count() == 1
+
+
+def test_finalize_rejects_tokens_for_another_theme_or_expired(seeded, client, db, account_key, uploaded):
+    other_theme = {"lesson_theme_id": 1, "blob_name": _BLOB, "upload_token": sign_upload_slot(2, _BLOB, _expires())}
+    expired = {"lesson_theme_id": 1, "blob_name": _BLOB, "upload_token": sign_upload_slot(1, _BLOB, _expires(-30))}
+
+    assert client.post("/lecture_videos/finalize", json=other_theme).status_code == 403
+    assert client.post("/lecture_videos/finalize", json=expired).status_code == 403
+    assert db.query(LectureVideosTable).count() == 0
+
+
+def test_finalize_rejects_a_blob_registered_to_another_theme(seeded, client, db, account_key, uploaded):
+    db.add(LectureVideosTable(lesson_theme_id=2, lecture_video_title="t2", video_url=get_blob_url(_BLOB)))
+    db.commit()
+    body = {"lesson_theme_id": 1, "blob_name": _BLOB, "upload_token": sign_upload_slot(1, _BLOB, _expires())}
+
+    response = client.post("/lecture_videos/finalize", json=body)
+
+    assert response.status_code == 409
+    assert db.query(LectureVideosTable).filter(LectureVideosTable.lesson_theme_id == 1).count() == 0
+
+
+def test_finalize_requires_the_blob_to_be_uploaded(seeded, client, db, account_key, uploaded):
+    uploaded.clear()
+    body = {"lesson_theme_id": 1, "blob_name": _BLOB, "upload_token": sign_upload_slot(1, _BLOB, _expires())}
+
+    assert client.post("/lecture_videos/finalize", json=body).status_code == 409
+    assert db.query(LectureVideosTable).count() == 0